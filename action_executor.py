@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import threading
+import queue
+import time
+
+# Une file nommée = un worker: l'ordre est garanti dans une file, les files ne se bloquent pas entre elles
+QUEUE_NAMES = ("transport", "system", "network", "filesystem")
+QUEUE_SIZE = 32
+
+# === Shared data ===
+queues = {}
+workers_lock = threading.Lock()
+running = {}
+action_stats = {}
+stats_lock = threading.Lock()
+
+# === External hooks ===
+progress_hook = None
+debug = False
+
+def set_hooks(progress_fn=None, debug_flag=False):
+    global progress_hook, debug
+    progress_hook = progress_fn
+    debug = debug_flag
+
+def record_timing(name, duration, failed=False):
+    with stats_lock:
+        stats = action_stats.setdefault(name, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        stats["count"] += 1
+        stats["total"] += duration
+        stats["max"] = max(stats["max"], duration)
+        stats["last"] = duration
+        if failed:
+            stats["errors"] += 1
+
+def stats_lines():
+    with stats_lock:
+        items = sorted(action_stats.items(), key=lambda item: -item[1]["total"])
+        return [
+            f"{name}: {s['count']}x avg {s['total'] / s['count'] * 1000:.0f}ms max {s['max'] * 1000:.0f}ms"
+            for name, s in items
+        ]
+
+def action_worker(queue_name):
+    q = queues[queue_name]
+    while True:
+        name, fn, args, kwargs, label, done = q.get()
+        running[queue_name] = name
+        if label and progress_hook:
+            progress_hook(label)
+        start = time.perf_counter()
+        failed = False
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            failed = True
+            print(f"error action {queue_name}/{name}: {e}")
+        duration = time.perf_counter() - start
+        record_timing(name, duration, failed)
+        running.pop(queue_name, None)
+        # Bandeau retiré à la fin de chaque tâche, la tâche suivante affiche le sien au démarrage
+        if label and progress_hook:
+            progress_hook(None)
+        if debug:
+            print(f"[action] {queue_name}/{name} done in {duration * 1000:.0f}ms")
+        # Pas de callback si la tâche a échoué: done() ne reçoit que des résultats valides
+        if done and not failed:
+            try:
+                done(result)
+            except Exception as e:
+                print(f"error action callback {name}: {e}")
+        q.task_done()
+
+def get_queue(queue_name):
+    with workers_lock:
+        q = queues.get(queue_name)
+        if q is None:
+            if queue_name not in QUEUE_NAMES:
+                raise ValueError(f"unknown action queue: {queue_name}")
+            q = queue.Queue(maxsize=QUEUE_SIZE)
+            queues[queue_name] = q
+            threading.Thread(target=action_worker, args=(queue_name,), daemon=True).start()
+        return q
+
+def submit(queue_name, name, fn, *args, label=None, done=None, **kwargs):
+    try:
+        get_queue(queue_name).put_nowait((name, fn, args, kwargs, label, done))
+        return True
+    except queue.Full:
+        print(f"error action {queue_name}: queue full, dropped {name}")
+        return False
+
+def is_busy(queue_name=None):
+    if queue_name:
+        return queue_name in running or not get_queue(queue_name).empty()
+    return bool(running) or any(not q.empty() for q in queues.values())
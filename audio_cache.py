@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import os
+import time
+import zlib
+import hashlib
+from pathlib import Path
+
+import yt_cache
+
+# Cache disque de l'audio encodé (sortie du flux local), index dans yt_cache.db
+CACHE_DIR = Path.home() / "MoodeOled" / "audio_cache"
+MAX_BYTES = 0
+MIN_BYTES = 64 * 1024
+READ_SIZE = 256 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    crc32 INTEGER NOT NULL,
+    duration REAL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    created REAL,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS idx_audio_cache_last_used ON audio_cache(last_used);
+"""
+
+# === Shared data ===
+schema_ready = False
+cache_stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "corrupt": 0}
+
+def configure(directory=None, max_mb=None):
+    global CACHE_DIR, MAX_BYTES
+    if directory:
+        CACHE_DIR = Path(directory)
+    if max_mb is not None:
+        MAX_BYTES = max(0, max_mb) * 1024 * 1024
+
+def enabled():
+    return MAX_BYTES > 0
+
+def db():
+    global schema_ready
+    conn = yt_cache.open_cache()
+    if not schema_ready:
+        with yt_cache.db_lock:
+            conn.executescript(SCHEMA)
+        schema_ready = True
+    return conn
+
+def file_path(key, fmt):
+    return CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.{fmt}"
+
+def remove_entry(key, path=None):
+    conn = db()
+    with yt_cache.db_lock, conn:
+        conn.execute("DELETE FROM audio_cache WHERE key = ?", (key,))
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def lookup(query):
+    if not enabled():
+        return None
+    key = yt_cache.normalize_key(query)
+    conn = db()
+    with yt_cache.db_lock:
+        row = conn.execute(
+            "SELECT path, format, size, duration, title, artist, album FROM audio_cache WHERE key = ?", (key,)
+        ).fetchone()
+    if not row:
+        cache_stats["misses"] += 1
+        return None
+    path, fmt, size, duration, title, artist, album = row
+    # Contrôle rapide à chaque lecture (taille), contrôle complet (crc32) dans verify()
+    try:
+        valid = os.path.getsize(path) == size
+    except OSError:
+        valid = False
+    if not valid:
+        cache_stats["corrupt"] += 1
+        remove_entry(key, path)
+        return None
+    with yt_cache.db_lock, conn:
+        conn.execute("UPDATE audio_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+    cache_stats["hits"] += 1
+    return {"file": path, "format": fmt, "size": size, "duration": duration,
+            "title": title, "artist": artist, "album": album}
+
+def cached_keys():
+    # Clés des pistes présentes sur disque (lecture hors ligne)
+    if not enabled():
+        return set()
+    conn = db()
+    with yt_cache.db_lock:
+        return {row[0] for row in conn.execute("SELECT key FROM audio_cache")}
+
+class Writer:
+    # Reçoit la sortie encodée au fil du flux; publiée seulement si la piste est complète
+    def __init__(self, query, fmt, meta):
+        self.query = query
+        self.key = yt_cache.normalize_key(query)
+        self.format = fmt
+        self.meta = meta
+        self.path = file_path(self.key, fmt)
+        self.tmp_path = self.path.with_name(self.path.name + ".part")
+        self.size = 0
+        self.crc = 0
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, data):
+        self.file.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+
+    def finish(self, complete):
+        self.file.close()
+        if not complete or self.size < MIN_BYTES:
+            os.remove(self.tmp_path)
+            return
+        os.replace(self.tmp_path, self.path)
+        now = time.time()
+        conn = db()
+        with yt_cache.db_lock, conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO audio_cache
+                   (key, query, path, format, size, crc32, duration, title, artist, album, created, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.key, self.query, str(self.path), self.format, self.size, self.crc,
+                 self.meta.get("duration"), self.meta.get("title"), self.meta.get("artist"),
+                 self.meta.get("album"), now, now)
+            )
+        cache_stats["stored"] += 1
+        evict()
+
+def open_writer(query, fmt, meta):
+    if not enabled() or not query:
+        return None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return Writer(query, fmt, meta)
+    except OSError as e:
+        print(f"error audio cache: {e}")
+        return None
+
+def evict():
+    # LRU: supprime les pistes les moins récemment lues tant que le budget est dépassé
+    conn = db()
+    with yt_cache.db_lock:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio_cache").fetchone()[0]
+        if total <= MAX_BYTES:
+            return 0
+        rows = conn.execute("SELECT key, path, size FROM audio_cache ORDER BY last_used").fetchall()
+    removed = 0
+    for key, path, size in rows:
+        if total <= MAX_BYTES:
+            break
+        remove_entry(key, path)
+        total -= size
+        removed += 1
+    cache_stats["evicted"] += removed
+    return removed
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                return crc
+            crc = zlib.crc32(block, crc)
+
+def verify():
+    # Contrôle d'intégrité complet (crc32) et nettoyage des fichiers non indexés (.part interrompus)
+    if not enabled() or not CACHE_DIR.exists():
+        return 0
+    conn = db()
+    with yt_cache.db_lock:
+        rows = conn.execute("SELECT key, path, size, crc32 FROM audio_cache").fetchall()
+    known = set()
+    removed = 0
+    for key, path, size, crc in rows:
+        try:
+            valid = os.path.getsize(path) == size and file_crc32(path) == crc
+        except OSError:
+            valid = False
+        if valid:
+            known.add(os.path.basename(path))
+        else:
+            remove_entry(key, path)
+            cache_stats["corrupt"] += 1
+            removed += 1
+    for name in os.listdir(CACHE_DIR):
+        if name in known:
+            continue
+        try:
+            # Un .part récent appartient peut-être à une piste en cours d'écriture
+            if name.endswith(".part") and time.time() - os.path.getmtime(CACHE_DIR / name) < 3600:
+                continue
+            os.remove(CACHE_DIR / name)
+        except OSError:
+            pass
+    evict()
+    return removed
+
+def usage():
+    conn = db()
+    with yt_cache.db_lock:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio_cache").fetchone()
+
+def stats_line():
+    count, size = usage() if enabled() else (0, 0)
+    return (f"audio cache: {count} tracks {size / 1048576:.0f}/{MAX_BYTES / 1048576:.0f}MB "
+            f"hit {cache_stats['hits']} miss {cache_stats['misses']}")
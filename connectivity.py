@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import time
+import socket
+import threading
+
+# État de la connexion Internet tenu à jour en tâche de fond: les appelants lisent l'état en cache (aucune attente réseau)
+PROBE_HOSTS = (("8.8.8.8", 53), ("1.1.1.1", 53))
+PROBE_TIMEOUT = 2
+INTERVAL_ONLINE = 30
+INTERVAL_OFFLINE = 5
+
+# === External hooks ===
+online_hook = None
+debug = False
+
+# === Shared data ===
+state_lock = threading.Lock()
+wake_event = threading.Event()
+monitor_started = False
+online = None
+changed_at = None
+conn_stats = {"probes": 0, "probe_total": 0.0, "changes": 0, "offline_checks": 0}
+
+def set_hooks(online_fn=None, debug_flag=False):
+    # online_fn(): appelé (thread de sonde) quand la connexion revient après une coupure
+    global online_hook, debug
+    online_hook = online_fn
+    debug = debug_flag
+
+def configure(interval_online=None, interval_offline=None, timeout=None):
+    global INTERVAL_ONLINE, INTERVAL_OFFLINE, PROBE_TIMEOUT
+    if interval_online is not None:
+        INTERVAL_ONLINE = max(5, interval_online)
+    if interval_offline is not None:
+        INTERVAL_OFFLINE = max(1, interval_offline)
+    if timeout is not None:
+        PROBE_TIMEOUT = max(0.5, timeout)
+
+def probe():
+    # Connexion TCP vers des résolveurs DNS publics: le premier qui répond suffit
+    for host in PROBE_HOSTS:
+        try:
+            with socket.create_connection(host, timeout=PROBE_TIMEOUT):
+                return True
+        except OSError:
+            continue
+    return False
+
+def check():
+    # Sonde immédiate (bloquante, au plus PROBE_TIMEOUT s par hôte), état mis à jour
+    global online, changed_at
+    start = time.perf_counter()
+    result = probe()
+    conn_stats["probes"] += 1
+    conn_stats["probe_total"] += time.perf_counter() - start
+    with state_lock:
+        previous, online = online, result
+        if previous != result:
+            changed_at = time.time()
+            if previous is not None:
+                conn_stats["changes"] += 1
+    if previous != result and debug:
+        print(f"[connectivity] {'online' if result else 'offline'}")
+    if result and previous is False and online_hook:
+        try:
+            online_hook()
+        except Exception as e:
+            print(f"error connectivity hook: {e}")
+    return result
+
+def is_online():
+    # Inconnu (avant la première sonde): supposé en ligne, comme avant
+    if online is False:
+        conn_stats["offline_checks"] += 1
+        return False
+    return True
+
+def report_failure():
+    # Erreur réseau constatée ailleurs (résolveur, flux): nouvelle sonde sans attendre l'intervalle
+    wake_event.set()
+
+def monitor():
+    while True:
+        check()
+        wake_event.wait(INTERVAL_ONLINE if online else INTERVAL_OFFLINE)
+        wake_event.clear()
+
+def start():
+    global monitor_started
+    with state_lock:
+        if monitor_started:
+            return
+        monitor_started = True
+    threading.Thread(target=monitor, daemon=True).start()
+
+def stats_line():
+    state = "unknown" if online is None else ("online" if online else "offline")
+    probe_ms = conn_stats["probe_total"] * 1000 / conn_stats["probes"] if conn_stats["probes"] else 0
+    return (f"net: {state} probe {probe_ms:.0f}ms changes {conn_stats['changes']} "
+            f"offline fails {conn_stats['offline_checks']}")
@@ -1,19 +1,65 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-3.0-or-later
 # Copyright 2025 MoodeOled project / Benoit Toufflet
+import sys
 import time
 import yaml
 import threading
+import subprocess
 import configparser
 import sqlite3
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
-from board import SCL, SDA
-import busio
-import adafruit_ssd1306
 
-i2c = busio.I2C(SCL, SDA)
-disp = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c)
+SCRIPT_NAME = Path(sys.argv[0]).stem
+HOME_DIR = Path.home()
+MOODEOLED_DIR = HOME_DIR / "MoodeOled"
+CONFIG_PATH = MOODEOLED_DIR / "config.ini"
+
+config = configparser.ConfigParser()
+config.read(CONFIG_PATH)
+
+VIRTUAL_DISPLAY = config.getboolean("manual", "virtual_display", fallback=False)
+
+# Écran virtuel (benchmarks / rejeu sans OLED): même interface que SSD1306_I2C
+class VirtualDisplay:
+    def __init__(self, width=128, height=64, dump_path=None):
+        self.width = width
+        self.height = height
+        self.dump_path = dump_path
+        self.frame = Image.new('1', (width, height))
+        self.frame_count = 0
+        self.powered = True
+
+    def fill(self, color):
+        self.frame = Image.new('1', (self.width, self.height), color=255 if color else 0)
+
+    def image(self, img):
+        self.frame = img.copy()
+
+    def show(self):
+        self.frame_count += 1
+        if self.dump_path:
+            try:
+                self.frame.save(self.dump_path)
+            except Exception as e:
+                print(f"error virtual display: {e}")
+
+    def poweroff(self):
+        self.powered = False
+
+    def poweron(self):
+        self.powered = True
+
+if VIRTUAL_DISPLAY:
+    disp = VirtualDisplay(dump_path=config.get("manual", "virtual_display_dump", fallback="").strip() or None)
+else:
+    from board import SCL, SDA
+    import busio
+    import adafruit_ssd1306
+
+    i2c = busio.I2C(SCL, SDA)
+    disp = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c)
 width = disp.width
 height = disp.height
 
@@ -25,13 +71,6 @@ draw = ImageDraw.Draw(image)
 
 thumb_img = Image
 
-HOME_DIR = Path.home()
-MOODEOLED_DIR = HOME_DIR / "MoodeOled"
-CONFIG_PATH = MOODEOLED_DIR / "config.ini"
-
-config = configparser.ConfigParser()
-config.read(CONFIG_PATH)
-
 DEBUG = config.getboolean("settings", "debug", fallback=False)
 LANGUAGE = config.get("settings", "language", fallback="en")
 SCREEN_TIMEOUT = config.getint("settings", "screen_timeout", fallback=0)
@@ -40,6 +79,8 @@ font_title_menu = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSan
 font_item_menu = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10)
 font_message = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10)
 
+progress_text = None
+
 message_text = None
 message_start_time = 0
 message_permanent = False
@@ -232,6 +273,11 @@ def load_renderer_states_from_db():
     except Exception as e:
         debug_error("error_db", e)
 
+def switch_to_service(target):
+    # Démarre l'écran cible puis arrête celui-ci (systemd termine ce processus)
+    subprocess.call(["sudo", "systemctl", "start", f"{target}.service"])
+    subprocess.call(["sudo", "systemctl", "stop", f"{SCRIPT_NAME}.service"])
+
 def draw_custom_menu(options, selection, title="Menu", multi=None, checkmark="✓ "):
     global scroll_state
     now = time.time()
@@ -399,6 +445,20 @@ def draw_message():
             x = x0 + max(0, (mess_width - text_width) // 2)
             draw.text((x, y), line, font=font_message, fill=255)
 
+def set_progress(text):
+    global progress_text
+    progress_text = text
+
+def draw_progress():
+    # Bandeau discret en bas d'écran pendant une action en arrière-plan
+    if not progress_text:
+        return
+    spinner = "|/-\\"[int(time.time() * 4) % 4]
+    label = f"{spinner} {progress_text}"
+    bar_h = MENU_LINE_HEIGHT + 1
+    draw.rectangle((0, height - bar_h, width, height), fill=255)
+    draw.text((2, height - bar_h), label, font=font_item_menu, fill=0)
+
 def message_updater():
     global message_text, message_start_time, scroll_offset_message, message_permanent
     while True:
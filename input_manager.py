@@ -2,6 +2,10 @@ import threading
 import time
 import subprocess
 import select
+import json
+import os
+import sys
+from pathlib import Path
 
 try:
     from RPi import GPIO
@@ -26,6 +30,13 @@ press_callback = None
 repeat_threads = {}
 repeat_counts = {}
 
+# === Record / replay ===
+SCRIPT_NAME = Path(sys.argv[0]).stem
+record_file = None
+record_lock = threading.Lock()
+replay_active = False
+press_timings = []
+
 # --- Common repeat sender for GPIO and rotary button ---
 def repeat_sender(key, channel):
     while key in repeat_counts:
@@ -71,6 +82,8 @@ def rotary_button_event(channel):
 # === Traitement touches avec debounce ===
 def process_key(key, repeat_code):
     global debounce_data
+    if record_file and not replay_active:
+        record_key(key, repeat_code)
     try:
         rep = int(repeat_code, 16)
     except Exception as e:
@@ -105,6 +118,142 @@ def process_key(key, repeat_code):
     debounce_data[key]["timer"] = t
     t.start()
 
+# === Enregistrement des touches (JSONL: une ligne par évènement) ===
+def start_recording(path):
+    global record_file
+    try:
+        record_file = open(path, "a", encoding="utf-8")
+        os.chmod(path, 0o664)
+    except Exception as e:
+        record_file = None
+        print("error record inputs:", e)
+
+def record_key(key, repeat_code):
+    # Horloge murale commune aux scripts (nowoled, navoled, queoled): une seule chronologie pour la session
+    event = {"t": round(time.time(), 4), "script": SCRIPT_NAME, "key": key, "code": repeat_code}
+    with record_lock:
+        try:
+            record_file.write(json.dumps(event) + "\n")
+            record_file.flush()
+        except Exception as e:
+            print("error record key:", e)
+
+def load_recording(path):
+    # Tous les scripts, dans l'ordre du fichier: "index" = position de l'évènement dans la session
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if "key" in event:
+                event["index"] = len(events)
+                events.append(event)
+    return events
+
+def read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def replay_session(path, start_delay):
+    # Session partagée par les scripts (<file>.session): créée au premier démarrage, réutilisée ensuite
+    # Nouvelle session seulement si l'enregistrement a changé (ou si le fichier de session est supprimé)
+    mtime = os.path.getmtime(path)
+    session = read_json(f"{path}.session")
+    if not session or session.get("mtime") != mtime:
+        session = {"mtime": mtime, "started": time.time() + start_delay}
+        write_json(f"{path}.session", session)
+    return session
+
+def replay_cursor(path, session):
+    # Dernier évènement rejoué par ce script dans cette session (-1: aucun)
+    cursor = read_json(f"{path}.{SCRIPT_NAME}.cursor")
+    if cursor and cursor.get("started") == session["started"]:
+        return cursor.get("index", -1)
+    return -1
+
+# === Rejeu d'une session enregistrée ===
+def timed_press(callback):
+    def wrapper(key):
+        start = time.perf_counter()
+        try:
+            callback(key)
+        finally:
+            press_timings.append((key, time.perf_counter() - start))
+    return wrapper
+
+def replay_summary():
+    lines = [f"Replay: {len(press_timings)} presses handled"]
+    per_key = {}
+    for key, duration in press_timings:
+        per_key.setdefault(key, []).append(duration)
+    for key, durations in sorted(per_key.items()):
+        durations.sort()
+        avg = sum(durations) / len(durations)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        lines.append(f"  {key:<18} n={len(durations):<4} avg={avg * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms max={durations[-1] * 1000:7.1f}ms")
+    return "\n".join(lines)
+
+def replay_listener(path, process_key, speed=1.0, start_delay=2.0, exit_after=False):
+    # Rejeu unique par session: un script relancé (changement d'écran) reprend après son dernier évènement rejoué
+    global replay_active
+    try:
+        events = load_recording(path)
+        session = replay_session(path, start_delay)
+        consumed = replay_cursor(path, session)
+    except Exception as e:
+        if show_message:
+            show_message(f"error replay: {e}")
+        print("error replay:", e)
+        return
+    pending = [event for event in events if event.get("script", SCRIPT_NAME) == SCRIPT_NAME and event["index"] > consumed]
+    if not pending:
+        print(f"Replay: no pending events for '{SCRIPT_NAME}' in {path}")
+        return
+
+    replay_active = True
+    press_timings.clear()
+    first_t = events[0]["t"]
+    cursor_path = f"{path}.{SCRIPT_NAME}.cursor"
+    for event in pending:
+        # Cible sur l'horloge de la session: un script démarré en retard rattrape sans décaler la suite
+        target = session["started"] + (event["t"] - first_t) / max(speed, 0.01)
+        delay = target - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        process_key(event["key"], event.get("code", "00"))
+        try:
+            write_json(cursor_path, {"started": session["started"], "index": event["index"]})
+        except OSError as e:
+            print("error replay cursor:", e)
+
+    # Laisse le dernier debounce se terminer avant le bilan
+    time.sleep(DEBOUNCE_DELAY + 1.0)
+    replay_active = False
+    summary = replay_summary()
+    print(summary)
+    try:
+        # Ajout: un script relancé en cours de session complète le bilan au lieu de l'écraser
+        with open(f"{path}.{SCRIPT_NAME}.results.txt", "a", encoding="utf-8") as f:
+            f.write(summary + "\n")
+    except Exception as e:
+        print("error replay results:", e)
+    if exit_after:
+        os._exit(0)
+
 # === LIRC listener inchangé ===
 def lirc_listener(process_key, config):
     try:
@@ -156,6 +305,23 @@ def start_inputs(config, process_press, msg_hook=None):
     show_message = msg_hook
     press_callback = process_press
 
+    # Record / replay (benchmarks)
+    record_path = config.get("manual", "record_inputs", fallback="").strip()
+    replay_path = config.get("manual", "replay_inputs", fallback="").strip()
+    if record_path:
+        start_recording(record_path)
+    if replay_path:
+        press_callback = timed_press(process_press)
+        threading.Thread(
+            target=replay_listener,
+            args=(replay_path, process_key),
+            kwargs={
+                "speed": config.getfloat("manual", "replay_speed", fallback=1.0),
+                "exit_after": config.getboolean("manual", "replay_exit", fallback=False),
+            },
+            daemon=True,
+        ).start()
+
     # LIRC
     if config.getboolean("manual", "use_lirc", fallback=True):
         threading.Thread(target=lirc_listener, args=(process_key, config), daemon=True).start()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import re
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from mpd import MPDClient
+
+# Index plein texte (FTS5) de la bibliothèque MPD: la recherche ne passe plus par MPD (plusieurs secondes sur une grosse bibliothèque NAS)
+DB_PATH = Path.home() / "MoodeOled" / "library_index.db"
+MPD_HOST = "localhost"
+MPD_PORT = 6600
+# listallinfo par dossier de ce niveau (NAS/<partage>...): réponses MPD bornées même sur 100k pistes
+SCAN_DEPTH = 2
+BATCH_SIZE = 2000
+MAX_RESULTS = 5000
+RETRY_DELAY = 10
+# Poids bm25 par champ: une correspondance sur l'artiste compte plus qu'une sur le genre
+# albumartist, date et chemin du fichier: cherchés seulement en mode "any" (comme "any" côté MPD, plus le chemin)
+FIELDS = ("artist", "album", "title", "genre", "albumartist", "date", "file")
+FIELD_WEIGHTS = {"artist": 4.0, "album": 2.0, "title": 3.0, "genre": 1.0, "albumartist": 2.0, "date": 0.5, "file": 0.5}
+TAG_FIELDS = ("artist", "album", "title", "genre")
+TAGS = ("file", "artist", "albumartist", "album", "title", "genre", "track", "date")
+# Version du schéma (PRAGMA user_version); 2: index de préfixes FTS5 (2 à 4 caractères) pour la recherche pendant la saisie
+# 3: albumartist, date et chemin indexés pour "any"
+INDEX_VERSION = 3
+# Requête de suggestion abandonnée (progress handler SQLite) dès qu'une saisie plus récente la rend inutile
+CANCEL_CHECK_STEPS = 1000
+SUGGEST_POOL = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    artist TEXT NOT NULL DEFAULT '',
+    albumartist TEXT NOT NULL DEFAULT '',
+    album TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    genre TEXT NOT NULL DEFAULT '',
+    track TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    last_modified TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    artist, album, title, genre, albumartist, date, file,
+    content='tracks', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+);
+CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts(rowid, artist, album, title, genre, albumartist, date, file)
+    VALUES (new.id, new.artist, new.album, new.title, new.genre, new.albumartist, new.date, new.file);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title, genre, albumartist, date, file)
+    VALUES ('delete', old.id, old.artist, old.album, old.title, old.genre, old.albumartist, old.date, old.file);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, artist, album, title, genre, albumartist, date, file)
+    VALUES ('delete', old.id, old.artist, old.album, old.title, old.genre, old.albumartist, old.date, old.file);
+    INSERT INTO tracks_fts(rowid, artist, album, title, genre, albumartist, date, file)
+    VALUES (new.id, new.artist, new.album, new.title, new.genre, new.albumartist, new.date, new.file);
+END;
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+# === Shared data ===
+conn = None
+db_lock = threading.Lock()
+sync_lock = threading.Lock()
+watcher_started = False
+index_stats = {"syncs": 0, "added": 0, "updated": 0, "removed": 0, "last_sync_ms": None, "queries": 0, "query_total": 0.0,
+               "suggests": 0, "cancelled": 0}
+debug = False
+
+def configure(db_path=None, host=None, port=None, debug_flag=False):
+    global DB_PATH, MPD_HOST, MPD_PORT, debug
+    if db_path:
+        DB_PATH = Path(db_path)
+    if host:
+        MPD_HOST = host
+    if port:
+        MPD_PORT = port
+    debug = debug_flag
+
+def open_index():
+    global conn
+    with db_lock:
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < INDEX_VERSION:
+            # Table FTS et triggers recréés (options ou colonnes modifiées) puis reconstruits depuis tracks, sans repasser par MPD
+            for trigger in ("tracks_ai", "tracks_ad", "tracks_au"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.execute("DROP TABLE IF EXISTS tracks_fts")
+        conn.executescript(SCHEMA)
+        if version < INDEX_VERSION:
+            with conn:
+                conn.execute("INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')")
+                conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    return conn
+
+def get_meta(name):
+    open_index()
+    with db_lock:
+        row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+def set_meta(name, value):
+    conn.execute("INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value=excluded.value",
+                 (name, value))
+
+def ready():
+    # Construit au moins une fois (sinon la recherche repasse par MPD)
+    return get_meta("db_update") is not None
+
+def tag_value(value):
+    # Tags multiples (liste) réunis comme dans group_search_results()
+    if isinstance(value, list):
+        return ", ".join(v for v in value if isinstance(v, str)).strip()
+    return str(value).strip() if value is not None else ""
+
+def connect():
+    client = MPDClient()
+    client.timeout = 60
+    client.connect(MPD_HOST, MPD_PORT)
+    return client
+
+def walk(client, path, depth):
+    # Chansons de path: listallinfo à SCAN_DEPTH, lsinfo au-dessus (un appel MPD par dossier)
+    if depth >= SCAN_DEPTH:
+        yield from (item for item in client.listallinfo(path) if "file" in item)
+        return
+    for item in client.lsinfo(path):
+        if "file" in item:
+            yield item
+        elif "directory" in item:
+            yield from walk(client, item["directory"], depth + 1)
+
+def sync(force=False):
+    # Synchronisation incrémentale: seules les pistes nouvelles ou modifiées (last-modified) sont réécrites
+    with sync_lock:
+        open_index()
+        start = time.perf_counter()
+        client = connect()
+        try:
+            stamp = client.stats().get("db_update")
+            if not force and stamp is not None and stamp == get_meta("db_update"):
+                return False
+            with db_lock:
+                known = dict(conn.execute("SELECT file, last_modified FROM tracks"))
+            seen = set()
+            batch = []
+            counts = {"added": 0, "updated": 0, "removed": 0}
+            for song in walk(client, "", 0):
+                path = song["file"]
+                seen.add(path)
+                modified = song.get("last-modified")
+                if path in known and known[path] == modified:
+                    continue
+                counts["updated" if path in known else "added"] += 1
+                batch.append(tuple(tag_value(song.get(tag)) for tag in TAGS) + (modified,))
+                if len(batch) >= BATCH_SIZE:
+                    write_batch(batch)
+                    batch = []
+            write_batch(batch)
+        finally:
+            try:
+                client.close()
+                client.disconnect()
+            except Exception:
+                pass
+        removed = [(path,) for path in known if path not in seen]
+        with db_lock, conn:
+            conn.executemany("DELETE FROM tracks WHERE file = ?", removed)
+            set_meta("db_update", stamp or str(int(time.time())))
+        counts["removed"] = len(removed)
+        index_stats["syncs"] += 1
+        for name, value in counts.items():
+            index_stats[name] += value
+        index_stats["last_sync_ms"] = (time.perf_counter() - start) * 1000
+        if debug:
+            print(f"[library_index] sync {counts} in {index_stats['last_sync_ms']:.0f}ms")
+        return True
+
+def write_batch(rows):
+    if not rows:
+        return
+    columns = ", ".join(TAGS)
+    updates = ", ".join(f"{tag}=excluded.{tag}" for tag in TAGS[1:])
+    with db_lock, conn:
+        conn.executemany(
+            f"""INSERT INTO tracks ({columns}, last_modified) VALUES ({", ".join("?" * (len(TAGS) + 1))})
+                ON CONFLICT(file) DO UPDATE SET {updates}, last_modified=excluded.last_modified""",
+            rows
+        )
+
+def match_expression(text, tag=None):
+    # Chaque mot en préfixe ("beat" trouve "Beatles"), limité au champ demandé sauf pour "any"
+    words = re.findall(r"\w+", text.casefold())
+    if not words:
+        return None
+    expr = " AND ".join(f'"{word}"*' for word in words)
+    return f"{tag} : ({expr})" if tag in TAG_FIELDS else expr
+
+def search(text, tag=None, limit=MAX_RESULTS):
+    # (lignes au format des chansons MPD (dict de tags), meilleur score bm25 d'abord; True si coupées à limit)
+    expr = match_expression(text, tag)
+    if expr is None:
+        return [], False
+    open_index()
+    start = time.perf_counter()
+    weights = [FIELD_WEIGHTS[field] for field in FIELDS]
+    with db_lock:
+        # Une ligne de plus que la limite: signale la troncature sans compter toutes les correspondances
+        rows = conn.execute(
+            f"""SELECT {", ".join("t." + tag_name for tag_name in TAGS)} FROM tracks_fts
+                JOIN tracks t ON t.id = tracks_fts.rowid
+                WHERE tracks_fts MATCH ? ORDER BY bm25(tracks_fts, {", ".join("?" * len(weights))}) LIMIT ?""",
+            (expr, *weights, limit + 1)
+        ).fetchall()
+    index_stats["queries"] += 1
+    index_stats["query_total"] += time.perf_counter() - start
+    truncated = len(rows) > limit
+    return [{name: value for name, value in zip(TAGS, row) if value} for row in rows[:limit]], truncated
+
+def suggest(text, tag=None, limit=3, is_stale=None):
+    # Recherche pendant la saisie: (nombre de pistes, meilleures correspondances), None si annulée
+    expr = match_expression(text, tag)
+    if expr is None:
+        return 0, []
+    open_index()
+    # Libellé selon le mode: valeurs distinctes du champ cherché, "titre - artiste" sinon
+    field = tag if tag in ("artist", "album", "genre") else "title"
+    label = f"t.{field}" if field != "title" else "t.title || ' - ' || t.artist"
+    weights = [FIELD_WEIGHTS[name] for name in FIELDS]
+    start = time.perf_counter()
+    with db_lock:
+        if is_stale:
+            conn.set_progress_handler(lambda: 1 if is_stale() else 0, CANCEL_CHECK_STEPS)
+        try:
+            total = conn.execute("SELECT COUNT(*) FROM tracks_fts WHERE tracks_fts MATCH ?", (expr,)).fetchone()[0]
+            rows = conn.execute(
+                f"""SELECT label FROM (
+                        SELECT {label} AS label, bm25(tracks_fts, {", ".join("?" * len(weights))}) AS score FROM tracks_fts
+                        JOIN tracks t ON t.id = tracks_fts.rowid
+                        WHERE tracks_fts MATCH ? ORDER BY score LIMIT ?)
+                    WHERE label != '' GROUP BY label ORDER BY MIN(score) LIMIT ?""",
+                (*weights, expr, SUGGEST_POOL, limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            if "interrupt" not in str(e):
+                raise
+            index_stats["cancelled"] += 1
+            return None
+        finally:
+            if is_stale:
+                conn.set_progress_handler(None, 0)
+    index_stats["suggests"] += 1
+    index_stats["query_total"] += time.perf_counter() - start
+    return total, [row[0] for row in rows]
+
+def watch():
+    # Connexion dédiée en attente de "idle database" (fin de mise à jour MPD), synchronisation à chaque événement
+    while True:
+        client = None
+        try:
+            sync()
+            client = MPDClient()
+            client.timeout = None
+            client.connect(MPD_HOST, MPD_PORT)
+            while True:
+                if "database" in client.idle("database"):
+                    sync()
+        except Exception as e:
+            print(f"error library index: {e}")
+        finally:
+            if client is not None:
+                try:
+                    client.disconnect()
+                except Exception:
+                    pass
+        time.sleep(RETRY_DELAY)
+
+def start():
+    global watcher_started
+    with db_lock:
+        if watcher_started:
+            return
+        watcher_started = True
+    threading.Thread(target=watch, daemon=True).start()
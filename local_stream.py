@@ -0,0 +1,760 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import os
+import re
+import time
+import threading
+import itertools
+import subprocess
+import http.server
+
+# Serveur persistant sur :8080: MPD reste connecté, seule la source ffmpeg change entre les pistes
+PORT = 8080
+STREAM_PATH = "/stream.mp3"
+SWITCH_TIMEOUT = 20
+PRESPAWN = 0
+
+# Tampon circulaire par source: ffmpeg le remplit d'avance, le handler envoie par gros blocs
+BUFFER_SIZE = 512 * 1024
+PREROLL = 64 * 1024
+PREROLL_TIMEOUT = 5
+WRITE_SIZE = 64 * 1024
+MIN_WRITE = 16 * 1024
+WRITE_WAIT = 0.25
+# Métadonnées ICY (titre dans le flux, pour les clients qui envoient Icy-MetaData: 1)
+ICY_METAINT = 16000
+ICY_NAME = "Local Stream"
+# Plusieurs clients: le plus lent est décroché s'il n'a rien consommé depuis LAG_TIMEOUT s
+# et qu'il a plus de LAG_RATIO du tampon de retard sur le plus avancé (tampon plein = régime normal sans -re)
+LAG_TIMEOUT = 2.0
+LAG_RATIO = 0.5
+# Dernier client parti: ffmpeg gardé ORPHAN_GRACE s (reconnexion de MPD après coupure réseau, seek, nouvelle sonde du format)
+ORPHAN_GRACE = 5.0
+# Normalisation du volume (transcodage mp3 seulement): mesure EBU R128 à la première lecture,
+# puis gain fixe (filtre volume) aux lectures suivantes d'après la mesure gardée dans le cache du résolveur
+LOUDNESS = False
+LOUDNESS_TARGET = -14.0
+LOUDNESS_MAX_GAIN = 6.0
+LOUDNESS_RE = re.compile(rb"^\s*I:\s+(-?\d+(?:\.\d+)?) LUFS", re.M)
+
+# Formats de sortie (type MIME) et codecs source copiés tels quels en mode passthrough
+OUTPUT_FORMATS = {"mp3": "audio/mpeg", "adts": "audio/aac", "ogg": "audio/ogg"}
+PASSTHROUGH_CODECS = (("mp4a", "adts"), ("opus", "ogg"), ("vorbis", "ogg"), ("mp3", "mp3"))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# === External hooks ===
+track_end_hook = None
+track_changed_hook = None
+next_track_hook = None
+reconnect_hook = None
+tee_hook = None
+loudness_hook = None
+debug = False
+
+# === Shared data ===
+state_cond = threading.Condition()
+current_source = None
+next_source = None
+clients = 0
+connected_format = None
+server = None
+orphan_timer = None
+stream_stats = {"underruns": 0, "bytes_sent": 0, "writes": 0, "last_fill": 0, "last_preroll": None, "fallbacks": 0,
+                "peak_clients": 0, "lagged": 0, "icy_updates": 0}
+cpu_stats = {mode: {"cpu": 0.0, "audio": 0.0, "tracks": 0}
+             for mode in ("transcode", "transcode+measure", "transcode+gain", "passthrough")}
+loudness_stats = {"measure": 0, "measured": 0, "gain": 0}
+
+def set_hooks(end_fn, changed_fn=None, next_fn=None, reconnect_fn=None, debug_flag=False):
+    global track_end_hook, track_changed_hook, next_track_hook, reconnect_hook, debug
+    track_end_hook = end_fn
+    track_changed_hook = changed_fn
+    next_track_hook = next_fn
+    reconnect_hook = reconnect_fn
+    debug = debug_flag
+
+def set_tee(open_fn):
+    # open_fn(track, format) -> objet write()/finish(complete) ou None (cache audio disque)
+    global tee_hook
+    tee_hook = open_fn
+
+def set_loudness_hook(store_fn):
+    # store_fn(track, lufs): mesure complète d'une piste, à garder pour les lectures suivantes
+    global loudness_hook
+    loudness_hook = store_fn
+
+def configure(prespawn=None, switch_timeout=None, buffer_kb=None, preroll_kb=None,
+              loudness=None, loudness_target=None, loudness_max_gain=None):
+    global PRESPAWN, SWITCH_TIMEOUT, BUFFER_SIZE, PREROLL, LOUDNESS, LOUDNESS_TARGET, LOUDNESS_MAX_GAIN
+    if prespawn is not None:
+        PRESPAWN = max(0, prespawn)
+    if switch_timeout is not None:
+        SWITCH_TIMEOUT = max(1, switch_timeout)
+    if buffer_kb is not None:
+        BUFFER_SIZE = max(64, buffer_kb) * 1024
+    if preroll_kb is not None:
+        PREROLL = max(0, preroll_kb) * 1024
+    PREROLL = min(PREROLL, BUFFER_SIZE // 2)
+    if loudness is not None:
+        LOUDNESS = loudness
+    if loudness_target is not None:
+        LOUDNESS_TARGET = loudness_target
+    if loudness_max_gain is not None:
+        LOUDNESS_MAX_GAIN = max(0.0, loudness_max_gain)
+
+def output_format(track):
+    # Piste en cache disque: envoyée telle quelle, sans ffmpeg
+    if track.get("file"):
+        return track["format"], "disk"
+    # Remux sans réencodage si le profil l'autorise et que MPD sait décoder le codec source
+    if track.get("passthrough"):
+        codec = (track.get("acodec") or "").lower()
+        for prefix, fmt in PASSTHROUGH_CODECS:
+            if codec.startswith(prefix):
+                return fmt, "passthrough"
+    return "mp3", "transcode"
+
+def loudness_stage(track, mode):
+    # "gain" si la piste a déjà été mesurée, "measure" sinon (piste entière seulement), None hors transcodage
+    if not LOUDNESS or mode != "transcode":
+        return None
+    if track.get("loudness") is not None:
+        return "gain"
+    return None if track.get("start") else "measure"
+
+def loudness_gain(loudness):
+    # Gain positif plafonné: pas de limiteur, une piste très basse resterait sinon à la limite de l'écrêtage
+    return min(LOUDNESS_TARGET - loudness, LOUDNESS_MAX_GAIN)
+
+def encoder_command(track, fmt, mode, stage=None):
+    # Pas de -re: la cadence vient du tampon plein (ffmpeg bloque tant que MPD n'a pas consommé)
+    cmd = [
+        "ffmpeg",
+        "-fflags", "+discardcorrupt",
+        "-reconnect", "1",
+        "-reconnect_streamed", "1",
+        "-reconnect_delay_max", "2",
+    ]
+    if stage == "measure":
+        # Seul le résumé de fin (loudness intégrée) est lu sur stderr
+        cmd += ["-hide_banner", "-nostats"]
+    if track.get("start"):
+        # Reprise en cours de piste (redémarrage du service)
+        cmd += ["-ss", f"{track['start']:.1f}"]
+    cmd += [
+        "-i", track["url"],
+        "-vn",
+    ]
+    if mode == "passthrough":
+        cmd += ["-c:a", "copy"]
+    else:
+        # Format fixe: les pistes s'enchaînent dans un seul flux mp3
+        cmd += ["-c:a", "libmp3lame", "-b:a", track["bitrate"], "-ar", "44100", "-ac", "2"]
+        if stage == "measure":
+            cmd += ["-af", "ebur128=framelog=quiet"]
+        elif stage == "gain":
+            cmd += ["-af", f"volume={loudness_gain(track['loudness']):.1f}dB"]
+    if fmt == "mp3":
+        # Sans en-tête ID3/Xing en tête de chaque piste
+        cmd += ["-write_xing", "0", "-id3v2_version", "0"]
+    return cmd + ["-f", fmt, "-"]
+
+def byte_rate(bitrate):
+    value = str(bitrate).lower()
+    try:
+        return float(value[:-1]) * 1000 / 8 if value.endswith("k") else float(value) / 8
+    except ValueError:
+        return 16000
+
+def process_cpu_time(pid):
+    # utime + stime (champs 14 et 15 de /proc/<pid>/stat), lisible tant que le processus n'est pas récupéré
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RingBuffer:
+    # Positions absolues (octets écrits depuis le début): write_pos - capacity = plus ancien octet disponible
+    # Un curseur par client; read_pos = curseur le plus en retard (la place n'est libérée qu'après lui)
+    def __init__(self, capacity):
+        self.buf = bytearray(capacity)
+        self.view = memoryview(self.buf)
+        self.capacity = capacity
+        self.write_pos = 0
+        self.read_pos = 0
+        self.cursors = {}
+        self.released_at = {}
+        self.cursor_ids = itertools.count()
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def attach(self):
+        # Nouveau client: démarre au niveau du plus en retard (même audio que les autres clients)
+        with self.cond:
+            cursor = next(self.cursor_ids)
+            self.cursors[cursor] = self.read_pos
+            self.released_at[cursor] = time.monotonic()
+            return cursor
+
+    def detach(self, cursor):
+        with self.cond:
+            self.released_at.pop(cursor, None)
+            if self.cursors.pop(cursor, None) is not None and self.cursors:
+                self.read_pos = min(self.cursors.values())
+                self.cond.notify_all()
+
+    def has_space(self):
+        return self.closed or self.write_pos - self.read_pos < self.capacity
+
+    def drop_laggard(self):
+        # Client bloqué (pause, réseau): il saute au niveau du suivant au lieu de geler tous les autres.
+        # Seulement s'il ne consomme plus et traîne loin derrière: des clients au même rythme ne sont jamais décrochés
+        slowest = min(self.cursors, key=self.cursors.get)
+        others = [pos for cursor, pos in self.cursors.items() if cursor != slowest]
+        if time.monotonic() - self.released_at.get(slowest, 0) < LAG_TIMEOUT:
+            return
+        if max(others) - self.cursors[slowest] < self.capacity * LAG_RATIO:
+            return
+        self.cursors[slowest] = min(others)
+        self.read_pos = min(self.cursors.values())
+        stream_stats["lagged"] += 1
+        if debug:
+            print(f"[local_stream] slow client {slowest} skipped ahead")
+
+    def fill(self):
+        with self.cond:
+            return self.write_pos - self.read_pos
+
+    def fill_from(self, fileobj):
+        # Lecture directe de la sortie ffmpeg dans la zone libre (pas de copie intermédiaire)
+        # Renvoie la zone écrite (valable jusqu'au prochain appel) ou None en fin de source
+        with self.cond:
+            while not self.cond.wait_for(self.has_space, LAG_TIMEOUT):
+                if len(self.cursors) > 1:
+                    self.drop_laggard()
+            if self.closed:
+                return None
+            start = self.write_pos % self.capacity
+            free = self.capacity - (self.write_pos - self.read_pos)
+            size = min(free, self.capacity - start)
+        try:
+            n = fileobj.readinto(self.view[start:start + size])
+        except (ValueError, OSError):
+            n = 0
+        if not n:
+            return None
+        with self.cond:
+            self.write_pos += n
+            self.cond.notify_all()
+        return self.view[start:start + n]
+
+    def wait_fill(self, size, timeout):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.closed or self.write_pos - self.read_pos >= size, timeout)
+
+    def read(self, pos, max_bytes, min_bytes, timeout):
+        # Renvoie (segments, nouvelle position); segments None = fin de source
+        # Segments copiés sous verrou: un curseur décroché pendant l'envoi ne peut plus voir sa zone réécrite
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or self.write_pos - pos >= min_bytes, timeout)
+            pos = max(pos, self.write_pos - self.capacity)
+            size = min(max_bytes, self.write_pos - pos)
+            if size <= 0:
+                return (None if self.closed else []), pos
+            start = pos % self.capacity
+            first = min(size, self.capacity - start)
+            segments = [bytes(self.view[start:start + first])]
+            if size > first:
+                segments.append(bytes(self.view[0:size - first]))
+        return segments, pos + size
+
+    def release(self, cursor, pos):
+        with self.cond:
+            if cursor not in self.cursors:
+                return
+            self.released_at[cursor] = time.monotonic()
+            if pos <= self.cursors[cursor]:
+                return
+            self.cursors[cursor] = pos
+            read_pos = min(self.cursors.values())
+            if read_pos > self.read_pos:
+                self.read_pos = read_pos
+                self.cond.notify_all()
+
+    def position(self, cursor):
+        with self.cond:
+            return self.cursors.get(cursor, self.read_pos)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class Source:
+    def __init__(self, track):
+        self.track = track
+        self.format, self.mode = output_format(track)
+        self.bytes_sent = 0
+        self.prerolled = False
+        self.underruns = 0
+        self.prespawn_checked = False
+        self.cpu_recorded = False
+        self.spawned_at = time.monotonic()
+        self.ring = RingBuffer(BUFFER_SIZE)
+        self.proc = None
+        self.tee = None
+        self.loudness = None
+        self.measured = None
+        self.measure_thread = None
+        self.trace = track.get("trace")
+        self.first_byte_sent = False
+        self.spawn()
+        threading.Thread(target=self.pump, daemon=True).start()
+
+    def spawn(self):
+        if self.mode == "disk":
+            self.output = open(self.track["file"], "rb")
+            size, duration = self.track.get("size"), self.track.get("duration")
+            self.byte_rate = size / duration if size and duration else byte_rate(self.track.get("bitrate", "128k"))
+            if self.track.get("start"):
+                # Débit constant: position approchée en octets, le décodeur se recale sur la trame suivante
+                self.output.seek(int(self.track["start"] * self.byte_rate))
+            if self.trace:
+                self.trace.mark("source_opened")
+            if debug:
+                print(f"[local_stream] playing from disk cache: {self.track.get('title')}")
+            return
+        if self.mode == "passthrough" and self.track.get("abr"):
+            self.byte_rate = float(self.track["abr"]) * 1000 / 8
+        else:
+            self.byte_rate = byte_rate(self.track.get("bitrate", "128k"))
+        self.loudness = loudness_stage(self.track, self.mode)
+        if self.loudness:
+            loudness_stats[self.loudness] += 1
+        # Piste reprise en cours de route: incomplète, pas de copie en cache
+        # Passe de mesure non normalisée: pas de copie non plus, la lecture suivante (gain appliqué) sera mise en cache
+        if tee_hook and not self.track.get("start") and self.loudness != "measure":
+            try:
+                self.tee = tee_hook(self.track, self.format)
+            except Exception as e:
+                print(f"error local_stream tee: {e}")
+        measure = self.loudness == "measure"
+        self.proc = subprocess.Popen(encoder_command(self.track, self.format, self.mode, self.loudness),
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE if measure else subprocess.DEVNULL,
+                                     bufsize=0)
+        self.output = self.proc.stdout
+        if measure:
+            self.measure_thread = threading.Thread(target=self.read_loudness, args=(self.proc,), daemon=True)
+            self.measure_thread.start()
+        if self.trace:
+            self.trace.mark("source_opened")
+        if debug:
+            print(f"[local_stream] ffmpeg {self.mode} ({self.format}) started for: {self.track.get('title')}")
+
+    def pump(self):
+        while True:
+            while True:
+                region = self.ring.fill_from(self.output)
+                if region is None:
+                    break
+                if self.tee:
+                    self.write_tee(region)
+            if self.mode == "passthrough" and self.ring.write_pos == 0 and not self.ring.closed:
+                # Remux refusé (codec ou conteneur): repli sur l'encodage mp3
+                self.proc.wait()
+                self.finish_tee(False)
+                self.mode, self.format = "transcode", "mp3"
+                stream_stats["fallbacks"] += 1
+                if debug:
+                    print("[local_stream] passthrough failed, falling back to transcode")
+                self.spawn()
+                continue
+            break
+        # Piste complète seulement si la fin vient de la source (pas d'un arrêt) et que ffmpeg a réussi
+        complete = not self.ring.closed
+        if complete and self.proc is not None:
+            self.record_cpu()
+            complete = self.proc.wait() == 0
+        if complete and self.loudness == "measure":
+            self.store_loudness()
+        self.finish_tee(complete)
+        self.ring.close()
+
+    def read_loudness(self, proc):
+        # stderr lu jusqu'au bout (sinon ffmpeg bloquerait), le résumé ebur128 arrive à la fin
+        try:
+            output = proc.stderr.read()
+        except (OSError, ValueError):
+            return
+        found = LOUDNESS_RE.findall(output)
+        if found:
+            self.measured = float(found[-1])
+
+    def store_loudness(self):
+        self.measure_thread.join(timeout=2)
+        # Silence complet: -70 LUFS (seuil de la mesure), pas de gain à en tirer
+        if self.measured is None or self.measured <= -70:
+            return
+        loudness_stats["measured"] += 1
+        if debug:
+            print(f"[local_stream] loudness {self.measured:.1f} LUFS: {self.track.get('title')}")
+        if loudness_hook:
+            try:
+                loudness_hook(self.track, self.measured)
+            except Exception as e:
+                print(f"error local_stream loudness: {e}")
+
+    def write_tee(self, region):
+        try:
+            self.tee.write(region)
+        except Exception as e:
+            print(f"error local_stream tee: {e}")
+            self.finish_tee(False)
+
+    def finish_tee(self, complete):
+        tee, self.tee = self.tee, None
+        if tee:
+            try:
+                tee.finish(complete)
+            except Exception as e:
+                print(f"error local_stream tee: {e}")
+
+    def elapsed(self):
+        # Position dans la piste, d'après les octets envoyés (débit constant)
+        return self.track.get("start", 0) + self.bytes_sent / self.byte_rate
+
+    def record_cpu(self):
+        if self.cpu_recorded or self.proc is None:
+            return
+        self.cpu_recorded = True
+        cpu = process_cpu_time(self.proc.pid)
+        if cpu is None:
+            return
+        mode = f"{self.mode}+{self.loudness}" if self.loudness else self.mode
+        stats = cpu_stats[mode]
+        stats["cpu"] += cpu
+        stats["audio"] += self.ring.write_pos / self.byte_rate
+        stats["tracks"] += 1
+        if debug:
+            print(f"[local_stream] {mode}: {cpu:.1f}s cpu for {self.ring.write_pos / self.byte_rate:.0f}s of audio")
+
+    def stop(self):
+        self.ring.close()
+        self.record_cpu()
+        if self.proc is None:
+            self.output.close()
+            return
+        if self.proc.poll() is None:
+            try:
+                self.proc.terminate()
+                self.proc.wait(timeout=4)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait(timeout=2)
+            except Exception as e:
+                print(f"error local_stream ffmpeg stop: {e}")
+        try:
+            self.proc.stdout.close()
+        except Exception:
+            pass
+
+def run_hook(hook, *args):
+    if hook:
+        threading.Thread(target=hook, args=args, daemon=True).start()
+
+# === Changement de source ===
+def play(track):
+    # Renvoie True si MPD est déjà connecté au même format: la piste enchaîne sans rechargement
+    global current_source, next_source
+    with state_cond:
+        same = next_source and (next_source.track.get("url"), next_source.track.get("file")) == (track.get("url"), track.get("file"))
+        prepared = next_source if same else None
+    new = prepared or Source(track)
+    with state_cond:
+        old, current_source = current_source, new
+        stale_next, next_source = next_source, None
+        handoff = clients > 0 and connected_format == new.format
+        state_cond.notify_all()
+    for source in (old, stale_next):
+        if source and source is not new:
+            source.stop()
+    return handoff
+
+def schedule_orphan_stop(source):
+    global orphan_timer
+    with state_cond:
+        if orphan_timer is not None:
+            orphan_timer.cancel()
+        orphan_timer = threading.Timer(ORPHAN_GRACE, stop_orphan, args=(source,))
+        orphan_timer.daemon = True
+        orphan_timer.start()
+
+def cancel_orphan_stop():
+    global orphan_timer
+    with state_cond:
+        if orphan_timer is not None:
+            orphan_timer.cancel()
+            orphan_timer = None
+
+def stop_orphan(source):
+    global orphan_timer
+    with state_cond:
+        orphan_timer = None
+        # Un client est revenu, ou la piste a changé entre-temps
+        if clients or source is not current_source:
+            return
+    if debug:
+        print("[local_stream] no client came back, stopping source")
+    stop_source()
+
+def stop_source():
+    global current_source, next_source
+    with state_cond:
+        old, stale_next = current_source, next_source
+        current_source = next_source = None
+        state_cond.notify_all()
+    for source in (old, stale_next):
+        if source:
+            source.stop()
+
+def is_client_connected():
+    with state_cond:
+        return clients > 0
+
+def icy_title(track):
+    # title vient du résolveur, déjà sous la forme "Artiste - Titre"
+    return track.get("title") or track.get("query") or ICY_NAME
+
+def icy_block(title):
+    # Bloc ICY: 1 octet de longueur (x16) puis StreamTitle='...'; complété par des zéros
+    text = title.replace("';", "'").encode("utf-8")[:4000]
+    payload = b"StreamTitle='" + text + b"';"
+    blocks = (len(payload) + 15) // 16
+    return bytes([blocks]) + payload.ljust(blocks * 16, b"\0")
+
+def current_elapsed():
+    with state_cond:
+        source = current_source
+    return source.elapsed() if source else None
+
+def maybe_prespawn(source):
+    # Lance le ffmpeg suivant PRESPAWN secondes avant la fin: il est prêt quand la piste se termine
+    duration = source.track.get("duration")
+    if source.prespawn_checked or not PRESPAWN or not duration or not next_track_hook:
+        return
+    if source.elapsed() < duration - PRESPAWN:
+        return
+    source.prespawn_checked = True
+
+    def prespawn():
+        global next_source
+        track = next_track_hook()
+        if not track:
+            return
+        prepared = Source(track)
+        with state_cond:
+            if current_source is source and next_source is None:
+                next_source = prepared
+                prepared = None
+        if prepared:
+            prepared.stop()
+        elif debug:
+            print(f"[local_stream] next track ready: {track.get('title')}")
+    threading.Thread(target=prespawn, daemon=True).start()
+
+def source_ended(source):
+    global current_source, next_source
+    with state_cond:
+        if source is not current_source:
+            return
+        promoted, next_source = next_source, None
+        current_source = promoted
+        state_cond.notify_all()
+    source.stop()
+    if promoted:
+        run_hook(track_changed_hook, promoted.track)
+    else:
+        run_hook(track_end_hook, source.track)
+
+class StreamHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        if debug:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        global clients
+        if self.path != STREAM_PATH:
+            self.send_error(404)
+            return
+        cancel_orphan_stop()
+        with state_cond:
+            clients += 1
+            stream_stats["peak_clients"] = max(stream_stats["peak_clients"], clients)
+            if current_source and current_source.trace:
+                current_source.trace.mark("client_connected")
+        self.source = None
+        self.cursor = None
+        self.format = None
+        self.stalled = False
+        self.icy_interval = ICY_METAINT if self.headers.get("Icy-MetaData") == "1" else 0
+        self.icy_left = self.icy_interval
+        self.icy_sent = None
+        try:
+            self.stream_loop()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            if debug:
+                print(f"[local_stream] client disconnected: {e}")
+        finally:
+            self.leave_source()
+            with state_cond:
+                clients -= 1
+                orphan = clients == 0 and self.source is not None and self.source is current_source
+            # Plus personne n'écoute (MPD arrêté ou autre source): ffmpeg coupé si personne ne revient
+            if orphan:
+                schedule_orphan_stop(self.source)
+
+    def send_stream_headers(self, fmt):
+        global connected_format
+        self.format = connected_format = fmt
+        self.send_response(200)
+        self.send_header("Content-Type", OUTPUT_FORMATS[fmt])
+        if self.icy_interval:
+            self.send_header("icy-metaint", str(self.icy_interval))
+            self.send_header("icy-name", ICY_NAME)
+        self.end_headers()
+
+    def write_audio(self, data):
+        if not self.icy_interval:
+            self.wfile.write(data)
+            return
+        # Bloc de métadonnées tous les icy_interval octets d'audio; titre renvoyé seulement s'il a changé
+        while len(data):
+            n = min(len(data), self.icy_left)
+            self.wfile.write(data[:n])
+            data = data[n:]
+            self.icy_left -= n
+            if self.icy_left == 0:
+                title = icy_title(self.source.track)
+                if title != self.icy_sent:
+                    self.icy_sent = title
+                    self.wfile.write(icy_block(title))
+                    stream_stats["icy_updates"] += 1
+                else:
+                    self.wfile.write(b"\0")
+                self.icy_left = self.icy_interval
+
+    def leave_source(self):
+        if self.source is not None and self.cursor is not None:
+            self.source.ring.detach(self.cursor)
+        self.cursor = None
+
+    def stream_loop(self):
+        # Tous les clients lisent la même source (un seul ffmpeg par piste), chacun avec son curseur
+        while True:
+            with state_cond:
+                if current_source is None:
+                    if not state_cond.wait_for(lambda: current_source is not None, SWITCH_TIMEOUT):
+                        if debug:
+                            print("[local_stream] no source, closing stream")
+                        if self.format is None:
+                            self.send_error(503)
+                        return
+                source = current_source
+                if self.format is not None and source.format != self.format:
+                    # Changement de conteneur (mp3 <-> remux): MPD doit rouvrir le flux
+                    self.leave_source()
+                    self.source = None
+                    run_hook(reconnect_hook)
+                    return
+                if source is not self.source:
+                    self.leave_source()
+                    self.source = source
+                    self.cursor = source.ring.attach()
+            if not source.prerolled:
+                source.ring.wait_fill(PREROLL, PREROLL_TIMEOUT)
+                source.prerolled = True
+                stream_stats["last_preroll"] = time.monotonic() - source.spawned_at
+                if source.trace:
+                    source.trace.mark("preroll_ready")
+                if debug:
+                    print(f"[local_stream] pre-roll {source.ring.fill() // 1024}KB in {stream_stats['last_preroll']:.2f}s")
+            if self.format is None:
+                # En-têtes après le pre-roll: le format est alors définitif (repli éventuel fait)
+                self.send_stream_headers(source.format)
+            start = source.ring.position(self.cursor)
+            segments, pos = source.ring.read(start, WRITE_SIZE, MIN_WRITE, WRITE_WAIT)
+            if segments is None:
+                # Le premier client arrivé au bout fait avancer la file, les autres suivent
+                source_ended(source)
+                continue
+            if not segments:
+                # Tampon vide alors que la source tourne: sous-alimentation (une fois par coupure)
+                if not self.stalled:
+                    self.stalled = True
+                    source.underruns += 1
+                    stream_stats["underruns"] += 1
+                continue
+            self.stalled = False
+            for segment in segments:
+                self.write_audio(segment)
+                stream_stats["writes"] += 1
+            if not source.first_byte_sent:
+                source.first_byte_sent = True
+                if source.trace:
+                    source.trace.mark("first_byte")
+            sent = pos - start
+            source.ring.release(self.cursor, pos)
+            # Position de lecture: le client le plus avancé
+            source.bytes_sent = max(source.bytes_sent, pos)
+            stream_stats["bytes_sent"] += sent
+            stream_stats["last_fill"] = source.ring.fill()
+            maybe_prespawn(source)
+
+class StreamServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def start_server():
+    global server
+    with state_cond:
+        if server is not None:
+            return server
+        server = StreamServer(("0.0.0.0", PORT), StreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if debug:
+        print(f"[local_stream] listening on :{PORT}")
+    return server
+
+def buffer_status():
+    with state_cond:
+        source = current_source
+    if source is None:
+        return None
+    fill = source.ring.fill()
+    return {"fill": fill, "fill_pct": fill * 100 // source.ring.capacity,
+            "seconds": fill / source.byte_rate, "underruns": source.underruns}
+
+def stats_line():
+    status = buffer_status()
+    fill = f"{status['fill_pct']}% ({status['seconds']:.0f}s)" if status else "-"
+    return (f"stream: buf {fill} clients {clients}/{stream_stats['peak_clients']} "
+            f"underruns {stream_stats['underruns']} lagged {stream_stats['lagged']}")
+
+def cpu_line():
+    parts = []
+    for mode, stats in cpu_stats.items():
+        if stats["audio"]:
+            parts.append(f"{mode} {stats['cpu'] * 100 / stats['audio']:.1f}%")
+    return "ffmpeg cpu: " + (", ".join(parts) if parts else "-")
+
+def loudness_line():
+    # Taux de réussite du cache: lectures avec gain déjà connu / lectures normalisées
+    if not LOUDNESS:
+        return "loudness: off"
+    played = loudness_stats["gain"] + loudness_stats["measure"]
+    hit = f"{loudness_stats['gain'] * 100 / played:.0f}%" if played else "-"
+    return (f"loudness: {LOUDNESS_TARGET:g} LUFS hit {hit} gain {loudness_stats['gain']} "
+            f"measured {loudness_stats['measured']}/{loudness_stats['measure']}")
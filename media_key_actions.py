@@ -1,153 +1,233 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-3.0-or-later
 # Copyright 2025 MoodeOled project / Benoit Toufflet
-import subprocess
-import requests
+import os
+import sys
 import time
-import dis
-import re
+import shlex
+import subprocess
+import configparser
+from pathlib import Path
+
+from mpd_dispatcher import mpd_command, moode_command, seek_relative, load_playlist_and_play, system_power, change_volume, dispatch_call
+
+CONFIG_PATH = Path.home() / "MoodeOled" / "config.ini"
+SCREEN_NAME = Path(sys.argv[0]).stem
+RELOAD_CHECK_INTERVAL = 2.0
 
 # Dépendances globales injectables (via set_hooks)
 show_message = None
 next_stream = None
 previous_stream = None
 set_stream_manual_stop = None
+show_volume = None
 
-def set_hooks(show_fn, next_fn=None, prev_fn=None, stop_flag_fn=None):
-    global show_message, next_stream, previous_stream, set_stream_manual_stop
+def set_hooks(show_fn, next_fn=None, prev_fn=None, stop_flag_fn=None, volume_fn=None):
+    global show_message, next_stream, previous_stream, set_stream_manual_stop, show_volume
     show_message = show_fn
     next_stream = next_fn
     previous_stream = prev_fn
     set_stream_manual_stop = stop_flag_fn
+    show_volume = volume_fn
 
+def step_volume(step):
+    target = change_volume(step)
+    if target is not None and show_volume:
+        show_volume(target)
 
-def handle_audio_keys(key, final_code, menu_context_flag=""):
-    if key in ("KEY_PLAY", "KEY_PAUSE"):
-        if final_code >= 8:
-            show_message("info_poweroff")
-            if menu_context_flag == "local_stream" and set_stream_manual_stop:
-                set_stream_manual_stop(manual_stop=True)
-            subprocess.run("mpc stop && sudo systemctl stop nginx && sudo poweroff", shell=True, check=True)
-        else:
-            subprocess.run(["mpc", "toggle"], check=True)
-        return True
-    elif key == "KEY_STOP":
-        if menu_context_flag == "local_stream" and set_stream_manual_stop:
-            set_stream_manual_stop(manual_stop=True)
-        subprocess.run(["mpc", "stop"], check=True)
-        return True
-    elif key == "KEY_NEXT":
-        if menu_context_flag == "local_stream" and next_stream:
-            next_stream(manual_skip=True)
-            return True
-        if final_code >= 4:
-            subprocess.run(["mpc", "seek", "+00:00:10"], check=True)
-        else:
-            subprocess.run(["mpc", "next"], check=True)
-        return True
-    elif key == "KEY_PREVIOUS":
-        if menu_context_flag == "local_stream" and previous_stream:
-            previous_stream(manual_skip=True)
-            return True
-        if final_code >= 4:
-            subprocess.run(["mpc", "seek", "-00:00:10"], check=True)
-        else:
-            subprocess.run(["mpc", "prev"], check=True)
-        return True
-    elif key == "KEY_FORWARD":
-        if menu_context_flag == "local_stream":
-            return True
-        subprocess.run(["mpc", "seek", "+00:00:10"], check=True)
-        return True
-    elif key == "KEY_REWIND":
-        if menu_context_flag == "local_stream":
-            return True
-        subprocess.run(["mpc", "seek", "-00:00:10"], check=True)
-        return True
-    elif key == "KEY_VOLUMEUP":
-        try:
-            requests.get("http://127.0.0.1/command/?cmd=set_volume+up+2")
-        except requests.RequestException:
-            pass
-        return True
-    elif key == "KEY_VOLUMEDOWN":
-        try:
-            requests.get("http://127.0.0.1/command/?cmd=set_volume+dn+2")
-        except requests.RequestException:
-            pass
-        return True
-    elif key == "KEY_MUTE":
-        try:
-            requests.get("http://127.0.0.1/command/?cmd=set_volume+mute")
-        except requests.RequestException:
-            pass
-        return True
-    return False
+def stop_local_stream(context):
+    if context == "local_stream" and set_stream_manual_stop:
+        set_stream_manual_stop(manual_stop=True)
 
+# === Actions intégrées (touches multimédia) ===
+def act_play_pause(final_code, context):
+    if final_code >= 8:
+        show_message("info_poweroff")
+        stop_local_stream(context)
+        system_power("poweroff")
+    else:
+        mpd_command("toggle")
 
-def handle_custom_key(key, final_code, menu_context_flag=""):
+def act_stop(final_code, context):
+    stop_local_stream(context)
+    mpd_command("stop")
+
+def act_next(final_code, context):
+    if context == "local_stream" and next_stream:
+        next_stream(manual_skip=True)
+    elif final_code >= 4:
+        seek_relative(10)
+    else:
+        mpd_command("next")
+
+def act_previous(final_code, context):
+    if context == "local_stream" and previous_stream:
+        previous_stream(manual_skip=True)
+    elif final_code >= 4:
+        seek_relative(-10)
+    else:
+        mpd_command("previous")
+
+def act_forward(final_code, context):
+    if context != "local_stream":
+        seek_relative(10)
+
+def act_rewind(final_code, context):
+    if context != "local_stream":
+        seek_relative(-10)
+
+BUILTIN_ACTIONS = {
+    "play_pause": act_play_pause,
+    "stop": act_stop,
+    "next": act_next,
+    "previous": act_previous,
+    "forward": act_forward,
+    "rewind": act_rewind,
+    "volume_up": lambda final_code, context: step_volume(2),
+    "volume_down": lambda final_code, context: step_volume(-2),
+    "mute": lambda final_code, context: moode_command("set_volume mute"),
+}
+
+# Correspondance par défaut, surchargeable dans la section [actions] de config.ini
+DEFAULT_ACTION_MAP = {
+    "KEY_PLAY": "builtin:play_pause",
+    "KEY_PAUSE": "builtin:play_pause",
+    "KEY_STOP": "builtin:stop",
+    "KEY_NEXT": "builtin:next",
+    "KEY_PREVIOUS": "builtin:previous",
+    "KEY_FORWARD": "builtin:forward",
+    "KEY_REWIND": "builtin:rewind",
+    "KEY_VOLUMEUP": "builtin:volume_up",
+    "KEY_VOLUMEDOWN": "builtin:volume_down",
+    "KEY_MUTE": "builtin:mute",
+}
+
+# === Actions personnalisées (type:argument) ===
+def run_shell_action(command):
+    # Via sh -c: ";", "&&", tubes, redirections et "~" fonctionnent comme dans les anciennes actions
+    try:
+        result = subprocess.run(["sh", "-c", command], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        print(f"error shell action '{command}': {e}")
+        show_message("Shell action failed")
+        return
+    if result.returncode != 0:
+        # 127: commande introuvable
+        print(f"error shell action '{command}': exit {result.returncode} {result.stderr.strip()}")
+        show_message(f"Shell action failed ({result.returncode})")
 
-    if final_code >= 4: #long press
-        if key == "KEY_YOURKEYLONG1":
-            #yourcommande.here
-            #before mpc stop/clear use this lines bellow:
-            #if menu_context_flag == "local_stream" and set_stream_manual_stop:
-            #    set_stream_manual_stop(manual_stop=True)
-            #show_message("Your Message") #you can delete this line if not needed
-            return True
-        if key == "KEY_YOURKEYLONG2":
-            #yourcommande.here
-            #before mpc stop/clear use this lines bellow:
-            #if menu_context_flag == "local_stream" and set_stream_manual_stop:
-            #    set_stream_manual_stop(manual_stop=True)
-            #show_message("Your Message") #you can delete this line if not needed
-            return True
+def run_custom_action(kind, arg, final_code, context):
+    if kind == "builtin":
+        BUILTIN_ACTIONS[arg](final_code, context)
+    elif kind == "playlist":
+        stop_local_stream(context)
+        load_playlist_and_play(arg)
+        show_message(f"Reading {arg}")
+    elif kind == "mpd":
+        parts = shlex.split(arg)
+        if parts[0] in ("stop", "clear", "load"):
+            stop_local_stream(context)
+        mpd_command(parts[0], *parts[1:])
+    elif kind == "moode":
+        moode_command(arg)
+    elif kind == "shell":
+        dispatch_call(run_shell_action, arg, queue_name="system")
+    elif kind == "message":
+        show_message(arg)
+
+ACTION_TYPES = ("builtin", "playlist", "mpd", "moode", "shell", "message")
+
+# === Table de dispatch compilée: (touche, appui, contexte) -> action ===
+dispatch_table = {}
+USED_MEDIA_KEYS = set()
+action_map_mtime = None
+last_reload_check = 0
+
+def parse_action_key(name):
+    # KEY_NAME[.short|.long][@context]
+    name, _, context = name.partition("@")
+    key, _, press = name.partition(".")
+    presses = (press.lower(),) if press else ("short", "long")
+    return key.upper(), presses, context.strip().lower()
+
+def compile_action_map(entries):
+    table = {}
+    for name, value in entries:
+        key, presses, context = parse_action_key(name.strip())
+        kind, _, arg = value.strip().partition(":")
+        kind = kind.strip().lower()
+        arg = arg.strip()
+        if kind not in ACTION_TYPES or not arg:
+            print(f"error action map: invalid action '{name} = {value}'")
+            continue
+        if kind == "builtin" and arg not in BUILTIN_ACTIONS:
+            print(f"error action map: unknown builtin '{arg}'")
+            continue
+        for press in presses:
+            if press not in ("short", "long"):
+                print(f"error action map: invalid press '{press}' for {key}")
+                continue
+            table[(key, press, context)] = (kind, arg)
+    return table
+
+def load_action_map(path=CONFIG_PATH):
+    global action_map_mtime
+    entries = list(DEFAULT_ACTION_MAP.items())
+    # Sans interpolation: un "%" dans une commande shell ne fait pas échouer la lecture
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str
+    try:
+        # mtime relevé avant la lecture: un fichier invalide n'est relu qu'une fois modifié
+        action_map_mtime = os.path.getmtime(path)
+        parser.read(path)
+        if parser.has_section("actions"):
+            entries += list(parser.items("actions"))
+    except Exception as e:
+        # Fichier illisible: table par défaut seule
+        entries = list(DEFAULT_ACTION_MAP.items())
+        print(f"error action map: {e}")
+    table = compile_action_map(entries)
+    # Mise à jour sur place: les scripts ont importé ces objets
+    dispatch_table.clear()
+    dispatch_table.update(table)
+    USED_MEDIA_KEYS.clear()
+    USED_MEDIA_KEYS.update(key for key, _, _ in table)
+
+def reload_action_map_if_changed():
+    global last_reload_check
+    now = time.monotonic()
+    if now - last_reload_check < RELOAD_CHECK_INTERVAL:
+        return
+    last_reload_check = now
+    try:
+        mtime = os.path.getmtime(CONFIG_PATH)
+    except OSError:
+        return
+    if mtime != action_map_mtime:
+        load_action_map()
+        print("Action map reloaded")
+
+def lookup_action(key, final_code, menu_context_flag=""):
+    reload_action_map_if_changed()
+    press = "long" if final_code >= 4 else "short"
+    for context in (menu_context_flag, SCREEN_NAME, ""):
+        action = dispatch_table.get((key, press, context))
+        if action:
+            return action
+    return None
+
+def handle_audio_keys(key, final_code, menu_context_flag=""):
+    action = lookup_action(key, final_code, menu_context_flag)
+    if action is None or action[0] != "builtin":
+        return False
+    BUILTIN_ACTIONS[action[1]](final_code, menu_context_flag)
+    return True
+
+def handle_custom_key(key, final_code, menu_context_flag=""):
+    action = lookup_action(key, final_code, menu_context_flag)
+    if action is None or action[0] == "builtin":
         return False
+    run_custom_action(action[0], action[1], final_code, menu_context_flag)
+    return True
 
-    if key == "KEY_YOURKEYSHORT1": #short press from now
-        #yourcommande.here
-        #before mpc stop/clear use this lines bellow:
-        #if menu_context_flag == "local_stream" and set_stream_manual_stop:
-        #    set_stream_manual_stop(manual_stop=True)
-        #show_message("Your Message") #you can delete this line if not needed
-        return True
-    elif key == "KEY_YOURKEYSHORT2":
-        #yourcommande.here
-        #before mpc stop/clear use this lines bellow:
-        #if menu_context_flag == "local_stream" and set_stream_manual_stop:
-        #    set_stream_manual_stop(manual_stop=True)
-        #show_message("Your Message") #you can delete this line if not needed
-        return True
-    elif key == "KEY_RED":
-        if menu_context_flag == "local_stream" and set_stream_manual_stop:
-            set_stream_manual_stop(manual_stop=True)
-        subprocess.run("mpc stop; mpc clear", shell=True, check=True)
-        time.sleep(1)
-        subprocess.run("mpc load Favorites; mpc play", shell=True, check=True)
-        show_message("Reading Favorites")
-        return True
-    elif key == "KEY_BLUE":
-        if menu_context_flag == "local_stream" and set_stream_manual_stop:
-            set_stream_manual_stop(manual_stop=True)
-        subprocess.run("mpc stop; mpc clear", shell=True, check=True)
-        time.sleep(1)
-        subprocess.run("mpc load 'Default Playlist'; mpc play", shell=True, check=True)
-        show_message("Reading Default Playlist")
-        return True
-    return False
-
-def extract_used_keys():
-    keys = set()
-    for func in (handle_audio_keys, handle_custom_key):
-        for instr in dis.get_instructions(func):
-            if instr.opname == "LOAD_CONST":
-                val = instr.argval
-                if isinstance(val, str) and re.match(r"^KEY_[A-Z0-9_]+$", val):
-                    keys.add(val)
-                elif isinstance(val, tuple):  # ← ajout clé ici
-                    for item in val:
-                        if isinstance(item, str) and re.match(r"^KEY_[A-Z0-9_]+$", item):
-                            keys.add(item)
-    return keys
-
-USED_MEDIA_KEYS = extract_used_keys()
+load_action_map()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import threading
+import subprocess
+import time
+import json
+import requests
+from mpd import MPDClient
+
+import action_executor
+
+MPD_HOST = "localhost"
+MPD_PORT = 6600
+MOODE_COMMAND_URL = "http://127.0.0.1/command/"
+VOLUME_WINDOW = 0.15
+VOLUME_HOLD = 1.0
+# Volume connu (relevé par reconcile_volume ou lu à l'envoi) au-delà de cet âge: relu avant la rafale suivante
+VOLUME_KNOWN_AGE = 5.0
+
+# === Shared data ===
+client = None
+client_lock = threading.RLock()
+session = requests.Session()
+
+volume_lock = threading.Lock()
+volume_state = {"known": None, "known_at": 0, "target": None, "sent": None, "delta": 0, "pending": False, "queued": False,
+                "changed_at": 0}
+
+# --- Connexion MPD persistante (reconnexion à la demande) ---
+def get_client():
+    global client
+    if client is None:
+        c = MPDClient()
+        c.timeout = 5
+        c.idletimeout = None
+        c.connect(MPD_HOST, MPD_PORT)
+        client = c
+    return client
+
+def drop_client():
+    global client
+    if client is not None:
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+    client = None
+
+def toggle_playback(c):
+    state = c.status().get("state")
+    if state == "play":
+        c.pause(1)
+    elif state == "pause":
+        c.pause(0)
+    else:
+        c.play()
+
+def run_mpd(name, *args):
+    # MPD ferme les connexions inactives: une seule nouvelle tentative après reconnexion
+    with client_lock:
+        for attempt in (1, 2):
+            try:
+                c = get_client()
+                if name == "toggle":
+                    return toggle_playback(c)
+                return getattr(c, name)(*args)
+            except Exception as e:
+                drop_client()
+                if attempt == 2:
+                    print(f"error mpd {name}: {e}")
+    return None
+
+def run_moode(cmd, timeout=2):
+    try:
+        r = session.get(MOODE_COMMAND_URL, params={"cmd": cmd}, timeout=timeout)
+        return r.text
+    except requests.RequestException as e:
+        print(f"error moode {cmd}: {e}")
+        return None
+
+# --- Commandes exécutées dans la file "transport", sans bloquer les touches ---
+def mpd_command(name, *args):
+    action_executor.submit("transport", f"mpd_{name}", run_mpd, name, *args)
+
+def moode_command(cmd):
+    action_executor.submit("transport", f"moode_{cmd.split()[0]}", run_moode, cmd)
+
+def dispatch_call(fn, *args, queue_name="transport"):
+    action_executor.submit(queue_name, getattr(fn, "__name__", "call"), fn, *args)
+
+def seek_relative(seconds):
+    mpd_command("seekcur", f"{seconds:+d}")
+
+def load_playlist_and_play(name):
+    def load_playlist():
+        run_mpd("stop")
+        run_mpd("clear")
+        run_mpd("load", name)
+        run_mpd("play")
+    dispatch_call(load_playlist)
+
+def system_power(action):
+    def power():
+        run_mpd("stop")
+        subprocess.run(["sudo", "systemctl", "stop", "nginx"])
+        subprocess.run(["sudo", action])
+    dispatch_call(power, queue_name="system")
+
+# === Volume: cumule les pas et n'envoie que la cible nette ===
+def change_volume(step):
+    with volume_lock:
+        now = time.monotonic()
+        idle = not (volume_state["pending"] or volume_state["queued"]) and now - volume_state["changed_at"] >= VOLUME_HOLD
+        if idle and now - volume_state["known_at"] >= VOLUME_KNOWN_AGE:
+            # Aucun relevé récent (navoled, queoled): le volume a pu changer ailleurs, relu à l'envoi
+            volume_state["known"] = None
+            volume_state["target"] = None
+            volume_state["sent"] = None
+        volume_state["changed_at"] = now
+        if not volume_state["pending"]:
+            volume_state["pending"] = True
+            threading.Timer(VOLUME_WINDOW, flush_volume).start()
+        base = volume_state["target"] if volume_state["target"] is not None else volume_state["known"]
+        if base is None:
+            # Volume encore inconnu: pas relatifs cumulés, convertis en cible à l'envoi
+            volume_state["delta"] += step
+            return None
+        target = max(0, min(100, base + step))
+        volume_state["target"] = target
+        return target
+
+def flush_volume():
+    with volume_lock:
+        volume_state["pending"] = False
+        if volume_state["queued"]:
+            return
+        volume_state["queued"] = True
+    dispatch_call(send_volume)
+
+def current_volume():
+    try:
+        return int(json.loads(run_moode("get_volume") or "{}").get("volume"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def send_volume():
+    # Lu au moment de l'envoi: les pas arrivés entre-temps sont inclus
+    with volume_lock:
+        volume_state["queued"] = False
+        delta, volume_state["delta"] = volume_state["delta"], 0
+        unknown = volume_state["target"] is None and volume_state["known"] is None
+    if delta and unknown:
+        # Un seul relevé du volume pour toute la rafale
+        current = current_volume()
+        if current is None:
+            run_moode(f"set_volume {'up' if delta > 0 else 'dn'} {abs(delta)}")
+            return
+        with volume_lock:
+            volume_state["known"] = current
+            volume_state["known_at"] = time.monotonic()
+    with volume_lock:
+        base = volume_state["target"] if volume_state["target"] is not None else volume_state["known"]
+        if delta and base is not None:
+            volume_state["target"] = max(0, min(100, base + delta))
+        target = volume_state["target"]
+        if target is None or target == volume_state["sent"]:
+            return
+        volume_state["sent"] = target
+    run_moode(f"set_volume {target}")
+
+def reconcile_volume(reading):
+    try:
+        value = int(reading)
+    except (TypeError, ValueError):
+        value = None
+    with volume_lock:
+        busy = volume_state["pending"] or volume_state["queued"]
+        recent = time.monotonic() - volume_state["changed_at"] < VOLUME_HOLD
+        if volume_state["target"] is not None and (busy or recent):
+            return volume_state["target"]
+        volume_state["known"] = value
+        volume_state["known_at"] = time.monotonic()
+        volume_state["target"] = None
+        volume_state["sent"] = None
+    return reading
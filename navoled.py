@@ -6,6 +6,7 @@ import sys
 import time
 import re
 import subprocess
+import threading
 import configparser
 import string
 from datetime import datetime, timedelta, timezone
@@ -14,6 +15,8 @@ from mpd import MPDClient
 from pathlib import Path
 
 import core_common as core
+import action_executor
+import library_index
 from input_manager import start_inputs, debounce_data, process_key
 from media_key_actions import handle_audio_keys, handle_custom_key, USED_MEDIA_KEYS, set_hooks as set_custom_hooks
 
@@ -148,7 +151,16 @@ accent_variants = {
     "c": ["c", "ç"],
 }
 
+USE_LIBRARY_INDEX = core.config.getboolean("manual", "library_index", fallback=True)
+# Recherche pendant la saisie (index local): nombre de pistes et meilleures correspondances sous la zone de saisie
+SEARCH_PREVIEW_DELAY = 0.3
+SEARCH_PREVIEW_MIN_CHARS = 2
+SEARCH_PREVIEW_LINES = 2
+search_preview = {"key": None, "pending": None, "generation": 0, "count": None, "lines": []}
+search_preview_timer = None
+
 mpd_results_cache = []
+mpd_results_truncated = False
 radio_results_cache = []
 radio_virtual_folder = []
 artist_virtual_folder = {}
@@ -715,41 +727,90 @@ def search_radio_titles(query):
             print(f"Radio reading error: {e}")
     return results
 
+def search_library(input_text, tag):
+    # Index local (FTS5) si construit, sinon recherche MPD directe; (résultats, True si coupés à MAX_RESULTS)
+    if USE_LIBRARY_INDEX:
+        try:
+            if library_index.ready():
+                start = time.perf_counter()
+                results, truncated = library_index.search(input_text, tag)
+                print(f"Performed index search with tag={tag} and input='{input_text}' "
+                      f"({len(results)} hits{' (truncated)' if truncated else ''}, "
+                      f"{(time.perf_counter() - start) * 1000:.0f}ms)")
+                return results, truncated
+        except Exception as e:
+            if core.DEBUG:
+                print(f"Library index search error: {e}")
+
+    client = MPDClient()
+    client.timeout = 10
+    client.connect("localhost", 6600)
+    try:
+        results = client.search(tag, input_text)
+    finally:
+        client.close()
+        client.disconnect()
+    with open("/tmp/navoled_debug.log", "a") as log:
+        log.write(f"Résultats MPD : {len(results)}\n")
+        for i, song in enumerate(results):
+            for key, value in song.items():
+                if isinstance(value, list):
+                    log.write(f"[{i}] ❗ Clé '{key}' est une liste: {value}\n")
+                elif not isinstance(value, str):
+                    log.write(f"[{i}] ⚠️ Clé '{key}' type inattendu: {type(value)} - {value}\n")
+    print(f"Performed MPD search with tag={tag} and input='{input_text}'")
+    return results, False
+
+def schedule_search_preview(key):
+    # Debounce: chaque changement relance le délai; la génération invalide les requêtes déjà parties
+    global search_preview_timer
+    search_preview["pending"] = key
+    search_preview["generation"] += 1
+    if search_preview_timer is not None:
+        search_preview_timer.cancel()
+    search_preview_timer = threading.Timer(SEARCH_PREVIEW_DELAY, run_search_preview, args=(key, search_preview["generation"]))
+    search_preview_timer.daemon = True
+    search_preview_timer.start()
+
+def run_search_preview(key, generation):
+    text, grouping_mode = key
+    # Pas de nombre de résultats tant que l'index n'a pas répondu
+    result = None, []
+    if USE_LIBRARY_INDEX and len(text.strip()) >= SEARCH_PREVIEW_MIN_CHARS:
+        try:
+            if library_index.ready():
+                result = library_index.suggest(text, get_search_tag(grouping_mode), SEARCH_PREVIEW_LINES,
+                                               lambda: search_preview["generation"] != generation)
+            else:
+                result = None, []
+        except Exception as e:
+            result = None, []
+            if core.DEBUG:
+                print(f"Search preview error: {e}")
+    if result is None or search_preview["generation"] != generation:
+        return
+    count, lines = result
+    search_preview.update(key=key, count=count if len(text.strip()) >= SEARCH_PREVIEW_MIN_CHARS else None, lines=lines)
+
 def run_mpd_search(input_text, grouping_mode):
-    global mpd_results_cache, radio_results_cache, search_input_last, grouping_mode_last
+    global mpd_results_cache, mpd_results_truncated, radio_results_cache, search_input_last, grouping_mode_last
     global radio_virtual_folder, display_labels
     global library_items, current_path, nav_stack, library_selection
     global search_input, selected_grouping_mode, search_results_active, search_mode, search_cursor
 
     try:
-        client = MPDClient()
-        client.timeout = 10
-        client.connect("localhost", 6600)
-
         if input_text == search_input_last and grouping_mode == grouping_mode_last:
             results = mpd_results_cache
             radio_matches = radio_results_cache
             print("Using cached search results")
         else:
             tag = get_search_tag(grouping_mode)
-            results = client.search(tag, input_text)
-            with open("/tmp/navoled_debug.log", "a") as log:
-                log.write(f"Résultats MPD : {len(results)}\n")
-                for i, song in enumerate(results):
-                    for key, value in song.items():
-                        if isinstance(value, list):
-                            log.write(f"[{i}] ❗ Clé '{key}' est une liste: {value}\n")
-                        elif not isinstance(value, str):
-                            log.write(f"[{i}] ⚠️ Clé '{key}' type inattendu: {type(value)} - {value}\n")
+            results, mpd_results_truncated = search_library(input_text, tag)
             radio_matches = search_radio_titles(input_text)
             mpd_results_cache = results
             radio_results_cache = radio_matches
             search_input_last = input_text
             grouping_mode_last = grouping_mode
-            print(f"Performed MPD search with tag={tag} and input='{input_text}'")
-
-        client.close()
-        client.disconnect()
 
         if not results and not radio_matches:
             search_mode = True
@@ -780,6 +841,9 @@ def run_mpd_search(input_text, grouping_mode):
         search_results_active = True
         nav_stack.clear()
         library_selection = 0
+        if mpd_results_truncated:
+            # Liste incomplète: l'utilisateur doit affiner sa recherche
+            core.show_message(core.t("info_search_truncated", count=len(results)))
         return True
 
     except Exception as e:
@@ -950,6 +1014,7 @@ def render_screen():
     else:
         draw_library()
 
+    core.draw_progress()
     core.disp.image(core.image)
     core.disp.show()
 
@@ -1021,6 +1086,21 @@ def draw_search_screen():
     cursor_y = input_y + input_padding_y
     core.draw.line((cursor_x, cursor_y, cursor_x, cursor_y + font_search_input.getbbox("A")[3]), fill=0)
 
+    # ─── Aperçu des résultats (index local) ────────────────
+    key = (search_input, selected_grouping_mode)
+    if USE_LIBRARY_INDEX and key != search_preview["key"] and key != search_preview["pending"]:
+        schedule_search_preview(key)
+    preview_y = input_y + input_h + 2
+    if search_preview["count"] is not None:
+        # Nombre de pistes à gauche, champ de recherche à droite, puis les meilleures correspondances
+        hits = core.t("show_search_hits", count=search_preview["count"])
+        core.draw.text((4, preview_y), hits, font=font_search_info, fill=255)
+        mode_w = core.draw.textlength(selected_grouping_mode, font=font_search_info)
+        core.draw.text((core.width - mode_w - 4, preview_y), selected_grouping_mode, font=font_search_info, fill=255)
+        for i, line in enumerate(search_preview["lines"]):
+            core.draw.text((4, preview_y + 10 * (i + 1)), f"› {line}", font=font_search_info, fill=255)
+        return
+
     # ─── Infos options : champ ────────────────
     info1 = f"{core.t('show_search_by')}: {selected_grouping_mode}"
     core.draw.text((4, 50), info1, font=font_search_info, fill=255)
@@ -1533,19 +1613,11 @@ def nav_info():
 
 def nav_back():
     core.show_message(core.t("info_back_nowplaying"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "nowoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "navoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_nowoled", core.switch_to_service, "nowoled")
 
 def nav_back_long():
     core.show_message(core.t("info_back_queue"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "queoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "navoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_queoled", core.switch_to_service, "queoled")
 
 def finish_press(key):
     global menu_active, menu_selection, library_items, library_selection, current_path
@@ -1973,6 +2045,10 @@ if os.path.exists(override_path):
             print(f"Error loading artist override: {e}")
 
 core.start_message_updater()
+action_executor.set_hooks(core.set_progress, core.DEBUG)
+if USE_LIBRARY_INDEX:
+    library_index.configure(db_path=core.MOODEOLED_DIR / "library_index.db", debug_flag=core.DEBUG)
+    library_index.start()
 
 start_inputs(core.config, finish_press, msg_hook=core.show_message)
 set_custom_hooks(core.show_message)
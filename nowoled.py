@@ -4,26 +4,38 @@
 import os
 import sys
 import subprocess
-import socket
 import re
 import time
 import datetime
 import threading
 import requests
 import html
-import http.server
 import sqlite3
 import json
-import queue
 from pathlib import Path
 from mpd import MPDClient
 
 import core_common as core
+import action_executor
+import yt_cache
+import songlog_store
+import stream_queue_store
+import yt_refresher
+import preload_scheduler
+import yt_resolver
+import local_stream
+import audio_cache
+import stream_timing
+import connectivity
 from input_manager import start_inputs, debounce_data, process_key
-from media_key_actions import handle_audio_keys, handle_custom_key, USED_MEDIA_KEYS, set_hooks as set_custom_hooks
+from media_key_actions import handle_audio_keys, handle_custom_key, USED_MEDIA_KEYS, set_hooks as set_custom_hooks, step_volume
+from mpd_dispatcher import mpd_command, seek_relative, reconcile_volume, run_mpd
 
 SAVED_STREAM_PROFILE = core.config.get("settings", "stream_profile", fallback="standard")
+STREAM_PASSTHROUGH = {p.strip() for p in core.config.get("manual", "stream_passthrough", fallback="hifi").split(",") if p.strip()}
 yt_cache_path = core.MOODEOLED_DIR / "yt_cache.json"
+yt_cache_db_path = core.MOODEOLED_DIR / "yt_cache.db"
+songlog_db_path = core.MOODEOLED_DIR / "songlog.db"
 
 PLS_PATH = "/var/lib/mpd/music/RADIO/Local Stream.pls"
 LOGO_PATH = "/var/local/www/imagesw/radio-logos/Local Stream.jpg"
@@ -96,12 +108,16 @@ tool_menu_options = [
     {"id": "renderers", "label": core.t("menu_renderers")},
     {"id": "show_songlog", "label": core.t("menu_show_songlog")},
     {"id": "hardware_info", "label": core.t("menu_hardware_info")},
+    {"id": "stream_stats", "label": core.t("menu_stream_stats")},
     {"id": "configuration", "label": core.t("menu_configuration")}
 ]
 songlog_active = False
 songlog_lines = []
 songlog_meta = []
+songlog_ids = []
+songlog_total = 0
 songlog_selection = 0
+SONGLOG_PAGE = 50
 
 songlog_action_active = False
 songlog_action_selection = 0
@@ -110,6 +126,7 @@ songlog_action_options = [
     {"id": "queue_yt_songlog", "label": core.t("menu_queue_yt_songlog")},
     {"id": "show_info_songlog", "label": core.t("menu_show_info_songlog")},
     {"id": "delete_entry_songlog", "label": core.t("menu_delete_entry_songlog")},
+    {"id": "export_songlog", "label": core.t("menu_export_songlog")},
     {"id": "delete_all_songlog", "label": core.t("menu_delete_all_songlog")}
 ]
 
@@ -117,23 +134,25 @@ stream_queue_active = False
 stream_queue_lines = []
 stream_queue_selection = 0
 
-stream_queue = []
-stream_queue_pos = 0
-preload_queue = queue.Queue()
-preload_queue_worker_started = False
-yt_cache_lock = threading.Lock()
+stream_queue_queries = {}
+offline_retry = None
+stream_start_offset = 0
+PRELOAD_AHEAD = 20
+RESUME_STREAM_QUEUE = core.config.getboolean("manual", "stream_queue_resume", fallback=True)
 
 stream_queue_action_active = False
 stream_queue_action_selection = 0
 stream_queue_action_options = [
-    {"id": "play_stream_queue_pos", "label": core.t("menu_play_stream_queue_pos")}
+    {"id": "play_stream_queue_pos", "label": core.t("menu_play_stream_queue_pos")},
+    {"id": "shuffle_stream_queue", "label": core.t("menu_shuffle_stream_queue")},
+    {"id": "repeat_stream_queue", "label": core.t("menu_repeat_stream_queue")}
 ]
 
 stream_manual_stop = False
 stream_manual_skip = False
 stream_transition_in_progress = False
-current_ffmpeg = None
-current_server = None
+stream_query = ""
+stream_entry = {}
 
 config_menu_active = False
 config_menu_selection = 0
@@ -149,13 +168,16 @@ sleep_timeout_labels = {0: "Off", 15: "15s", 30: "30s", 60: "1m", 300: "5m", 600
 stream_profile_menu_active = False
 stream_profile_menu_selection = 0
 stream_profile_menu_options = [
-    {"id": "low", "label": core.t("stream_low"), "yt_format": core.config.get("manual", "yt_format_low", fallback="bestaudio[abr<=96][protocol!=m3u8]"), "ffmpeg_bitrate": "96k"},
-    {"id": "standard", "label": core.t("stream_standard"), "yt_format": core.config.get("manual", "yt_format_standard", fallback="bestaudio[ext=m4a][protocol!=m3u8]/bestaudio[protocol!=m3u8]"), "ffmpeg_bitrate": "128k"},
-    {"id": "hifi", "label": core.t("stream_hifi"), "yt_format": core.config.get("manual", "yt_format_hifi", fallback="bestaudio[ext=webm][protocol!=m3u8]/bestaudio[protocol!=m3u8]"), "ffmpeg_bitrate": "160k"}
+    {"id": "low", "label": core.t("stream_low"), "yt_format": core.config.get("manual", "yt_format_low", fallback="bestaudio[abr<=96][protocol!=m3u8]"), "ffmpeg_bitrate": "96k", "passthrough": "low" in STREAM_PASSTHROUGH},
+    {"id": "standard", "label": core.t("stream_standard"), "yt_format": core.config.get("manual", "yt_format_standard", fallback="bestaudio[ext=m4a][protocol!=m3u8]/bestaudio[protocol!=m3u8]"), "ffmpeg_bitrate": "128k", "passthrough": "standard" in STREAM_PASSTHROUGH},
+    {"id": "hifi", "label": core.t("stream_hifi"), "yt_format": core.config.get("manual", "yt_format_hifi", fallback="bestaudio[ext=webm][protocol!=m3u8]/bestaudio[protocol!=m3u8]"), "ffmpeg_bitrate": "160k", "passthrough": "hifi" in STREAM_PASSTHROUGH}
 ]
 hardware_info_active = False
 hardware_info_selection = 0
 hardware_info_lines = []
+stream_stats_active = False
+stream_stats_selection = 0
+stream_stats_lines = []
 
 language_menu_active = False
 language_menu_selection = 0
@@ -249,13 +271,9 @@ def run_sleep_loop():
     screen_on = False
     is_sleeping = True
 
-def has_internet_connection(timeout=2):
-    try:
-        # On tente d'ouvrir une connexion TCP vers un serveur bien connu (Google DNS)
-        socket.create_connection(("8.8.8.8", 53), timeout=timeout)
-        return True
-    except OSError:
-        return False
+def has_internet_connection():
+    # État en cache (sonde de fond dans connectivity): pas d'attente réseau depuis l'affichage ou les menus
+    return connectivity.is_online()
 
 def update_status_info():
     global last_title_seen, last_artist_seen, menu_context_flag
@@ -306,9 +324,13 @@ def update_status_info():
                     menu_context_flag = "radio"
                     if path == "http://localhost:8080/stream.mp3":
                         menu_context_flag = "local_stream"
-                        if stream_queue:
-                            position = stream_queue_pos + 1 if 0 <= stream_queue_pos < len(stream_queue) else "?"
-                            artist_album = f"{album} | {core.t('show_stream_queue_number', count=len(stream_queue), position=position)}"
+                        if stream_queue_store.active:
+                            elapsed = local_stream.current_elapsed()
+                            if elapsed is not None:
+                                stream_queue_store.set_elapsed(elapsed)
+                        if stream_queue_store.order:
+                            position = stream_queue_store.pos + 1
+                            artist_album = f"{album} | {core.t('show_stream_queue_number', count=len(stream_queue_store.order), position=position)}"
                             title = final_title_yt
                         else:
                             artist_album = f"{album} | [Album: {album_yt}]" if album_yt else album
@@ -346,7 +368,7 @@ def update_status_info():
                 if volume_data.get("muted") == "yes":
                     core.global_state["volume"] = "Mute"
                 else:
-                    core.global_state["volume"] = volume_data.get("volume", "N/A")
+                    core.global_state["volume"] = reconcile_volume(volume_data.get("volume", "N/A"))
             except Exception as e:
                 core.debug_error("error_volume", e, silent=True)
 
@@ -725,22 +747,13 @@ def search_artist_from_now():
         os.chown(override_path, os.getuid(), os.getgid())
 
         core.show_message(core.t("info_search_artist", artist=artist))
-        time.sleep(2)
-        subprocess.call(["sudo", "systemctl", "start", "navoled.service"])
-        subprocess.call(["sudo", "systemctl", "stop", "nowoled.service"])
-    except Exception as e:
-        core.debug_error("error_search_artist", e)
-        if not core.DEBUG:
-            core.show_message(core.t("error_generic"))
 
-def ensure_songlog_file():
-    try:
-        path = core.MOODEOLED_DIR / "songlog.txt"
-        if not path.exists():
-            path.touch(mode=0o664, exist_ok=True)
-            os.chown(path, os.getuid(), os.getgid())
+        def switch_after_message():
+            time.sleep(2)
+            core.switch_to_service("navoled")
+        action_executor.submit("system", "switch_navoled", switch_after_message)
     except Exception as e:
-        core.debug_error("error_create_songlog", e)
+        core.debug_error("error_search_artist", e)
         if not core.DEBUG:
             core.show_message(core.t("error_generic"))
 
@@ -754,45 +767,60 @@ def log_song():
         main = f"{title}"
     else:
         main = f"{artist} - {title}"
-    suffix = f"[{album} | {now}]"
-    songlog_line = f"{main} {suffix}\n"
-    ensure_songlog_file()
-    with open(core.MOODEOLED_DIR / 'songlog.txt', 'a') as f:
-        f.write(songlog_line)
+    suffix = f"{album} | {now}"
+    try:
+        entry_id = songlog_store.add(main, suffix)
+    except Exception as e:
+        core.debug_error("error_create_songlog", e)
+        if not core.DEBUG:
+            core.show_message(core.t("error_generic"))
+        return
     core.show_message(core.t("info_logged_title"))
     if core.DEBUG:
-        print("Saved:", songlog_line.strip())
+        print(f"Saved #{entry_id}:", songlog_store.format_line(main, suffix))
 
 def show_songlog():
-    global songlog_lines, songlog_meta
+    global songlog_lines, songlog_meta, songlog_ids, songlog_total
+    songlog_lines = []
+    songlog_meta = []
+    songlog_ids = []
     try:
-        ensure_songlog_file()
-        path = core.MOODEOLED_DIR / "songlog.txt"
-        with open(path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        lines = [html.unescape(line.strip()) for line in lines if line.strip()]
-        if not lines:
+        songlog_total = songlog_store.count()
+        if not songlog_total:
             core.show_message(core.t("info_empty_songlog"))
-            songlog_lines = []
-            songlog_meta = []
             return
-        entries = lines[-50:][::-1]
-        songlog_lines = []
-        songlog_meta = []
-        for line in entries:
-            if "[" in line and "]" in line:
-                text, meta = line.rsplit("[", 1)
-                songlog_lines.append(text.strip())
-                songlog_meta.append(meta.rstrip("] "))
-            else:
-                songlog_lines.append(line)
-                songlog_meta.append("")
-        prune_yt_cache_to_songlog()
+        # Recharge au moins jusqu'à la sélection courante (retour depuis le menu d'actions)
+        while load_more_songlog() and len(songlog_lines) <= songlog_selection:
+            pass
     except Exception as e:
         core.debug_error("error_rd_songlog", e)
         if not core.DEBUG:
             core.show_message(core.t("error_generic"))
 
+def load_more_songlog():
+    # Page suivante de l'historique (plus ancienne), ajoutée à la liste affichée
+    rows = songlog_store.page(songlog_ids[-1] if songlog_ids else None, SONGLOG_PAGE)
+    for entry_id, text, meta in rows:
+        songlog_ids.append(entry_id)
+        songlog_lines.append(text)
+        songlog_meta.append(meta)
+    return len(rows)
+
+def export_songlog():
+    def write_export():
+        try:
+            return songlog_store.export(core.MOODEOLED_DIR / "songlog_export.txt")
+        except Exception as e:
+            core.debug_error("error_export_songlog", e)
+            return None
+
+    def on_done(count):
+        if count is None:
+            core.show_message(core.t("error_generic"))
+        else:
+            core.show_message(core.t("info_songlog_exported", count=count))
+    action_executor.submit("filesystem", "export_songlog", write_export, done=on_done)
+
 def confirm_delete_all_songlog(cancel=False):
     if cancel:
         global songlog_active
@@ -807,85 +835,59 @@ def confirm_delete_all_songlog(cancel=False):
         delete_all_songlog()
 
 def delete_all_songlog():
-    global songlog_lines, songlog_selection, songlog_active
-    try:
-        ensure_songlog_file()
-        path = core.MOODEOLED_DIR / "songlog.txt"
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("")  # Vide le fichier
-        songlog_lines = []
-        songlog_meta = []
-        songlog_selection = 0
-        core.show_message(core.t("info_all_deleted"))
-        time.sleep(2)
-        show_songlog()
-    except Exception as e:
-        core.debug_error("error_rm_all_songlog", e)
-        if not core.DEBUG:
-            core.show_message(core.t("error_generic"))
+    global songlog_lines, songlog_meta, songlog_ids, songlog_total, songlog_selection
+    songlog_lines = []
+    songlog_meta = []
+    songlog_ids = []
+    songlog_total = 0
+    songlog_selection = 0
+
+    def clear_songlog():
+        try:
+            songlog_store.clear()
+            return True
+        except Exception as e:
+            core.debug_error("error_rm_all_songlog", e)
+            if not core.DEBUG:
+                core.show_message(core.t("error_generic"))
+            return False
+
+    def on_done(cleared):
+        if cleared:
+            yt_cache.schedule_evict()
+            core.show_message(core.t("info_all_deleted"))
+    action_executor.submit("filesystem", "delete_all_songlog", clear_songlog, done=on_done)
 
 def delete_songlog_entry(index_from_display):
-    global songlog_lines, songlog_selection
-    global stream_queue, stream_queue_pos
+    global songlog_total, songlog_selection
     try:
-        path = core.MOODEOLED_DIR / "songlog.txt"
-
-        # Assure que le fichier est accessible et songlog_lines aussi
-        with open(path, "r", encoding="utf-8") as f:
-            all_lines = [ln.rstrip("\n") for ln in f if ln.strip()]
-
-        if not all_lines or not songlog_lines:
+        if not songlog_ids or index_from_display >= len(songlog_ids):
             core.show_message(core.t("info_nothing_delete"))
             return
 
-        # Récupérer la ligne à supprimer dans songlog_lines
-        target_line = songlog_lines[index_from_display]
-        idx_abs = index_from_display  # index dans songlog_lines et stream_queue
-
-        # Vérifier si c'est la piste en cours de lecture
-        if stream_queue and 0 <= stream_queue_pos < len(stream_queue):
-            playing_index = stream_queue[stream_queue_pos]
-            if 0 <= playing_index < len(songlog_lines):
-                delete_current = {songlog_lines[playing_index]}
-
-            # Si on supprime la piste en cours, passer à la suivante
-            if delete_current and stream_queue:
-                if core.DEBUG:
-                    print("♻️  Track in play was deleted – skipping to next")
-                next_stream(manual_skip=True)
-
-        new_all_lines = []
-        for ln in all_lines:
-            if ln.startswith(target_line):
-                # C'est la ligne à supprimer, on l'ignore
-                continue
-            new_all_lines.append(ln)
-
-        with open(path, "w", encoding="utf-8") as f:
-            for ln in new_all_lines:
-                f.write(ln + "\n")
-
-        # Mise à jour de songlog_lines : suppression par indice
-        songlog_lines.pop(idx_abs)
-
-        # Mise à jour de stream_queue : suppression des indices égaux et ajustement des autres
-        new_queue = []
-        for i in stream_queue:
-            if i == idx_abs:
-                continue
-            new_queue.append(i - 1 if i > idx_abs else i)
+        # Suppression par id: seule l'entrée choisie disparaît, même si d'autres ont le même texte
+        entry_id = songlog_ids[index_from_display]
 
-        # Ajuster la position dans la queue
-        removed_before_pos = len(stream_queue) - len(new_queue)
-        if stream_queue_pos >= len(new_queue):
-            stream_queue_pos = max(0, len(new_queue) - 1)
-        elif removed_before_pos and stream_queue_pos > 0:
-            stream_queue_pos = max(0, stream_queue_pos - removed_before_pos)
-        stream_queue = new_queue
+        # Si on supprime la piste en cours, passer à la suivante
+        if stream_queue_store.current() == entry_id:
+            if core.DEBUG:
+                print("♻️  Track in play was deleted – skipping to next")
+            next_stream(manual_skip=True)
+
+        songlog_store.delete(entry_id)
+        yt_cache.schedule_evict()
+        songlog_total = max(0, songlog_total - 1)
+        del songlog_ids[index_from_display]
+        del songlog_lines[index_from_display]
+        del songlog_meta[index_from_display]
+
+        # File de lecture : retrait de l'id, la position suit
+        stream_queue_store.remove(entry_id)
+        stream_queue_queries.pop(entry_id, None)
+        if stream_queue_store.order:
+            schedule_preloads()
 
         core.show_message(core.t("info_entry_deleted"))
-        time.sleep(1)
-        show_songlog()
 
         if songlog_selection >= len(songlog_lines):
             songlog_selection = max(0, len(songlog_lines) - 1)
@@ -895,25 +897,17 @@ def delete_songlog_entry(index_from_display):
         if not core.DEBUG:
             core.show_message(core.t("error_generic"))
 
-def prune_yt_cache_to_songlog():
-    cache_path = core.MOODEOLED_DIR / "yt_cache.json"
-    try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            yt_cache = json.load(f)
-    except:
-        return
-    # On garde uniquement les clés encore présentes dans songlog_lines
-    valid_keys = set(line.strip() for line in songlog_lines)
-    removed = 0
-    for key in list(yt_cache.keys()):
-        if key not in valid_keys:
-            del yt_cache[key]
-            removed += 1
-    if removed:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(yt_cache, f, indent=2)
-        if core.DEBUG:
-            print(f"Pruned {removed} entries from yt_cache (not in songlog)")
+def evict_yt_cache(evict):
+    # Éviction en tâche de fond (file filesystem): songlog, ancienneté, nombre d'entrées
+    def run():
+        try:
+            removed = evict()
+        except Exception as e:
+            core.debug_error("error_yt_cache", e, silent=True)
+            return
+        if core.DEBUG and any(removed.values()):
+            print(f"yt_cache eviction: {removed}")
+    action_executor.submit("filesystem", "yt_cache_evict", run)
 
 def ensure_local_stream():
     # Copy logo if present (optional)
@@ -1006,49 +1000,110 @@ def check_stream_format(profile_id, yt_format, preload=False):
         if core.DEBUG:
             print(f"⚠ [Warning] Suspicious yt_format for '{profile_id}': {yt_format}")
 
-def preload_worker():
-    while True:
-        index = preload_queue.get()
-        if core.DEBUG:
-            print("-  -  -  -  -  -  -  -  -")
-            print(f"⚪ Preloading track index {index}")
-        try:
-            yt_search_track(index, preload=True)
-        except Exception as e:
-            core.debug_error("preload_yt", e)
-        time.sleep(0.5)
-        preload_queue.task_done()
+def preload_yt_query(local_query):
+    if core.DEBUG:
+        print("-  -  -  -  -  -  -  -  -")
+        print(f"⚪ Preloading: {local_query}")
+    yt_search_track(None, preload=True, local_query=local_query)
+
+def schedule_preloads():
+    # Reprioritise selon la position courante (annule les préchargements devenus inutiles)
+    window = stream_queue_store.window(PRELOAD_AHEAD, preload_scheduler.BEHIND)
+    preload_scheduler.update(0, [(offset, queue_query(entry_id)) for offset, entry_id in window if queue_query(entry_id)])
+
+def set_stream_queue(entry_ids, start=0):
+    # La file contient des ids du songlog: elle reste valide quand l'affichage du songlog change
+    global stream_queue_queries
+    stream_queue_store.set_queue(entry_ids, start)
+    stream_queue_queries = songlog_store.queries(stream_queue_store.entries) if stream_queue_store.entries else {}
+
+def queue_query(entry_id):
+    query = stream_queue_queries.get(entry_id)
+    if query is None:
+        row = songlog_store.get(entry_id)
+        if row:
+            query = stream_queue_queries[entry_id] = row[1]
+    return query
+
+def retry_when_online(fn):
+    # Une seule relance en attente: la dernière lecture demandée hors ligne
+    global offline_retry
+    offline_retry = fn
+
+def on_connectivity_restored():
+    global offline_retry
+    retry, offline_retry = offline_retry, None
+    yt_refresher.wake()
+    if retry is None or core.is_renderer_active():
+        return
+    core.show_message(core.t("info_online_retry"))
+    # Relance (résolution yt-dlp comprise) sur la file "network": touches média et volume non bloqués
+    action_executor.submit("network", "offline_retry", retry)
+
+def cached_songlog_ids():
+    # Pistes du songlog jouables hors ligne (audio en cache disque), une par clé, plus récente d'abord
+    try:
+        return songlog_store.ids_for_keys(audio_cache.cached_keys())
+    except Exception as e:
+        core.debug_error("error_audio_cache", e, silent=True)
+        return []
+
+def stream_playable(retry_fn, entry_id=None):
+    # En ligne, ou piste choisie en cache disque: lecture normale. Sinon échec immédiat,
+    # proposition de lire l'audio en cache et nouvel essai automatique au retour du réseau
+    global confirm_box_active, confirm_box_selection, confirm_box_title, confirm_box_callback
+    if connectivity.is_online():
+        return True
+    if entry_id is not None and yt_cache.normalize_key(queue_query(entry_id) or "") in audio_cache.cached_keys():
+        return True
+    retry_when_online(retry_fn)
+    cached = cached_songlog_ids()
+    if not cached:
+        core.show_message(core.t("info_offline_retry"))
+        return False
+
+    def play_cached(cancel=False):
+        if cancel:
+            core.show_message(core.t("info_offline_retry"))
+            return
+        retry_when_online(None)
+        set_stream_queue(cached)
+        preload_scheduler.cancel_all()
+        core.show_message(core.t("info_stream_queue_full", count=len(cached)))
+        schedule_preloads()
+        yt_search_track(stream_queue_store.current())
+    confirm_box_active = True
+    confirm_box_selection = 0
+    confirm_box_title = core.t("title_offline_cached", count=len(cached))
+    confirm_box_callback = play_cached
+    return False
 
 def play_all_songlog_from_queue():
-    global stream_queue, stream_queue_pos, preload_queue_worker_started
-    if not songlog_lines:
+    # Une seule fois chaque piste, même enregistrée plusieurs fois (ou sous une autre graphie)
+    set_stream_queue(songlog_store.ids(unique=True))
+    if not stream_queue_store.order:
         core.show_message(core.t("info_empty_songlog"))
         return
-    for i in range(len(songlog_lines)):
-        stream_queue.append(i)
-    core.show_message(core.t("info_stream_queue_full", count=len(stream_queue)))
+    core.show_message(core.t("info_stream_queue_full", count=len(stream_queue_store.order)))
     time.sleep(1.5)
-    stream_queue_pos = 0
-    yt_search_track(stream_queue[0])
-    # Lancer le preload worker une seule fois
-    if not preload_queue_worker_started:
-        threading.Thread(target=preload_worker, daemon=True).start()
-        preload_queue_worker_started = True
-    for i in stream_queue[1:]:
-        preload_queue.put(i)
+    schedule_preloads()
+    yt_refresher.wake()
+    yt_search_track(stream_queue_store.current())
 
 def next_stream(manual_skip=False):
-    global stream_queue_pos, stream_manual_skip, stream_transition_in_progress
+    global stream_manual_skip, stream_transition_in_progress
     if stream_transition_in_progress:
         if core.DEBUG:
             print("⚠️ next_stream ignored (stream already launching)")
         return
-    stream_queue_pos += 1
-    if stream_queue_pos < len(stream_queue):
+    # Suivante selon shuffle/repeat (repeat one: la même piste, sauf saut manuel)
+    next_index = stream_queue_store.advance(manual=manual_skip)
+    if next_index is not None:
         stream_transition_in_progress = True
         stream_manual_skip = manual_skip
-        next_index = stream_queue[stream_queue_pos]
-        core.show_message(core.t("info_next_stream", pos=stream_queue_pos + 1, total=len(stream_queue)))
+        core.show_message(core.t("info_next_stream", pos=stream_queue_store.pos + 1, total=len(stream_queue_store.order)))
+        schedule_preloads()
+        yt_refresher.wake()
         if core.DEBUG:
             print("-------------------------Next Stream----------------------------------")
             print(f"⏭️ Next stream from queue: {next_index}")
@@ -1060,17 +1115,17 @@ def next_stream(manual_skip=False):
             print("✅ End of stream queue")
 
 def previous_stream(manual_skip=True):
-    global stream_queue_pos, stream_manual_skip, stream_transition_in_progress
+    global stream_manual_skip, stream_transition_in_progress
     if stream_transition_in_progress:
         if core.DEBUG:
             print("⚠️ previous_stream ignored (stream already launching)")
         return
-    previous_index = stream_queue_pos - 1
-    if previous_index >= 0:
+    previous_index = stream_queue_store.back()
+    if previous_index is not None:
         stream_transition_in_progress = True
         stream_manual_skip = manual_skip
-        stream_queue_pos = previous_index
-        core.show_message(core.t("info_prev_stream", pos=stream_queue_pos + 1, total=len(stream_queue)))
+        core.show_message(core.t("info_prev_stream", pos=stream_queue_store.pos + 1, total=len(stream_queue_store.order)))
+        schedule_preloads()
         if core.DEBUG:
             print("-------------------------Previous Stream----------------------------------")
             print(f"⏮️ Previous stream from queue: {previous_index}")
@@ -1081,12 +1136,135 @@ def previous_stream(manual_skip=True):
         if core.DEBUG:
             print("✅ Top of stream queue")
 
+def resume_stream_queue():
+    # Reprise après redémarrage (retour depuis navoled/queoled): MPD était sur le flux local et la file en cours
+    global stream_queue_queries, stream_start_offset
+    if not RESUME_STREAM_QUEUE or not stream_queue_store.active:
+        return
+    song = run_mpd("currentsong") or {}
+    if song.get("file") != STREAM_URL:
+        stream_queue_store.set_active(False)
+        return
+    core.load_renderer_states_from_db()
+    if core.is_renderer_active():
+        return
+    stream_queue_queries = songlog_store.queries(stream_queue_store.entries)
+    entry_id = stream_queue_store.current()
+    stream_start_offset = stream_queue_store.elapsed
+    if core.DEBUG:
+        print(f"↩️ Resuming stream queue at position {stream_queue_store.pos} ({stream_start_offset:.0f}s)")
+    schedule_preloads()
+    yt_search_track(entry_id)
+
 def set_stream_manual_stop(manual_stop=True):
     global stream_manual_stop
     stream_manual_stop = manual_stop
+    # Arrêt volontaire: pas de reprise de la file au prochain démarrage
+    if manual_stop:
+        stream_queue_store.set_active(False)
+
+def current_stream_profile():
+    return next(
+        (item for item in stream_profile_menu_options if item["id"] == SAVED_STREAM_PROFILE),
+        stream_profile_menu_options[1]
+    )
+
+def upcoming_stream_queries(count=5):
+    return [q for q in map(queue_query, stream_queue_store.upcoming(count)) if q]
+
+def refresh_yt_query(local_query):
+    yt_format = current_stream_profile()["yt_format"]
+    return preload_scheduler.resolve_shared(local_query, lambda q: resolve_yt_query(q, yt_format, yt_resolver.PRIORITY_REFRESH))
+
+def resolve_yt_query(local_query, yt_format, priority=yt_resolver.PRIORITY_PLAY):
+    result = yt_resolver.resolve(local_query, yt_format, priority)
+    if not result["ok"]:
+        raise RuntimeError(result["error"])
+    if core.DEBUG:
+        print(f"[yt-dlp] resolved in {result['timings']['total'] * 1000:.0f}ms (wait {result['timings']['wait'] * 1000:.0f}ms)")
+    # Seule une lecture demandée compte comme utilisation (pas le préchargement ni le rafraîchissement)
+    return build_yt_cache_entry(local_query, result["video"], touch=priority == yt_resolver.PRIORITY_PLAY)
+
+def build_yt_cache_entry(local_query, video, touch=True):
+    resolved_url = video['url']
+    title_raw = video.get("track") or video.get("title") or "Unknown"
+    album = video.get("album")
+    duration = video.get("duration")
+    webpage_url = video.get("webpage_url")
+
+    artist_candidates = {
+        "artist": video.get("artist"),
+        "album_artist": video.get("album_artist"),
+        "composer": video.get("composer"),
+        "creator": video.get("creator"),
+        "uploader": video.get("uploader"),
+    }
+
+    if " - " in local_query:
+        artist_query, title_query = map(str.strip, local_query.split(" - ", 1))
+    else:
+        artist_query = local_query.strip()
+        title_query = ""
+
+    artist_match = next((v for v in artist_candidates.values() if v and artist_query.lower() in v.lower()), None)
+
+    if artist_query.lower() in title_raw.lower():
+        title_final = title_raw
+        artist_final = artist_query
+    elif artist_match:
+        title_final = f"{artist_query} - {title_raw}"
+        artist_final = artist_query
+    else:
+        title_final = f"{title_raw} - ({artist_query} ?)"
+        artist_final = f"Unknown / maybe {artist_query}"
+
+    expire_ts = None
+    expire_str = None
+    match = re.search(r"[?&]expire=(\d+)", resolved_url)
+    if match:
+        expire_ts = int(match.group(1))
+    elif video.get("expire_ts"):
+        expire_ts = int(video["expire_ts"])
+    if expire_ts:
+        expire_str = datetime.datetime.fromtimestamp(expire_ts).strftime("%Y-%m-%d %H:%M:%S")
+
+    if core.DEBUG:
+        print(f"[yt-dlp] title: {title_raw}")
+        print(f"[yt-dlp] album: {album}")
+        print(f"[yt-dlp] final-title: {title_final}")
+        print(f"[yt-dlp] duration: {duration}")
+        print(f"[yt-dlp] expire at: {expire_str}")
+        #print(f"[yt-dlp] url: {resolved_url}")
+
+    entry = {
+        "title": title_final,
+        "artist": artist_final,
+        "album": album,
+        "duration": duration,
+        "acodec": video.get('acodec'),
+        "abr": video.get('abr'),
+        "ext": video.get('ext'),
+        "format": video.get('format'),
+        "webpage_url": webpage_url,
+        "url": resolved_url,
+        "resolved": True,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "expires": expire_str,
+        "expire_ts": expire_ts
+    }
+
+    # Sauvegarde dans le cache (la mesure de volume survit au rafraîchissement de l'URL)
+    try:
+        previous = yt_cache.get(local_query, touch=False)
+        if previous and previous.get("loudness") is not None:
+            entry["loudness"] = previous["loudness"]
+        yt_cache.put(local_query, entry, touch=touch)
+    except Exception as e:
+        core.debug_error("error_yt_cache", e)
+    return entry
 
-def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=None):
-    global stream_url, final_title_yt, album_yt, artist_yt, query, blocking_render, stream_transition_in_progress
+def yt_search_track(entry_id, preload=False, _fallback_attempt=False, local_query=None):
+    global stream_url, final_title_yt, album_yt, artist_yt, stream_query, stream_entry, query, blocking_render, stream_transition_in_progress
 
     core.load_renderer_states_from_db()
     if core.is_renderer_active() and not preload:
@@ -1098,33 +1276,67 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
         stop_current_stream()
 
     # Lecture du profil
-    stream_profile_selected = next(
-        (item for item in stream_profile_menu_options if item["id"] == SAVED_STREAM_PROFILE),
-        stream_profile_menu_options[1]
-    )
+    stream_profile_selected = current_stream_profile()
     check_stream_format(stream_profile_selected["id"], stream_profile_selected["yt_format"], preload)
 
     if local_query is None:
-        if index >= len(songlog_lines):
+        local_query = queue_query(entry_id)
+        if not local_query:
             if not preload:
                 core.show_message(core.t("info_invalid_index"))
             return
-        local_query = songlog_lines[index].strip()
 
     if core.DEBUG:
         print(f"→ Search for: {local_query}")
 
-    yt_cache = {}
+    if preload:
+        trace = stream_timing.NULL_TRACE
+    elif _fallback_attempt and stream_timing.current_trace:
+        trace = stream_timing.current_trace
+    else:
+        trace = stream_timing.begin(local_query, stream_profile_selected["id"])
 
-    # Chargement thread-safe du cache
-    with yt_cache_lock:
+    # Piste déjà en cache audio disque: ni recherche ni URL nécessaires
+    with trace.span("disk_lookup"):
         try:
-            with open(yt_cache_path, "r", encoding="utf-8") as f:
-                yt_cache = json.load(f)
-        except:
-            yt_cache = {}
+            cached_audio = audio_cache.lookup(local_query)
+        except Exception as e:
+            cached_audio = None
+            core.debug_error("error_audio_cache", e, silent=True)
+    if cached_audio:
+        trace.tag(cache="disk")
+        if core.DEBUG:
+            print(f"✓ Audio cached on disk: {cached_audio['file']}")
+        if not preload:
+            stream_url = ""
+            final_title_yt = cached_audio["title"]
+            artist_yt = cached_audio["artist"]
+            album_yt = cached_audio["album"] or ""
+            stream_query = local_query
+            stream_entry = cached_audio
+            try:
+                stream_songlog_entry()
+            finally:
+                stream_transition_in_progress = False
+                stream_manual_skip = False
+        return
+
+    # Hors ligne: échec immédiat (ni yt-dlp ni URL distante), nouvel essai au retour du réseau
+    if not connectivity.is_online():
+        trace.tag(cache="offline")
+        trace.finish("offline")
+        if not preload:
+            stream_transition_in_progress = False
+            retry_when_online(lambda: yt_search_track(entry_id))
+            core.show_message(core.t("info_offline_retry"))
+        return
 
-    cache_entry = yt_cache.get(local_query)
+    with trace.span("cache_lookup"):
+        try:
+            cache_entry = yt_cache.get(local_query, touch=not preload)
+        except Exception as e:
+            cache_entry = None
+            core.debug_error("error_yt_cache", e, silent=True)
     url_expired = False
 
     if cache_entry and cache_entry.get("resolved") and cache_entry.get("url"):
@@ -1145,6 +1357,7 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
                 print(f"✓ Cached URL still valid until {expire_str}")
 
         if not url_expired:
+            trace.tag(cache="hit")
             if core.DEBUG:
                 print(f"Using cached result for: {local_query}")
             if not preload:
@@ -1152,6 +1365,8 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
                 final_title_yt = cache_entry["title"]
                 artist_yt = cache_entry["artist"]
                 album_yt = cache_entry.get("album", "")
+                stream_query = local_query
+                stream_entry = cache_entry
                 core.load_renderer_states_from_db()
                 if core.is_renderer_active():
                     if core.DEBUG:
@@ -1166,6 +1381,7 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
     else:
         if core.DEBUG:
             print("❓ No entry in cache")
+    trace.tag(cache="expired" if url_expired else "miss")
 
     # Si pas dans le cache ou expiré : yt-dlp
     if not preload:
@@ -1175,107 +1391,32 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
         time.sleep(0.05)
         render_screen()
 
-    from yt_dlp import YoutubeDL
     try:
-        ydl_opts = {
-            'quiet': True,
-            'default_search': 'ytsearch',
-            'noplaylist': True,
-            'format': stream_profile_selected["yt_format"],
-            'no_warnings': True
-        }
-
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(local_query, download=False)
-            video = info['entries'][0] if '_type' in info else info
-
-            resolved_url = video['url']
-            title_raw = video.get("track") or video.get("title") or "Unknown"
-            album = video.get("album")
-            duration = video.get("duration")
-            webpage_url = video.get("webpage_url")
-
-            artist_candidates = {
-                "artist": video.get("artist"),
-                "album_artist": video.get("album_artist"),
-                "composer": video.get("composer"),
-                "creator": video.get("creator"),
-                "uploader": video.get("uploader"),
-            }
-
-            if " - " in local_query:
-                artist_query, title_query = map(str.strip, local_query.split(" - ", 1))
-            else:
-                artist_query = local_query.strip()
-                title_query = ""
-
-            artist_match = next((v for v in artist_candidates.values() if v and artist_query.lower() in v.lower()), None)
-
-            if artist_query.lower() in title_raw.lower():
-                title_final = title_raw
-                artist_final = artist_query
-            elif artist_match:
-                title_final = f"{artist_query} - {title_raw}"
-                artist_final = artist_query
-            else:
-                title_final = f"{title_raw} - ({artist_query} ?)"
-                artist_final = f"Unknown / maybe {artist_query}"
-
-            expire_ts = None
-            expire_str = None
-            match = re.search(r"[?&]expire=(\d+)", resolved_url)
-            if match:
-                expire_ts = int(match.group(1))
-                expire_str = datetime.datetime.fromtimestamp(expire_ts).strftime("%Y-%m-%d %H:%M:%S")
+        yt_format = stream_profile_selected["yt_format"]
+        priority = yt_resolver.PRIORITY_PRELOAD if preload else yt_resolver.PRIORITY_PLAY
+        with trace.span("resolve"):
+            entry = preload_scheduler.resolve_shared(local_query, lambda q: resolve_yt_query(q, yt_format, priority))
 
-            if core.DEBUG:
-                print(f"[yt-dlp] title: {title_raw}")
-                print(f"[yt-dlp] album: {album}")
-                print(f"[yt-dlp] final-title: {title_final}")
-                print(f"[yt-dlp] duration: {duration}")
-                print(f"[yt-dlp] expire at: {expire_str}")
-                #print(f"[yt-dlp] url: {resolved_url}")
-
-            # Sauvegarde dans le cache (sous verrou)
-            with yt_cache_lock:
-                yt_cache[local_query] = {
-                    "title": title_final,
-                    "artist": artist_final,
-                    "album": album,
-                    "duration": duration,
-                    "acodec": video.get('acodec'),
-                    "abr": video.get('abr'),
-                    "ext": video.get('ext'),
-                    "format": video.get('format'),
-                    "webpage_url": webpage_url,
-                    "url": resolved_url,
-                    "resolved": True,
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "expires": expire_str,
-                    "expire_ts": expire_ts
-                }
-
-                with open(yt_cache_path, "w", encoding="utf-8") as f:
-                    json.dump(yt_cache, f, indent=2)
-
-            if not preload:
-                stream_url = resolved_url
-                final_title_yt = title_final
-                artist_yt = artist_final
-                album_yt = album
-                core.load_renderer_states_from_db()
-                if core.is_renderer_active():
-                    if core.DEBUG:
-                        print("Renderer active – aborting launch of stream_songlog_entry()")
-                    core.message_permanent = False
-                    core.message_text = None
-                    blocking_render = False
-                    return
-                try:
-                    stream_songlog_entry()
-                finally:
-                    stream_transition_in_progress = False
-                    stream_manual_skip = False
+        if not preload:
+            stream_url = entry["url"]
+            final_title_yt = entry["title"]
+            artist_yt = entry["artist"]
+            album_yt = entry["album"]
+            stream_query = local_query
+            stream_entry = entry
+            core.load_renderer_states_from_db()
+            if core.is_renderer_active():
+                if core.DEBUG:
+                    print("Renderer active – aborting launch of stream_songlog_entry()")
+                core.message_permanent = False
+                core.message_text = None
+                blocking_render = False
+                return
+            try:
+                stream_songlog_entry()
+            finally:
+                stream_transition_in_progress = False
+                stream_manual_skip = False
 
     except Exception as e:
         if not preload:
@@ -1285,8 +1426,13 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
             stream_transition_in_progress = False
             blocking_render = False
 
+        # Échec réseau: pas de requête simplifiée, la connexion est sondée à nouveau
+        offline = not connectivity.check()
+        if offline and not preload:
+            retry_when_online(lambda: yt_search_track(entry_id))
+
         # Gestion du fallback si pas déjà tenté
-        if not _fallback_attempt:
+        if not _fallback_attempt and not offline:
             # Essayer fallback en simplifiant la query
             parts = local_query.split(" - ")
             if len(parts) == 2:
@@ -1298,11 +1444,12 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
                 print(f"No results for query: {local_query}")
                 print(f"Retrying with fallback query: {fallback_query}")
 
-            return yt_search_track(index, preload=preload, _fallback_attempt=True, local_query=fallback_query)
+            return yt_search_track(entry_id, preload=preload, _fallback_attempt=True, local_query=fallback_query)
 
+        trace.finish("offline" if offline else "error")
         core.debug_error("error_yt", e)
         if not preload and not core.DEBUG:
-            core.show_message(core.t("error_yt_simple"))
+            core.show_message(core.t("info_offline_retry" if offline else "error_yt_simple"))
         return
 
     if not preload:
@@ -1311,56 +1458,109 @@ def yt_search_track(index, preload=False, _fallback_attempt=False, local_query=N
         blocking_render = False
 
 def stop_current_stream():
-    global current_ffmpeg, current_server
-
-    if current_ffmpeg and current_ffmpeg.poll() is None:
-        try:
-            current_ffmpeg.terminate()
-            current_ffmpeg.wait(timeout=4)
-            if core.DEBUG:
-                print("✓ ffmpeg terminated")
-        except subprocess.TimeoutExpired:
-            if core.DEBUG:
-                print("⚠️ ffmpeg did not terminate in time, killing...")
-            try:
-                current_ffmpeg.kill()
-                current_ffmpeg.wait(timeout=2)
-                if core.DEBUG:
-                    print("✓ ffmpeg killed")
-            except Exception as e:
-                core.debug_error("error_kill_ffmpeg", e)
-        except Exception as e:
-            core.debug_error("error_stop_ffmpeg", e)
-    current_ffmpeg = None
+    # Le serveur local reste actif (MPD reste connecté): on coupe seulement la source en cours
+    local_stream.stop_source()
+    if core.DEBUG:
+        print("✓ Local stream source stopped")
+
+def stream_track_from_entry(entry, local_query, queue_pos):
+    profile = current_stream_profile()
+    track = {
+        "query": local_query,
+        "url": entry.get("url", ""),
+        "title": entry.get("title"),
+        "artist": entry.get("artist"),
+        "album": entry.get("album"),
+        "duration": entry.get("duration"),
+        "acodec": entry.get("acodec"),
+        "abr": entry.get("abr"),
+        "bitrate": profile["ffmpeg_bitrate"],
+        "passthrough": profile["passthrough"],
+        "loudness": entry.get("loudness"),
+        "queue_pos": queue_pos,
+    }
+    if entry.get("file"):
+        track.update(file=entry["file"], format=entry["format"], size=entry["size"])
+    return track
+
+def store_track_loudness(local_query, loudness):
+    entry = yt_cache.get(local_query, touch=False)
+    if entry is None:
+        return
+    entry["loudness"] = round(loudness, 1)
+    yt_cache.put(local_query, entry, touch=False)
+
+def on_local_stream_loudness(track, loudness):
+    if track.get("query"):
+        action_executor.submit("filesystem", "store_loudness", store_track_loudness, track["query"], loudness)
+
+def next_local_stream_track():
+    # Piste suivante pour le pré-lancement: en cache disque, ou URL en cache et encore valide
+    next_pos, next_id = stream_queue_store.peek_next()
+    if next_id is None:
+        return None
+    next_query = queue_query(next_id)
+    if not next_query:
+        return None
+    entry = audio_cache.lookup(next_query) or yt_cache.get(next_query, touch=False)
+    if not entry:
+        return None
+    if not entry.get("file") and (not entry.get("url") or (entry.get("expire_ts") or 0) <= time.time() + 60):
+        return None
+    return stream_track_from_entry(entry, next_query, next_pos)
+
+def on_local_stream_changed(track):
+    # La piste pré-lancée a pris le relais sans coupure
+    global stream_url, final_title_yt, artist_yt, album_yt, stream_query, stream_entry
+    stream_queue_store.jump(track["queue_pos"])
+    stream_url = track["url"]
+    final_title_yt = track["title"]
+    artist_yt = track["artist"]
+    album_yt = track["album"]
+    stream_query = track["query"]
+    stream_entry = track
+    schedule_preloads()
+    yt_refresher.wake()
+    core.show_message(core.t("info_streaming", title=final_title_yt))
+    if core.DEBUG:
+        print(f"⏭️ Gapless handoff to queue position {stream_queue_store.pos}: {final_title_yt}")
+
+def reload_local_stream():
+    # Format de sortie changé (mp3 / remux): MPD rouvre le flux local
+    run_mpd("clear")
+    run_mpd("load", "RADIO/Local Stream.pls")
+    run_mpd("play")
+
+def wait_first_audio(trace, timeout=15):
+    # Premier son: MPD en lecture avec une position qui avance
+    deadline = time.time() + timeout
+    while time.time() < deadline and not trace.finished:
+        status = run_mpd("status") or {}
+        if status.get("state") == "play" and float(status.get("elapsed", 0) or 0) > 0:
+            trace.mark("first_audio")
+            return
+        time.sleep(0.1)
+    trace.finish("timeout")
 
-    if current_server:
-        try:
-            current_server.shutdown()
-            current_server.server_close()
-            if core.DEBUG:
-                print("✓ HTTP server stopped")
-        except Exception as e:
-            core.debug_error("error_http_server", e)
-    current_server = None
+def on_local_stream_reconnect():
+    if core.DEBUG:
+        print("[local_stream] output format changed – reloading MPD")
+    action_executor.submit("transport", "reload_local_stream", reload_local_stream)
 
-    # Attendre max 4s la libération du port 8080
-    for i in range(20):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                if s.connect_ex(("localhost", 8080)) != 0:
-                    if core.DEBUG:
-                        print("✓ Port 8080 libre")
-                    break
-        except Exception as e:
-            core.debug_error("error_socket_check", e)
-            break
-        time.sleep(0.2)
-    else:
-        if core.DEBUG:
-            print("⚠️ Port 8080 encore occupé après timeout")
+def on_local_stream_end(track):
+    global stream_manual_stop, stream_manual_skip
+    if core.DEBUG:
+        print("----------------End of Stream---------------------")
+        print(f"[local_stream] stream_manual_skip = {stream_manual_skip}")
+        print(f"[local_stream] stream_manual_stop = {stream_manual_stop}")
+    core.load_renderer_states_from_db()
+    if not stream_manual_skip and not stream_manual_stop and not core.is_renderer_active():
+        next_stream()
+    stream_manual_stop = False
+    stream_manual_skip = False
 
 def stream_songlog_entry():
-    global current_ffmpeg, current_server, blocking_render, stream_manual_skip, stream_transition_in_progress
+    global blocking_render, stream_manual_skip, stream_transition_in_progress, stream_start_offset
     stream_manual_skip = False
 
     core.load_renderer_states_from_db()
@@ -1369,164 +1569,49 @@ def stream_songlog_entry():
             print("Renderer active – aborting stream_songlog_entry()")
         return
 
-    stream_profile_selected = next(
-        (item for item in stream_profile_menu_options if item["id"] == SAVED_STREAM_PROFILE),
-        stream_profile_menu_options[1]  # fallback sur "standard"
-    )
-
     if core.DEBUG:
         print(f"⇨ Start Local Stream")
-
-    core.message_text = core.t("info_start_stream")
-    core.message_permanent = True
-    blocking_render = True
-    time.sleep(0.05)
-    render_screen()
-
-    class StreamHandler(http.server.BaseHTTPRequestHandler):
-        def do_GET(self):
-            global current_ffmpeg, blocking_render, current_server, stream_manual_stop, stream_manual_skip
-            if self.path != "/stream.mp3":
-                self.send_error(404)
-                return
-
-            self.send_response(200)
-            self.send_header("Content-Type", "audio/mpeg")
-            self.end_headers()
-
+        print(f"  Using profile: {SAVED_STREAM_PROFILE}")
+
+    trace = stream_timing.current_trace
+    track = stream_track_from_entry(stream_entry, stream_query, stream_queue_store.pos)
+    if stream_start_offset:
+        track["start"] = stream_start_offset
+        stream_start_offset = 0
+    if trace and not trace.finished:
+        track["trace"] = trace
+        # MPD déjà connecté: le premier octet envoyé est le premier son
+        trace.finish_on = "first_byte" if local_stream.is_client_connected() else "first_audio"
+    try:
+        local_stream.start_server()
+        if local_stream.play(track):
+            # MPD lit déjà le flux local: la nouvelle source enchaîne sans rechargement
+            core.message_permanent = False
+            core.message_text = None
+            core.show_message(core.t("info_streaming", title=final_title_yt))
             if core.DEBUG:
-                print(f"→ Launching ffmpeg for: {final_title_yt}")
-
-            cmd = [
-                "ffmpeg", "-re",
-                "-fflags", "+discardcorrupt",
-                "-reconnect", "1",
-                "-reconnect_streamed", "1",
-                "-reconnect_delay_max", "2",
-                "-i", stream_url,
-                "-vn",
-                "-c:a", "libmp3lame",
-                "-b:a", stream_profile_selected["ffmpeg_bitrate"],
-                "-metadata", f"title={final_title_yt}",
-                "-f", "mp3", "-"
-            ]
+                print(f"✅ Stream handed off: {final_title_yt}")
+        else:
+            core.message_text = core.t("info_start_stream")
+            core.message_permanent = True
+            blocking_render = True
+            render_screen()
+            if trace:
+                trace.finish_on = "first_audio"
+                with trace.span("mpd_play"):
+                    reload_local_stream()
+                threading.Thread(target=wait_first_audio, args=(trace,), daemon=True).start()
+            else:
+                reload_local_stream()
+            core.message_permanent = False
+            core.message_text = None
+            core.show_message(core.t("info_streaming", title=final_title_yt))
             if core.DEBUG:
-                print("[ffmpeg] Launching with parameters:")
-                print(f"    Codec:     libmp3lame")
-                print(f"    Bitrate:   {stream_profile_selected['ffmpeg_bitrate']}")
-
-            try:
-                current_ffmpeg = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-
-                if not current_ffmpeg or not current_ffmpeg.stdout:
-                    if core.DEBUG:
-                        print("⚠️ ffmpeg not ready, aborting stream")
-                    return
-
-                empty_reads = 0
-                while True:
-                    chunk = current_ffmpeg.stdout.read(4096)
-                    if not chunk:
-                        empty_reads += 1
-                        if empty_reads >= 20:
-                            if core.DEBUG:
-                                print("2s of empty chunk – aborting stream loop")
-                            break
-                        time.sleep(0.1)
-                        continue
-
-                    empty_reads = 0
-                    try:
-                        self.wfile.write(chunk)
-                        self.wfile.flush()
-                    except (BrokenPipeError, ConnectionResetError) as e:
-                        if core.DEBUG:
-                            print(f"⚠️ Client disconnected: {e}")
-                        break
-
-            except Exception as e:
-                if "NoneType" in str(e) and "stdout" in str(e):
-                    # erreur attendue lors de l'arrêt de ffmpeg, on ignore en mode normal
-                    if core.DEBUG:
-                        print(f"Ignored stream error on ffmpeg stop: {e}")
-                else:
-                    core.debug_error("error_stream", e)
-
-            finally:
-                try:
-                    client = MPDClient()
-                    client.connect("localhost", 6600)
-                    client.stop()
-                    client.close()
-                    client.disconnect()
-                except Exception as e:
-                    core.debug_error("error_mpd", e, silent=True)
-                    if not core.DEBUG:
-                        core.show_message(core.t("error_generic"))
-
-                if current_ffmpeg and current_ffmpeg.poll() is None:
-                    try:
-                        current_ffmpeg.terminate()
-                        current_ffmpeg.wait(timeout=4)
-                        if core.DEBUG:
-                            print("✓ ffmpeg terminated cleanly")
-                    except subprocess.TimeoutExpired:
-                        if core.DEBUG:
-                            print("⚠️ ffmpeg timeout, forcing kill")
-                        try:
-                            current_ffmpeg.kill()
-                            current_ffmpeg.wait(timeout=2)
-                            if core.DEBUG:
-                                print("✓ ffmpeg killed")
-                        except Exception as e:
-                            core.debug_error("error_ffmpeg", e)
-                current_ffmpeg = None
-                if core.DEBUG:
-                    print("----------------End of Stream---------------------")
-                    print(f"[StreamHandler] stream_manual_skip = {stream_manual_skip}")
-                    print(f"[StreamHandler] stream_manual_stop = {stream_manual_stop}")
-                core.load_renderer_states_from_db()
-                if not stream_manual_skip and not stream_manual_stop and not core.is_renderer_active():
-                    threading.Thread(target=next_stream, daemon=True).start()
-                stream_manual_stop = False
-                stream_manual_skip = False
-
-    def run_server():
-        global current_server
-        current_server = http.server.HTTPServer(("0.0.0.0", 8080), StreamHandler)
-        current_server.serve_forever()
-
-    threading.Thread(target=run_server, daemon=True).start()
-
-    try:
-        client = MPDClient()
-        client.connect("localhost", 6600)
-        client.clear()
-        client.load("RADIO/Local Stream.pls")
-
-        for _ in range(5):
-            try:
-                with socket.create_connection(("localhost", 8080), timeout=1):
-                    break
-            except:
-                time.sleep(0.2)
-
-        client.play()
-        client.close()
-        client.disconnect()
-        time.sleep(1)
-        core.message_permanent = False
-        core.message_text = None
-        core.show_message(core.t("info_streaming", title=final_title_yt))
-        if core.DEBUG:
-            print(f"✅ Streaming ready: {final_title_yt}")
-            print(f"  Using profile: {SAVED_STREAM_PROFILE}")
+                print(f"✅ Streaming ready: {final_title_yt}")
     except Exception as e:
         core.message_permanent = False
         core.message_text = None
-        stream_transition_in_progress = False
-        blocking_render = False
-        core.debug_error("error_mpd", e, silent=True)
+        core.debug_error("error_stream", e, silent=True)
         if not core.DEBUG:
             core.show_message(core.t("error_generic"))
 
@@ -1549,23 +1634,26 @@ def run_bluetooth_action(*args):
     thread.join()  # ← tu peux mettre un timeout si nécessaire
     return output[0] if output else ""
 
+def toggle_renderer(renderer, action):
+    subprocess.call(["sudo", "php", str(core.MOODEOLED_DIR / "renderer-toggle.php"), renderer, action])
+    core.load_renderer_states_from_db()
+
 def perform_bluetooth_scan():
-    global blocking_render, bluetooth_scan_menu_active
-    core.message_text = core.t("inf_bt_scanning")
-    core.message_permanent = True
-    blocking_render = True
-    time.sleep(0.05)
-    render_screen()
-
-    run_bluetooth_action("-S")
-    update_trusted_devices_menu()
-
-    time.sleep(0.5)
-    core.message_permanent = False
-    core.message_text = None
-    core.show_message(core.t("info_bt_scan_ok"))
-    blocking_render = False
-    bluetooth_scan_menu_active = True
+    global bluetooth_menu_active
+    bluetooth_menu_active = True
+
+    def scan():
+        run_bluetooth_action("-S")
+        update_trusted_devices_menu()
+
+    def on_done(_):
+        global bluetooth_menu_active, bluetooth_scan_menu_active
+        core.show_message(core.t("info_bt_scan_ok"))
+        # N'ouvre les résultats que si l'utilisateur est resté dans le menu Bluetooth
+        if bluetooth_menu_active:
+            bluetooth_menu_active = False
+            bluetooth_scan_menu_active = True
+    action_executor.submit("system", "bt_scan", scan, label=core.t("inf_bt_scanning"), done=on_done)
 
 def update_trusted_devices_menu():
     global bluetooth_scan_menu_options
@@ -1644,33 +1732,17 @@ def open_device_actions_menu(mac, paired=False, connected=False):
     bluetooth_device_actions_menu_options = options
 
 def run_bt_action_and_msg(flag, mac, msg_key):
-    global blocking_render, bluetooth_menu_active
-
-    core.message_text = core.t("info_working")
-    core.message_permanent = True
-    blocking_render = True
-    time.sleep(0.05)
-    render_screen()
-
-    run_bluetooth_action(flag, mac)
-
-    time.sleep(0.5)
-    core.message_permanent = False
-    core.message_text = None
-    core.show_message(core.t(msg_key, name=mac))
-    blocking_render = False
+    global bluetooth_menu_active
     bluetooth_menu_active = True
+    action_executor.submit(
+        "system", f"bt_action{flag}", run_bluetooth_action, flag, mac,
+        label=core.t("info_working"),
+        done=lambda _: core.show_message(core.t(msg_key, name=mac))
+    )
 
 def toggle_audio_output(mode):
-    global blocking_render, bluetooth_menu_active
-
-    core.message_text = core.t("info_working")
-    core.message_permanent = True
-    blocking_render = True
-    time.sleep(0.05)
-    render_screen()
-
-    output = []
+    global bluetooth_menu_active
+    bluetooth_menu_active = True
 
     def act_bluaudiout():
         try:
@@ -1678,21 +1750,21 @@ def toggle_audio_output(mode):
                 ["sudo", "php", str(core.MOODEOLED_DIR / "audioout-toggle.php"), mode],
                 capture_output=True, text=True, check=False
             )
-            output.append(result.stdout.strip())
+            output = result.stdout.strip()
         except Exception as e:
             core.debug_error("error_audioout", e)
-            output.append("[ERROR]")
-
-    thread = threading.Thread(target=act_bluaudiout)
-    thread.start()
-    thread.join()
-
-    core.load_renderer_states_from_db()
-    time.sleep(0.5)
-    core.message_permanent = False
-    core.message_text = None
+            output = "[ERROR]"
+        core.load_renderer_states_from_db()
+        return output
+
+    action_executor.submit(
+        "system", "audioout_toggle", act_bluaudiout,
+        label=core.t("info_working"),
+        done=lambda output: show_audio_output_result(mode, output)
+    )
 
-    result_line = output[0] if output else "[ERROR]"
+def show_audio_output_result(mode, output):
+    result_line = output or "[ERROR]"
 
     if result_line.startswith("[AUDIOOUT_CHANGED]"):
         core.show_message(core.t("info_audioout_changed", mode=mode))
@@ -1706,8 +1778,6 @@ def toggle_audio_output(mode):
         core.show_message(core.t("error_audioout_usage"))
     else:
         core.show_message(result_line)
-    blocking_render = False
-    bluetooth_menu_active = True
 
 def render_screen():
     global now_playing_mode
@@ -1725,6 +1795,8 @@ def render_screen():
         draw_confirm_box()
     elif hardware_info_active:
         draw_hardware_info()
+    elif stream_stats_active:
+        draw_stream_stats()
     elif language_menu_active:
         draw_language_menu()
     elif stream_profile_menu_active:
@@ -1763,6 +1835,7 @@ def render_screen():
         now_playing_mode = True
         draw_nowplaying()
 
+    core.draw_progress()
     core.disp.image(core.image)
     core.disp.show()
 
@@ -1784,7 +1857,7 @@ def draw_menu():
             menu_options_contextuel = menu_add_songlog_option.copy() + menu_options.copy()
     elif menu_context_flag == "local_stream":
         filtered_options = [opt for opt in menu_options if opt.get("id") not in {"remove_queue", "playback_modes"}]
-        if stream_queue:
+        if stream_queue_store.order:
             menu_options_contextuel = menu_show_stream_queue_option.copy() + filtered_options
         else:
             menu_options_contextuel = filtered_options
@@ -1806,20 +1879,28 @@ def draw_power_menu():
 
 def draw_songlog_menu():
     selected = set()
-    if stream_queue and 0 <= stream_queue_pos < len(stream_queue):
-        playing_index = stream_queue[stream_queue_pos]
-        if 0 <= playing_index < len(songlog_lines):
-            selected = {songlog_lines[playing_index]}
-    core.draw_custom_menu(songlog_lines, songlog_selection, title=core.t("title_songlog"), multi=selected, checkmark="▶ ")
+    playing_id = stream_queue_store.current()
+    if playing_id is not None:
+        if playing_id in songlog_ids:
+            selected = {songlog_lines[songlog_ids.index(playing_id)]}
+    title = f"{core.t('title_songlog')} {songlog_selection + 1}/{songlog_total}"
+    core.draw_custom_menu(songlog_lines, songlog_selection, title=title, multi=selected, checkmark="▶ ")
 
 def draw_stream_queue_menu():
     global stream_queue_lines
-    stream_queue_lines = [songlog_lines[i] for i in stream_queue if 0 <= i < len(songlog_lines)]
-    selected = {stream_queue_lines[stream_queue_pos]}
+    stream_queue_lines = [queue_query(entry_id) or "?" for entry_id in stream_queue_store.order]
+    selected = {stream_queue_lines[stream_queue_store.pos]} if stream_queue_lines else set()
     core.draw_custom_menu(stream_queue_lines, stream_queue_selection, title=core.t("title_stream_queue"), multi=selected, checkmark="▶ ")
 
 def draw_stream_queue_action_menu():
-    core.draw_custom_menu([item["label"] for item in stream_queue_action_options], stream_queue_action_selection, title=core.t("title_action_stream_queue"))
+    labels = []
+    for item in stream_queue_action_options:
+        if item["id"] == "repeat_stream_queue":
+            labels.append(f"{item['label']}: {core.t('repeat_' + stream_queue_store.repeat)}")
+        else:
+            labels.append(item["label"])
+    active = {item["label"] for item in stream_queue_action_options if item["id"] == "shuffle_stream_queue" and stream_queue_store.shuffle}
+    core.draw_custom_menu(labels, stream_queue_action_selection, title=core.t("title_action_stream_queue"), multi=active)
 
 def draw_songlog_action_menu():
     core.draw_custom_menu([item["label"] for item in songlog_action_options], songlog_action_selection, title=core.t("title_action_songlog"))
@@ -1880,6 +1961,24 @@ def draw_bluetooth_device_actions_menu():
 def draw_hardware_info():
     core.draw_custom_menu(hardware_info_lines, hardware_info_selection, title=core.t("title_hardware_info"))
 
+def update_stream_stats():
+    global stream_stats_lines
+    # Dernières lectures (étapes en ms), puis état des workers, du tampon et des caches
+    stream_stats_lines = stream_timing.recent_lines() + [
+        yt_resolver.stats_line(),
+        yt_cache.stats_line(),
+        yt_cache.evict_line(),
+        connectivity.stats_line(),
+        f"songlog: {songlog_store.count()} entries, {songlog_store.unique_count()} unique",
+        local_stream.stats_line(),
+        local_stream.cpu_line(),
+        local_stream.loudness_line(),
+        audio_cache.stats_line(),
+    ] + action_executor.stats_lines()
+
+def draw_stream_stats():
+    core.draw_custom_menu(stream_stats_lines, stream_stats_selection, title=core.t("title_stream_stats"))
+
 def draw_confirm_box():
     core.draw_custom_menu([item["label"] for item in confirm_box_options], confirm_box_selection, title=confirm_box_title)
 
@@ -2013,37 +2112,40 @@ def nav_left_short():
         previous_stream(manual_skip=True)
         return
     if now_playing_mode:
-        subprocess.run(["mpc", "prev"])
+        mpd_command("previous")
 
 def nav_right_short():
     if menu_context_flag == "local_stream":
         next_stream(manual_skip=True)
         return
     if now_playing_mode:
-        subprocess.run(["mpc", "next"])
+        mpd_command("next")
+
+def show_volume(target):
+    core.global_state["volume"] = target
 
 def nav_up():
     if now_playing_mode:
-        subprocess.run(["curl", "-s", "http://127.0.0.1/command/?cmd=set_volume+up+2"])
+        step_volume(2)
 
 def nav_down():
     if now_playing_mode:
-        subprocess.run(["curl", "-s", "http://127.0.0.1/command/?cmd=set_volume+dn+2"])
+        step_volume(-2)
 
 def nav_right_long():
     if now_playing_mode:
-        subprocess.run(["mpc", "seek", "+00:00:10"])
+        seek_relative(10)
 
 def nav_left_long():
     if now_playing_mode:
-        subprocess.run(["mpc", "seek", "-00:00:10"])
+        seek_relative(-10)
     else:
         core.show_message(core.t("info_back_home"))
 
         for var in [
             "menu_active", "confirm_box_active", "help_active",
             "songlog_active", "songlog_action_active",
-            "tool_menu_active", "language_menu_active", "hardware_info_active", "config_menu_active",
+            "tool_menu_active", "language_menu_active", "hardware_info_active", "stream_stats_active", "config_menu_active",
             "power_menu_active", "renderers_menu_active", "bluetooth_menu_active",
             "bluetooth_scan_menu_active", "bluetooth_paired_menu_active",
             "bluetooth_audioout_menu_active", "bluetooth_device_actions_menu_active",
@@ -2126,29 +2228,21 @@ def nav_info():
 
 def nav_back():
     core.show_message(core.t("info_go_library_screen"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "navoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "nowoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_navoled", core.switch_to_service, "navoled")
 
 def nav_back_long():
     core.show_message(core.t("info_go_playlist_screen"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "queoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "nowoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_queoled", core.switch_to_service, "queoled")
 
 
 def finish_press(key):
     global menu_active, menu_selection, songlog_active, songlog_selection, songlog_action_active, songlog_action_selection
     global power_menu_active, power_menu_selection, playback_modes_menu_active, playback_modes_selection
-    global stream_queue_active, stream_queue_selection, stream_queue_action_active, stream_queue_action_selection, stream_queue_pos, stream_manual_skip, stream_transition_in_progress
+    global stream_queue_active, stream_queue_selection, stream_queue_action_active, stream_queue_action_selection, stream_manual_skip, stream_transition_in_progress
     global tool_menu_selection, tool_menu_active, config_menu_active, config_menu_selection, sleep_timeout_options
     global stream_profile_menu_active, stream_profile_menu_selection, SAVED_STREAM_PROFILE
-    global help_active, help_selection, hardware_info_active, hardware_info_selection, language_menu_active, language_menu_selection
-    global confirm_box_active, confirm_box_selection, confirm_box_callback, renderers_menu_active, renderers_menu_selection
+    global help_active, help_selection, hardware_info_active, hardware_info_selection, stream_stats_active, stream_stats_selection, language_menu_active, language_menu_selection
+    global confirm_box_active, confirm_box_selection, confirm_box_title, confirm_box_callback, renderers_menu_active, renderers_menu_selection
     global bluetooth_menu_active, bluetooth_menu_selection, bluetooth_scan_menu_active, bluetooth_scan_menu_selection, bluetooth_audioout_menu_active, bluetooth_audioout_menu_selection
     global bluetooth_paired_menu_active, bluetooth_paired_menu_selection, bluetooth_device_actions_menu_active, bluetooth_device_actions_menu_selection
     global blocking_render, screen_on, idle_timer, is_sleeping, last_wake_time
@@ -2318,6 +2412,7 @@ def finish_press(key):
             elif option_id == "show_stream_queue":
                 menu_active = False
                 stream_queue_active = True
+                stream_queue_selection = stream_queue_store.pos
             elif option_id == "remove_queue":
                 menu_active = False
                 remove_from_queue()
@@ -2406,8 +2501,18 @@ def finish_press(key):
                     print(f"▶️ Play from queue at position {stream_queue_selection}")
                 stream_manual_skip = True
                 stream_transition_in_progress = True
-                stream_queue_pos = stream_queue_selection
-                yt_search_track(stream_queue_pos, preload=False)
+                entry_id = stream_queue_store.jump(stream_queue_selection)
+                schedule_preloads()
+                yt_search_track(entry_id, preload=False)
+            elif selected_action == "shuffle_stream_queue":
+                stream_queue_store.set_shuffle(not stream_queue_store.shuffle)
+                stream_queue_selection = stream_queue_store.pos
+                schedule_preloads()
+                core.show_message(core.t("info_shuffle_on") if stream_queue_store.shuffle else core.t("info_shuffle_off"))
+            elif selected_action == "repeat_stream_queue":
+                mode = stream_queue_store.cycle_repeat()
+                schedule_preloads()
+                core.show_message(core.t("info_repeat_mode", mode=core.t("repeat_" + mode)))
             core.reset_scroll("menu_item", "menu_title")
         return
 
@@ -2449,16 +2554,21 @@ def finish_press(key):
                 renderers_menu_selection = 0
             elif option_id == "show_songlog":
                 tool_menu_active = False
+                songlog_selection = 0
                 show_songlog()
                 if not songlog_lines:
                     tool_menu_active = True
                 else:
                     songlog_active = True
-                songlog_selection = 0
             elif option_id == "hardware_info":
                 tool_menu_active = False
                 hardware_info_active = True
                 threading.Thread(target=update_hardware_info, daemon=True).start()
+            elif option_id == "stream_stats":
+                tool_menu_active = False
+                stream_stats_active = True
+                stream_stats_selection = 0
+                update_stream_stats()
             elif option_id == "configuration":
                 tool_menu_active = False
                 config_menu_active = True
@@ -2489,8 +2599,7 @@ def finish_press(key):
             else:
                 action = "off" if core.global_state.get(renderer + "svc") == "1" else "on"
                 core.show_message(core.t("info_renderer_switched", name=renderer.capitalize(), status=action))
-                subprocess.call(["sudo", "php", str(core.MOODEOLED_DIR / f"renderer-toggle.php"), renderer, action])
-                core.load_renderer_states_from_db()
+                action_executor.submit("system", f"renderer_{renderer}", toggle_renderer, renderer, action, label=core.t("info_working"))
             core.reset_scroll("menu_item", "menu_title")
         return
 
@@ -2513,8 +2622,7 @@ def finish_press(key):
             if item == "bt_toggle":
                 action = "off" if core.global_state.get("btsvc") == "1" else "on"
                 core.show_message(core.t("info_renderer_switched", name="Bluetooth", status=action))
-                subprocess.call(["sudo", "php", str(core.MOODEOLED_DIR / "renderer-toggle.php"), "bluetooth", action])
-                core.load_renderer_states_from_db()
+                action_executor.submit("system", "renderer_bluetooth", toggle_renderer, "bluetooth", action, label=core.t("info_working"))
             elif item == "bt_scan":
                 bluetooth_menu_active = False
                 perform_bluetooth_scan()
@@ -2530,8 +2638,11 @@ def finish_press(key):
                 bluetooth_audioout_menu_active = True
                 bluetooth_audioout_menu_selection = 0
             elif item == "bt_disconnect_all":
-                run_bluetooth_action("-D")
-                core.show_message(core.t("info_bt_all_disconnected"))
+                action_executor.submit(
+                    "system", "bt_disconnect_all", run_bluetooth_action, "-D",
+                    label=core.t("info_working"),
+                    done=lambda _: core.show_message(core.t("info_bt_all_disconnected"))
+                )
             core.reset_scroll("menu_item", "menu_title")
         return
 
@@ -2632,7 +2743,11 @@ def finish_press(key):
                 songlog_selection = (songlog_selection - 1) % len(songlog_lines)
                 core.reset_scroll("menu_item")
             elif key == "KEY_DOWN":
-                songlog_selection = (songlog_selection + 1) % len(songlog_lines)
+                # Fin de la page chargée: page suivante de l'historique avant de boucler
+                if songlog_selection == len(songlog_lines) - 1 and len(songlog_lines) < songlog_total and load_more_songlog():
+                    songlog_selection += 1
+                else:
+                    songlog_selection = (songlog_selection + 1) % len(songlog_lines)
                 core.reset_scroll("menu_item")
             elif key == "KEY_OK":
                 songlog_active = False
@@ -2658,19 +2773,19 @@ def finish_press(key):
             if option_id == "play_yt_songlog":
                 songlog_action_active = False
                 ensure_local_stream()
-                if not has_internet_connection():
-                    core.show_message(core.t("info_no_internet"))
-                    return
-                stream_queue.clear()
-                yt_search_track(songlog_selection)
+                entry_id = songlog_ids[songlog_selection]
+
+                def play_entry():
+                    set_stream_queue([entry_id])
+                    preload_scheduler.cancel_all()
+                    yt_search_track(stream_queue_store.current())
+                if stream_playable(play_entry, entry_id):
+                    play_entry()
             elif option_id == "queue_yt_songlog":
                 songlog_action_active = False
                 ensure_local_stream()
-                if not has_internet_connection():
-                    core.show_message(core.t("info_no_internet"))
-                    return
-                stream_queue.clear()
-                play_all_songlog_from_queue()
+                if stream_playable(play_all_songlog_from_queue):
+                    play_all_songlog_from_queue()
             elif option_id == "show_info_songlog":
                 info = songlog_meta[songlog_selection]
                 if info:
@@ -2684,10 +2799,15 @@ def finish_press(key):
                     tool_menu_active = True
                 else:
                     songlog_active = True
+            elif option_id == "export_songlog":
+                songlog_action_active = False
+                songlog_active = True
+                export_songlog()
             elif option_id == "delete_all_songlog":
                 songlog_action_active = False
                 confirm_box_active = True
                 confirm_box_selection = 1
+                confirm_box_title = core.t("title_confirm")
                 confirm_box_callback = confirm_delete_all_songlog
             core.reset_scroll("menu_item", "menu_title")
         return
@@ -2766,6 +2886,22 @@ def finish_press(key):
             os.execv(sys.executable, ['python3'] + sys.argv)
         return
 
+    if stream_stats_active:
+        if key == "KEY_UP" and stream_stats_selection > 0:
+            stream_stats_selection -= 1
+            core.reset_scroll("menu_item")
+        elif key == "KEY_DOWN" and stream_stats_selection < len(stream_stats_lines) - 1:
+            stream_stats_selection += 1
+            core.reset_scroll("menu_item")
+        elif key == "KEY_LEFT":
+            stream_stats_active = False
+            tool_menu_active = True
+            core.reset_scroll("menu_item")
+        elif key == "KEY_OK":
+            update_stream_stats()
+            stream_stats_selection = min(stream_stats_selection, max(0, len(stream_stats_lines) - 1))
+        return
+
     if hardware_info_active:
         if key == "KEY_UP" and hardware_info_selection > 0:
             hardware_info_selection -= 1
@@ -2816,9 +2952,80 @@ def finish_press(key):
     debounce_data.pop(key, None)
 
 core.start_message_updater()
+action_executor.set_hooks(core.set_progress, core.DEBUG)
+try:
+    yt_cache.open_cache(yt_cache_db_path, yt_cache_path)
+except Exception as e:
+    core.debug_error("error_yt_cache", e, silent=True)
+yt_cache.configure_eviction(
+    max_entries=core.config.getint("manual", "yt_cache_max_entries", fallback=0),
+    max_age_days=core.config.getint("manual", "yt_cache_max_age_days", fallback=0),
+    settle=core.config.getint("manual", "yt_cache_evict_delay", fallback=30),
+    keys_fn=songlog_store.keys,
+    run_fn=evict_yt_cache
+)
+yt_cache.schedule_evict()
+try:
+    songlog_store.open_store(songlog_db_path, core.MOODEOLED_DIR / "songlog.txt")
+except Exception as e:
+    core.debug_error("error_rd_songlog", e, silent=True)
+yt_refresher.configure(
+    horizon=core.config.getint("manual", "yt_refresh_horizon", fallback=1800),
+    interval=core.config.getint("manual", "yt_refresh_interval", fallback=60),
+    min_gap=core.config.getfloat("manual", "yt_refresh_min_gap", fallback=5.0),
+    recent_use=core.config.getint("manual", "yt_refresh_recent_hours", fallback=24) * 3600
+)
+yt_refresher.set_hooks(refresh_yt_query, upcoming_stream_queries,
+                       lambda: not core.is_renderer_active() and connectivity.is_online(), core.DEBUG)
+yt_refresher.start()
+preload_scheduler.configure(workers=core.config.getint("manual", "preload_workers", fallback=2))
+preload_scheduler.set_hooks(preload_yt_query, core.DEBUG)
+yt_resolver.set_backend(
+    core.config.get("manual", "resolver", fallback="yt_dlp").strip(),
+    local_dir=core.config.get("manual", "resolver_local_dir", fallback="").strip() or None,
+    local_url=core.config.get("manual", "resolver_local_url", fallback="").strip() or None,
+    local_delay=core.config.getfloat("manual", "resolver_local_delay", fallback=0.0)
+)
+yt_resolver.start(
+    warm_formats=[current_stream_profile()["yt_format"]],
+    workers=core.config.getint("manual", "resolver_workers", fallback=2),
+    debug_flag=core.DEBUG
+)
+local_stream.configure(
+    prespawn=core.config.getint("manual", "stream_prespawn", fallback=15),
+    buffer_kb=core.config.getint("manual", "stream_buffer_kb", fallback=512),
+    preroll_kb=core.config.getint("manual", "stream_preroll_kb", fallback=64),
+    loudness=core.config.getboolean("manual", "stream_loudness", fallback=False),
+    loudness_target=core.config.getfloat("manual", "stream_loudness_target", fallback=-14.0),
+    loudness_max_gain=core.config.getfloat("manual", "stream_loudness_max_gain", fallback=6.0)
+)
+local_stream.set_hooks(on_local_stream_end, on_local_stream_changed, next_local_stream_track, on_local_stream_reconnect, core.DEBUG)
+local_stream.set_loudness_hook(on_local_stream_loudness)
+stream_timing.configure(
+    log_path=core.config.get("manual", "stream_timing_log", fallback="").strip() or core.MOODEOLED_DIR / "stream_timing.jsonl",
+    debug_flag=core.DEBUG
+)
+audio_cache.configure(
+    directory=core.config.get("manual", "audio_cache_dir", fallback="").strip() or core.MOODEOLED_DIR / "audio_cache",
+    max_mb=core.config.getint("manual", "audio_cache_mb", fallback=0)
+)
+if audio_cache.enabled():
+    local_stream.set_tee(lambda track, fmt: audio_cache.open_writer(track.get("query"), fmt, track))
+    action_executor.submit("filesystem", "audio_cache_verify", audio_cache.verify)
+
+connectivity.configure(
+    interval_online=core.config.getint("manual", "net_check_interval", fallback=30),
+    interval_offline=core.config.getint("manual", "net_check_interval_offline", fallback=5)
+)
+connectivity.set_hooks(on_connectivity_restored, core.DEBUG)
+connectivity.start()
+
+stream_queue_store.load(core.MOODEOLED_DIR / "stream_queue.json")
+# Résolution possiblement longue (yt-dlp): file "network", la file "transport" reste libre pour les touches
+action_executor.submit("network", "resume_stream_queue", resume_stream_queue)
 
 start_inputs(core.config, finish_press, msg_hook=core.show_message)
-set_custom_hooks(core.show_message, next_stream, previous_stream, set_stream_manual_stop)
+set_custom_hooks(core.show_message, next_stream, previous_stream, set_stream_manual_stop, show_volume)
 
 def main():
     global previous_blocking_render, idle_timer
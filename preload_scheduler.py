@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import heapq
+import time
+import threading
+
+from yt_cache import normalize_key
+
+WORKERS = 2
+BEHIND = 2
+IN_FLIGHT_TIMEOUT = 60
+
+# === External hooks ===
+preload_hook = None
+debug = False
+
+# === Shared data ===
+jobs = []
+jobs_cond = threading.Condition()
+generation = 0
+job_seq = 0
+workers_started = False
+
+in_flight = {}
+in_flight_lock = threading.Lock()
+preload_stats = {"done": 0, "cancelled": 0, "shared": 0, "failed": 0}
+
+def set_hooks(preload_fn, debug_flag=False):
+    global preload_hook, debug
+    preload_hook = preload_fn
+    debug = debug_flag
+
+def configure(workers=None, behind=None):
+    global WORKERS, BEHIND
+    if workers is not None:
+        WORKERS = max(1, workers)
+    if behind is not None:
+        BEHIND = max(0, behind)
+
+# === Résolutions partagées: une seule résolution en cours par requête ===
+def resolve_shared(query, resolve_fn):
+    key = normalize_key(query)
+    with in_flight_lock:
+        job = in_flight.get(key)
+        owner = job is None
+        if owner:
+            job = {"event": threading.Event(), "result": None, "error": None}
+            in_flight[key] = job
+    if not owner:
+        preload_stats["shared"] += 1
+        if debug:
+            print(f"[preload] waiting for in-flight resolve: {query}")
+        if job["event"].wait(IN_FLIGHT_TIMEOUT) and job["error"] is None:
+            return job["result"]
+        return resolve_fn(query)
+    try:
+        job["result"] = resolve_fn(query)
+        return job["result"]
+    except Exception as e:
+        job["error"] = e
+        raise
+    finally:
+        with in_flight_lock:
+            in_flight.pop(key, None)
+        job["event"].set()
+
+def is_in_flight(query):
+    with in_flight_lock:
+        return normalize_key(query) in in_flight
+
+# === File de priorité: distance à la position courante ===
+def priority(offset):
+    # En avant: 1, 2, 3... En arrière (piste précédente): 2, 4...
+    return offset if offset > 0 else -2 * offset
+
+def update(position, queue_queries):
+    # queue_queries: [(position dans la file, requête)], reconstruit à chaque saut
+    global generation, job_seq
+    with jobs_cond:
+        generation += 1
+        cancelled = len(jobs)
+        jobs.clear()
+        seen = set()
+        for pos, query in queue_queries:
+            offset = pos - position
+            if offset == 0 or offset < -BEHIND:
+                continue
+            key = normalize_key(query)
+            if key in seen:
+                continue
+            seen.add(key)
+            job_seq += 1
+            heapq.heappush(jobs, (priority(offset), job_seq, generation, query))
+        preload_stats["cancelled"] += cancelled
+        jobs_cond.notify_all()
+    start()
+    if debug:
+        print(f"[preload] generation {generation}: {len(jobs)} queued, {cancelled} cancelled")
+
+def cancel_all():
+    global generation
+    with jobs_cond:
+        generation += 1
+        preload_stats["cancelled"] += len(jobs)
+        jobs.clear()
+
+def preload_worker():
+    while True:
+        with jobs_cond:
+            while not jobs:
+                jobs_cond.wait()
+            prio, _, job_generation, query = heapq.heappop(jobs)
+            if job_generation != generation:
+                continue
+        if is_in_flight(query):
+            continue
+        start_ts = time.perf_counter()
+        try:
+            preload_hook(query)
+            preload_stats["done"] += 1
+        except Exception as e:
+            preload_stats["failed"] += 1
+            print(f"error preload {query}: {e}")
+        if debug:
+            print(f"[preload] p{prio} {query} in {(time.perf_counter() - start_ts) * 1000:.0f}ms")
+
+def start():
+    global workers_started
+    with jobs_cond:
+        if workers_started or preload_hook is None:
+            return
+        workers_started = True
+    for _ in range(WORKERS):
+        threading.Thread(target=preload_worker, daemon=True).start()
@@ -15,6 +15,7 @@ from mpd import MPDClient
 from pathlib import Path
 
 import core_common as core
+import action_executor
 from input_manager import start_inputs, debounce_data, process_key
 from media_key_actions import handle_audio_keys, handle_custom_key, USED_MEDIA_KEYS, set_hooks as set_custom_hooks
 
@@ -482,6 +483,7 @@ def render_screen():
     else:
         draw_queue()
 
+    core.draw_progress()
     core.disp.image(core.image)
     core.disp.show()
 
@@ -995,19 +997,11 @@ def nav_info():
 
 def nav_back():
     core.show_message(core.t("info_back_nowplaying"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "nowoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "queoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_nowoled", core.switch_to_service, "nowoled")
 
 def nav_back_long():
     core.show_message(core.t("info_go_library_screen"))
-    render_screen()
-    time.sleep(1)
-    subprocess.call(["sudo", "systemctl", "start", "navoled.service"])
-    subprocess.call(["sudo", "systemctl", "stop", "queoled.service"])
-    sys.exit(0)
+    action_executor.submit("system", "switch_navoled", core.switch_to_service, "navoled")
 
 def trigger_menu(index):
     global playlist_mode, playlist_selection, playlist_list
@@ -1227,11 +1221,7 @@ def finish_press(key):
                 recent_albums_menu_selection = 0
             elif selected_id == "browse_library":
                 core.show_message(core.t("info_go_library_screen"))
-                render_screen()
-                time.sleep(1)
-                subprocess.call(["sudo", "systemctl", "start", "navoled.service"])
-                subprocess.call(["sudo", "systemctl", "stop", "queoled.service"])
-                sys.exit(0)
+                action_executor.submit("system", "switch_navoled", core.switch_to_service, "navoled")
         return
 
     if recent_albums_menu_active:
@@ -1365,6 +1355,7 @@ def finish_press(key):
     debounce_data.pop(key, None)
 
 core.start_message_updater()
+action_executor.set_hooks(core.set_progress, core.DEBUG)
 
 start_inputs(core.config, finish_press, msg_hook=core.show_message)
 set_custom_hooks(core.show_message)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import re
+import html
+import unicodedata
+
+# Clé de recherche: les variantes d'une même piste ("Remastered", casse, accents, entités HTML...) donnent la même clé
+NOISE_WORDS = (
+    r"remaster(?:ed)?(?:\s+version)?(?:\s+\d{4})?",
+    r"\d{4}\s+remaster(?:ed)?(?:\s+version)?",
+    r"official\s+(?:music\s+)?(?:video|audio|clip|lyric\s+video)",
+    r"(?:with\s+)?lyrics?",
+    r"audio", r"video", r"clip\s+officiel", r"hd", r"hq", r"4k",
+    r"radio\s+edit", r"single\s+version", r"album\s+version", r"explicit", r"mono", r"stereo",
+)
+NOISE_RE = re.compile(r"[\(\[]\s*(?:" + "|".join(NOISE_WORDS) + r")\s*[\)\]]")
+# Suffixe sans parenthèses: "Title - Remastered 2011"
+NOISE_SUFFIX_RE = re.compile(r"\s+-\s+(?:" + "|".join(NOISE_WORDS[:2]) + r")\s*$")
+DASHES = str.maketrans({"‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "−": "-",
+                        "‘": "'", "’": "'", "“": '"', "”": '"', " ": " "})
+
+def fold(text):
+    # Compatibilité Unicode (ligatures, pleine chasse) puis suppression des accents
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def normalize(query):
+    text = fold(html.unescape(query).translate(DASHES)).casefold()
+    text = NOISE_RE.sub(" ", text)
+    text = NOISE_SUFFIX_RE.sub("", text)
+    text = re.sub(r"\s+-\s*|\s*-\s+", " - ", text)
+    return re.sub(r"\s+", " ", text).strip(" -")
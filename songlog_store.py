@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import os
+import html
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from query_normalizer import normalize
+
+# Songlog indexé: id stable par entrée (plus récent = id le plus grand), pages par id décroissant
+DB_PATH = Path.home() / "MoodeOled" / "songlog.db"
+TXT_PATH = Path.home() / "MoodeOled" / "songlog.txt"
+EXPORT_PATH = Path.home() / "MoodeOled" / "songlog_export.txt"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songlog (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    meta TEXT NOT NULL DEFAULT '',
+    created REAL,
+    norm_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_songlog_query ON songlog(query);
+"""
+# Index de dédoublonnage: variantes d'une même piste (casse, "Remastered"...) sur une même clé
+KEY_INDEX = "CREATE INDEX IF NOT EXISTS idx_songlog_norm_key ON songlog(norm_key)"
+
+# === Shared data ===
+conn = None
+db_lock = threading.Lock()
+
+def split_line(line):
+    # Format texte historique : Artist - Title [album | date]
+    if "[" in line and "]" in line:
+        text, meta = line.rsplit("[", 1)
+        return text.strip(), meta.rstrip("] ")
+    return line.strip(), ""
+
+def format_line(query, meta):
+    return f"{query} [{meta}]" if meta else query
+
+def open_store(db_path=DB_PATH, txt_path=TXT_PATH):
+    global conn
+    with db_lock:
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        if "norm_key" not in [row[1] for row in conn.execute("PRAGMA table_info(songlog)")]:
+            conn.execute("ALTER TABLE songlog ADD COLUMN norm_key TEXT")
+        conn.execute(KEY_INDEX)
+        migrate_txt(txt_path)
+        fill_keys()
+    return conn
+
+def fill_keys():
+    # Clés manquantes (base créée avant l'index de dédoublonnage)
+    rows = conn.execute("SELECT id, query FROM songlog WHERE norm_key IS NULL").fetchall()
+    if rows:
+        with conn:
+            conn.executemany("UPDATE songlog SET norm_key = ? WHERE id = ?", [(normalize(q), i) for i, q in rows])
+
+def migrate_txt(txt_path):
+    # Reprise unique de l'ancien songlog.txt (ordre conservé), renommé ensuite en .migrated
+    if not os.path.exists(txt_path):
+        return
+    try:
+        with open(txt_path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except Exception as e:
+        print(f"error songlog migration: {e}")
+        return
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT INTO songlog (query, meta, created) VALUES (?, ?, ?)",
+            [(*split_line(html.unescape(line)), now) for line in lines]
+        )
+    os.replace(txt_path, f"{txt_path}.migrated")
+    print(f"songlog: migrated {len(lines)} entries from {txt_path}")
+
+def add(query, meta=""):
+    open_store()
+    with db_lock, conn:
+        cur = conn.execute("INSERT INTO songlog (query, meta, created, norm_key) VALUES (?, ?, ?, ?)",
+                           (query, meta, time.time(), normalize(query)))
+    return cur.lastrowid
+
+def page(before_id=None, limit=50):
+    # Pagination par clé (id < before_id): coût constant quelle que soit la profondeur dans l'historique
+    open_store()
+    with db_lock:
+        if before_id is None:
+            return conn.execute("SELECT id, query, meta FROM songlog ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return conn.execute(
+            "SELECT id, query, meta FROM songlog WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit)
+        ).fetchall()
+
+def get(entry_id):
+    open_store()
+    with db_lock:
+        return conn.execute("SELECT id, query, meta FROM songlog WHERE id = ?", (entry_id,)).fetchone()
+
+def queries(entry_ids):
+    open_store()
+    result = {}
+    entry_ids = list(entry_ids)
+    with db_lock:
+        # Par lots: limite du nombre de paramètres SQLite
+        for i in range(0, len(entry_ids), 500):
+            chunk = entry_ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            result.update(conn.execute(f"SELECT id, query FROM songlog WHERE id IN ({marks})", chunk).fetchall())
+    return result
+
+def ids(unique=False):
+    # unique: une seule entrée (la plus récente) par clé normalisée
+    open_store()
+    with db_lock:
+        if unique:
+            return [row[0] for row in conn.execute("SELECT MAX(id) AS id FROM songlog GROUP BY norm_key ORDER BY id DESC")]
+        return [row[0] for row in conn.execute("SELECT id FROM songlog ORDER BY id DESC")]
+
+def find(query):
+    # Entrées équivalentes à la requête (même clé normalisée), plus récente d'abord
+    open_store()
+    with db_lock:
+        return [row[0] for row in conn.execute("SELECT id FROM songlog WHERE norm_key = ? ORDER BY id DESC", (normalize(query),))]
+
+def keys():
+    open_store()
+    with db_lock:
+        return [row[0] for row in conn.execute("SELECT DISTINCT norm_key FROM songlog")]
+
+def ids_for_keys(norm_keys):
+    # Entrée la plus récente pour chacune des clés données, plus récente d'abord
+    open_store()
+    norm_keys = list(norm_keys)
+    found = []
+    with db_lock:
+        for i in range(0, len(norm_keys), 500):
+            chunk = norm_keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found += [row[0] for row in conn.execute(
+                f"SELECT MAX(id) FROM songlog WHERE norm_key IN ({marks}) GROUP BY norm_key", chunk)]
+    return sorted(found, reverse=True)
+
+def all_queries():
+    open_store()
+    with db_lock:
+        return [row[0] for row in conn.execute("SELECT DISTINCT query FROM songlog")]
+
+def delete(entry_id):
+    open_store()
+    with db_lock, conn:
+        return conn.execute("DELETE FROM songlog WHERE id = ?", (entry_id,)).rowcount > 0
+
+def clear():
+    open_store()
+    with db_lock, conn:
+        conn.execute("DELETE FROM songlog")
+
+def count():
+    open_store()
+    with db_lock:
+        return conn.execute("SELECT COUNT(*) FROM songlog").fetchone()[0]
+
+def unique_count():
+    open_store()
+    with db_lock:
+        return conn.execute("SELECT COUNT(DISTINCT norm_key) FROM songlog").fetchone()[0]
+
+def export(path=EXPORT_PATH):
+    # Export texte (ancien format, du plus ancien au plus récent), remplacé d'un bloc
+    open_store()
+    with db_lock:
+        rows = conn.execute("SELECT query, meta FROM songlog ORDER BY id").fetchall()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for query, meta in rows:
+            f.write(format_line(query, meta) + "\n")
+    os.replace(tmp_path, path)
+    return len(rows)
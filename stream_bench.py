@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import yt_cache
+import yt_resolver
+import preload_scheduler
+import local_stream
+
+# Banc de test du flux local, sans YouTube: résolveur "local" (fichiers audio ou serveur HTTP de fichiers)
+PROFILES = {
+    "low": {"bitrate": "96k", "passthrough": False},
+    "standard": {"bitrate": "128k", "passthrough": False},
+    "hifi": {"bitrate": "160k", "passthrough": False},
+    "passthrough": {"bitrate": "160k", "passthrough": True},
+}
+READ_SIZE = 4096
+
+
+def resolve_entry(query):
+    result = yt_resolver.resolve(query, "local", yt_resolver.PRIORITY_PRELOAD)
+    if not result["ok"]:
+        raise RuntimeError(result["error"])
+    video = result["video"]
+    entry = {key: video.get(key) for key in ("url", "title", "artist", "duration", "acodec", "abr", "ext", "expire_ts")}
+    yt_cache.put(query, entry)
+    return entry
+
+
+def bench_preload(queries, workers):
+    # Débit de préchargement: toute la file soumise d'un coup, workers en parallèle
+    preload_scheduler.configure(workers=workers)
+    preload_scheduler.set_hooks(lambda q: preload_scheduler.resolve_shared(q, resolve_entry))
+    start = time.perf_counter()
+    preload_scheduler.update(-1, list(enumerate(queries)))
+    while yt_cache.count() < len(set(map(yt_cache.normalize_key, queries))):
+        if preload_scheduler.preload_stats["failed"]:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    return {
+        "tracks": yt_cache.count(),
+        "seconds": round(elapsed, 3),
+        "tracks_per_s": round(yt_cache.count() / elapsed, 2) if elapsed else None,
+        "failed": preload_scheduler.preload_stats["failed"],
+        "extract_ms": round(yt_resolver.resolver_stats["extract_total"] * 1000 / max(1, yt_resolver.resolver_stats["count"]), 1),
+    }
+
+
+def store_loudness(track, loudness):
+    entry = yt_cache.get(track["query"], touch=False)
+    if entry is not None:
+        entry["loudness"] = round(loudness, 1)
+        yt_cache.put(track["query"], entry, touch=False)
+
+
+def make_track(query, profile):
+    entry = yt_cache.get(query) or resolve_entry(query)
+    track = dict(entry, query=query, bitrate=profile["bitrate"], passthrough=profile["passthrough"])
+    return track
+
+
+class Client:
+    # Lecteur HTTP du flux, comme MPD: note l'heure de chaque bloc reçu
+    def __init__(self, port, rate):
+        self.port = port
+        self.rate = rate
+        self.chunks = []
+        self.resp = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.port}{local_stream.STREAM_PATH}", timeout=30) as resp:
+                self.resp = resp
+                start = time.perf_counter()
+                received = 0
+                while not self.stopped.is_set():
+                    data = resp.read(READ_SIZE)
+                    if not data:
+                        break
+                    now = time.perf_counter()
+                    self.chunks.append(now)
+                    received += len(data)
+                    # Consommation à débit fixe (multiple du temps réel) pour que le tampon se remplisse
+                    if self.rate:
+                        ahead = received / self.rate - (now - start)
+                        if ahead > 0:
+                            time.sleep(ahead)
+        except Exception as e:
+            if not self.stopped.is_set():
+                print(f"bench client: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        if self.resp:
+            self.resp.close()
+        self.thread.join(timeout=5)
+
+
+def bench_switches(queries, profile_name, tracks, port, speed, prespawn):
+    profile = PROFILES[profile_name]
+    playlist = [make_track(q, profile) for q in queries[:tracks]]
+    position = {"index": 0}
+    switches = []
+    finished = threading.Event()
+
+    def next_track():
+        index = position["index"] + 1
+        return playlist[index] if index < len(playlist) else None
+
+    def changed(track):
+        position["index"] += 1
+        switches.append(time.perf_counter())
+
+    def ended(track):
+        finished.set()
+
+    local_stream.PORT = port
+    local_stream.configure(prespawn=prespawn)
+    local_stream.set_hooks(ended, changed, next_track, None)
+    local_stream.start_server()
+    for stats in local_stream.cpu_stats.values():
+        stats.update(cpu=0.0, audio=0.0, tracks=0)
+    underruns = local_stream.stream_stats["underruns"]
+    loudness = dict(local_stream.loudness_stats)
+    fallbacks = local_stream.stream_stats["fallbacks"]
+
+    local_stream.play(playlist[0])
+    rate = local_stream.byte_rate(profile["bitrate"]) * speed if speed else 0
+    client = Client(port, rate)
+    total = sum(track.get("duration") or 0 for track in playlist)
+    finished.wait(total / speed + 30 if speed and total else 600)
+    client.stop()
+    local_stream.stop_source()
+    # Le profil suivant repart d'un serveur sans client (pas de reconnexion de format en cours)
+    deadline = time.monotonic() + local_stream.SWITCH_TIMEOUT
+    while local_stream.is_client_connected() and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    # Trou de lecture: plus long intervalle entre deux blocs autour de chaque changement de piste
+    chunks = client.chunks
+    gaps = [b - a for a, b in zip(chunks, chunks[1:])]
+    switch_gaps = []
+    for at in switches:
+        window = [b - a for a, b in zip(chunks, chunks[1:]) if at - 1.0 <= b <= at + 2.0]
+        switch_gaps.append(round(max(window) * 1000, 1) if window else None)
+    steady = sorted(gaps)[len(gaps) // 2] * 1000 if gaps else None
+    # CPU par étape de normalisation (mesure à la première lecture, gain ensuite) et au total
+    stages = {key: round(stats["cpu"] * 100 / stats["audio"], 2)
+              for key, stats in local_stream.cpu_stats.items() if stats["audio"]}
+    cpu = {"cpu": sum(stats["cpu"] for stats in local_stream.cpu_stats.values()),
+           "audio": sum(stats["audio"] for stats in local_stream.cpu_stats.values())}
+    return {
+        "profile": profile_name,
+        "tracks": len(playlist),
+        "switches": len(switches),
+        "switch_gap_ms": switch_gaps,
+        "median_chunk_gap_ms": round(steady, 2) if steady is not None else None,
+        "underruns": local_stream.stream_stats["underruns"] - underruns,
+        "fallbacks": local_stream.stream_stats["fallbacks"] - fallbacks,
+        "cpu_pct": round(cpu["cpu"] * 100 / cpu["audio"], 2) if cpu["audio"] else None,
+        "audio_s": round(cpu["audio"], 1),
+        "cpu_by_stage": stages,
+        "loudness": {key: local_stream.loudness_stats[key] - loudness[key] for key in loudness},
+    }
+
+
+def print_report(report):
+    preload = report["preload"]
+    print(f"resolver: {report['resolver']} ({report['source']})")
+    print(f"preload: {preload['tracks']} tracks in {preload['seconds']}s "
+          f"({preload['tracks_per_s']}/s, extract {preload['extract_ms']}ms, failed {preload['failed']})")
+    for result in report["profiles"]:
+        gaps = [g for g in result["switch_gap_ms"] if g is not None]
+        worst = f"{max(gaps):.0f}ms" if gaps else "-"
+        cpu = f"{result['cpu_pct']}%" if result["cpu_pct"] is not None else "-"
+        print(f"{result['profile']:<12} switches {result['switches']}/{result['tracks'] - 1} "
+              f"worst gap {worst} median chunk {result['median_chunk_gap_ms']}ms "
+              f"underruns {result['underruns']} cpu {cpu}")
+        if report["loudness"]:
+            stages = ", ".join(f"{key} {pct}%" for key, pct in result["cpu_by_stage"].items()) or "-"
+            counts = result["loudness"]
+            print(f"{'':<12} loudness gain {counts['gain']} measure {counts['measure']} "
+                  f"(stored {counts['measured']}) cpu {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de test du flux local (préchargement, enchaînements, CPU par profil) sans YouTube")
+    parser.add_argument("--dir", required=True, help="Dossier de fichiers audio (\"Artiste - Titre.ext\")")
+    parser.add_argument("--url", help="URL d'un serveur HTTP servant ce dossier (sinon lecture directe des fichiers)")
+    parser.add_argument("--queries", type=int, default=20, help="Nombre de requêtes pour le préchargement")
+    parser.add_argument("--delay", type=float, default=0.5, help="Durée simulée d'une extraction (s)")
+    parser.add_argument("--workers", type=int, default=2, help="Workers du résolveur et du préchargement")
+    parser.add_argument("--tracks", type=int, default=3, help="Pistes enchaînées par profil")
+    parser.add_argument("--profiles", default="low,standard,hifi,passthrough", help="Profils à mesurer")
+    parser.add_argument("--speed", type=float, default=20.0, help="Vitesse de consommation du client (x temps réel, 0 = sans limite)")
+    parser.add_argument("--prespawn", type=int, default=15, help="Pré-lancement de la piste suivante (s avant la fin)")
+    parser.add_argument("--loudness", action="store_true", help="Normalisation du volume (mesure puis gain en cache)")
+    parser.add_argument("--port", type=int, default=8089, help="Port du serveur de flux de test")
+    parser.add_argument("--json", help="Écrit le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        print(f"Erreur : dossier introuvable {args.dir}")
+        sys.exit(1)
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        print(f"Erreur : profil inconnu {', '.join(unknown)}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Cache temporaire: le banc ne touche pas au yt_cache.db de l'installation
+        yt_cache.open_cache(os.path.join(tmp, "yt_cache.db"), os.path.join(tmp, "yt_cache.json"))
+        yt_resolver.set_backend("local", local_dir=args.dir, local_url=args.url, local_delay=args.delay)
+        yt_resolver.start(workers=args.workers)
+        local_stream.configure(loudness=args.loudness)
+        local_stream.set_loudness_hook(store_loudness)
+
+        queries = [f"Bench Artist {i} - Bench Title {i}" for i in range(args.queries)]
+        report = {"resolver": "local", "source": args.url or args.dir, "preload": bench_preload(queries, args.workers),
+                  "loudness": args.loudness, "profiles": []}
+        for name in profiles:
+            report["profiles"].append(bench_switches(queries, name, args.tracks, args.port, args.speed, args.prespawn))
+            yt_resolver.LOCAL_OPTIONS["delay"] = 0
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
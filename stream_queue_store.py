@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import os
+import json
+import random
+import threading
+from pathlib import Path
+
+# File de lecture du flux local: ids du songlog, ordre de lecture (mélangé ou non), position, modes
+STATE_PATH = Path.home() / "MoodeOled" / "stream_queue.json"
+REPEAT_MODES = ("off", "all", "one")
+SAVE_ELAPSED_EVERY = 15
+
+# === Shared data ===
+state_lock = threading.RLock()
+entries = []
+order = []
+pos = 0
+shuffle = False
+repeat = "off"
+active = False
+elapsed = 0.0
+saved_elapsed = 0.0
+
+def load(path=None):
+    global STATE_PATH, entries, order, pos, shuffle, repeat, active, elapsed, saved_elapsed
+    if path:
+        STATE_PATH = Path(path)
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        print(f"error stream queue load: {e}")
+        return False
+    with state_lock:
+        entries = [int(i) for i in data.get("entries", [])]
+        order = [int(i) for i in data.get("order", entries)]
+        pos = min(max(0, int(data.get("pos", 0))), max(0, len(order) - 1))
+        shuffle = bool(data.get("shuffle", False))
+        repeat = data.get("repeat", "off") if data.get("repeat") in REPEAT_MODES else "off"
+        active = bool(data.get("active", False)) and bool(order)
+        elapsed = saved_elapsed = float(data.get("elapsed", 0.0))
+    return True
+
+def save():
+    with state_lock:
+        data = {"entries": entries, "order": order, "pos": pos, "shuffle": shuffle,
+                "repeat": repeat, "active": active, "elapsed": round(elapsed, 1)}
+    tmp_path = f"{STATE_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, STATE_PATH)
+    except OSError as e:
+        print(f"error stream queue save: {e}")
+
+def play_order(ids, first=None):
+    # Mélange: la piste de départ reste en tête, le reste est tiré au hasard
+    ordered = list(ids)
+    if shuffle:
+        rest = [i for i in ordered if i != first] if first is not None else ordered
+        random.shuffle(rest)
+        ordered = ([first] if first is not None and first in ids else []) + rest
+    return ordered
+
+def set_queue(ids, start=0):
+    global entries, order, pos, active, elapsed, saved_elapsed
+    with state_lock:
+        entries = list(ids)
+        first = entries[start] if 0 <= start < len(entries) else None
+        order = play_order(entries, first)
+        pos = order.index(first) if first is not None else 0
+        active = bool(order)
+        elapsed = saved_elapsed = 0.0
+    save()
+
+def clear():
+    set_queue([])
+
+def current():
+    with state_lock:
+        return order[pos] if 0 <= pos < len(order) else None
+
+def next_pos(manual=False):
+    # Position suivante selon le mode de répétition (None en fin de file)
+    with state_lock:
+        if not order:
+            return None
+        if repeat == "one" and not manual:
+            return pos
+        if pos + 1 < len(order):
+            return pos + 1
+        return 0 if repeat in ("all", "one") else None
+
+def peek_next():
+    with state_lock:
+        target = next_pos()
+        return (target, order[target]) if target is not None else (None, None)
+
+def jump(target):
+    global pos, active, elapsed, saved_elapsed
+    with state_lock:
+        if not 0 <= target < len(order):
+            return None
+        pos = target
+        active = True
+        elapsed = saved_elapsed = 0.0
+        entry_id = order[pos]
+    save()
+    return entry_id
+
+def advance(manual=False):
+    target = next_pos(manual)
+    if target is None:
+        set_active(False)
+        return None
+    return jump(target)
+
+def back():
+    with state_lock:
+        if pos > 0:
+            target = pos - 1
+        elif repeat != "off" and order:
+            target = len(order) - 1
+        else:
+            return None
+    return jump(target)
+
+def remove(entry_id):
+    # Retire toutes les occurrences de l'id; renvoie True si c'était la piste en cours
+    global entries, order, pos
+    with state_lock:
+        was_current = current() == entry_id
+        removed_before = sum(1 for i in order[:pos] if i == entry_id)
+        entries = [i for i in entries if i != entry_id]
+        order = [i for i in order if i != entry_id]
+        pos = max(0, pos - removed_before)
+        if pos >= len(order):
+            pos = max(0, len(order) - 1)
+    save()
+    return was_current
+
+def set_shuffle(enabled):
+    global shuffle, order, pos
+    with state_lock:
+        shuffle = enabled
+        playing = current()
+        if shuffle:
+            order = play_order(entries, playing)
+            pos = 0
+        else:
+            order = list(entries)
+            pos = order.index(playing) if playing in order else 0
+    save()
+
+def cycle_repeat():
+    global repeat
+    with state_lock:
+        repeat = REPEAT_MODES[(REPEAT_MODES.index(repeat) + 1) % len(REPEAT_MODES)]
+    save()
+    return repeat
+
+def set_active(flag):
+    global active
+    with state_lock:
+        if active == flag:
+            return
+        active = flag
+    save()
+
+def set_elapsed(seconds):
+    # Position dans la piste pour la reprise au démarrage (écrite au plus toutes les SAVE_ELAPSED_EVERY s)
+    global elapsed, saved_elapsed
+    with state_lock:
+        elapsed = seconds
+        due = abs(seconds - saved_elapsed) >= SAVE_ELAPSED_EVERY
+        if due:
+            saved_elapsed = seconds
+    if due:
+        save()
+
+def window(ahead=10, behind=2):
+    # [(décalage par rapport à la position, id)] pour le préchargement, en tenant compte de la répétition
+    with state_lock:
+        if not order:
+            return []
+        items = [(offset, order[pos + offset]) for offset in range(-behind, ahead + 1)
+                 if offset and 0 <= pos + offset < len(order)]
+        if repeat == "all" and pos + ahead >= len(order):
+            wrap = pos + ahead - len(order) + 1
+            items += [(len(order) - pos + i, order[i]) for i in range(min(wrap, pos))]
+        return items
+
+def upcoming(count=5):
+    return [entry_id for offset, entry_id in window(count, 0)]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# Une trace par lecture: étapes (début, fin) en ms depuis la demande de lecture
+LOG_PATH = Path.home() / "MoodeOled" / "stream_timing.jsonl"
+MAX_LOG_BYTES = 1024 * 1024
+RECENT_SIZE = 20
+
+# === Shared data ===
+recent = deque(maxlen=RECENT_SIZE)
+log_lock = threading.Lock()
+current_trace = None
+debug = False
+
+def configure(log_path=None, debug_flag=False):
+    global LOG_PATH, debug
+    LOG_PATH = Path(log_path) if log_path else None
+    debug = debug_flag
+
+class Trace:
+    def __init__(self, query, profile):
+        self.start = time.perf_counter()
+        self.finished = False
+        self.finish_on = "first_audio"
+        self.record = {"ts": round(time.time(), 3), "query": query, "profile": profile,
+                       "cache": None, "spans": {}, "total": None}
+
+    def now_ms(self):
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    def tag(self, **tags):
+        self.record.update(tags)
+
+    @contextmanager
+    def span(self, name):
+        begin = self.now_ms()
+        try:
+            yield self
+        finally:
+            self.record["spans"][name] = [begin, self.now_ms()]
+
+    def mark(self, name):
+        # Jalon ponctuel (premier octet, premier son): termine la trace si c'est l'étape attendue
+        if self.finished or name in self.record["spans"]:
+            return
+        at = self.now_ms()
+        self.record["spans"][name] = [at, at]
+        if name == self.finish_on:
+            self.finish()
+
+    def finish(self, status="ok"):
+        if self.finished:
+            return
+        self.finished = True
+        self.record["total"] = self.now_ms()
+        self.record["status"] = status
+        recent.append(self.record)
+        write_record(self.record)
+        if debug:
+            print(f"[timing] {summary(self.record)}")
+
+class NullTrace:
+    # Préchargements: mêmes appels, rien n'est enregistré
+    finished = True
+
+    def tag(self, **tags):
+        pass
+
+    @contextmanager
+    def span(self, name):
+        yield self
+
+    def mark(self, name):
+        pass
+
+    def finish(self, status="ok"):
+        pass
+
+NULL_TRACE = NullTrace()
+
+def begin(query, profile):
+    global current_trace
+    if current_trace and not current_trace.finished:
+        current_trace.finish("incomplete")
+    current_trace = Trace(query, profile)
+    return current_trace
+
+def write_record(record):
+    if not LOG_PATH:
+        return
+    with log_lock:
+        try:
+            # Rotation simple: un seul fichier .1 conservé
+            if LOG_PATH.exists() and LOG_PATH.stat().st_size > MAX_LOG_BYTES:
+                LOG_PATH.replace(LOG_PATH.with_name(LOG_PATH.name + ".1"))
+            with open(LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"error stream timing log: {e}")
+
+def summary(record):
+    spans = record["spans"]
+    parts = [f"{name} {end - begin:.0f}" if end > begin else f"{name}@{begin:.0f}" for name, (begin, end) in spans.items()]
+    return f"{record['total']:.0f}ms {record.get('cache') or '?'} {record['profile']}: " + " ".join(parts)
+
+def recent_lines():
+    return [summary(record) for record in reversed(recent)]
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from query_normalizer import normalize
+
+DB_PATH = Path.home() / "MoodeOled" / "yt_cache.db"
+JSON_PATH = Path.home() / "MoodeOled" / "yt_cache.json"
+# Version des clés (PRAGMA user_version): à incrémenter quand normalize() change, les lignes sont alors recalculées
+KEY_VERSION = 2
+# Éviction en tâche de fond, EVICT_SETTLE s après la dernière écriture: entrées hors songlog,
+# inutilisées depuis EVICT_MAX_AGE_DAYS jours, puis les moins récemment utilisées au-delà de EVICT_MAX_ENTRIES (0 = sans limite)
+EVICT_MAX_ENTRIES = 0
+EVICT_MAX_AGE_DAYS = 0
+EVICT_SETTLE = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS yt_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    url TEXT,
+    expire_ts INTEGER,
+    last_used REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_yt_cache_expire ON yt_cache(expire_ts);
+CREATE INDEX IF NOT EXISTS idx_yt_cache_last_used ON yt_cache(last_used);
+"""
+
+# === Shared data ===
+conn = None
+db_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0, "folded": 0}
+evict_stats = {"runs": 0, "orphan": 0, "age": 0, "size": 0, "last_ms": None}
+evict_lock = threading.Lock()
+evict_timer = None
+
+# === External hooks ===
+valid_keys_hook = None
+evict_runner = None
+
+def normalize_key(query):
+    return normalize(query)
+
+def configure_eviction(max_entries=None, max_age_days=None, settle=None, keys_fn=None, run_fn=None):
+    # keys_fn() -> clés normalisées à conserver (songlog); run_fn(fn) exécute l'éviction (file d'actions)
+    global EVICT_MAX_ENTRIES, EVICT_MAX_AGE_DAYS, EVICT_SETTLE, valid_keys_hook, evict_runner
+    if max_entries is not None:
+        EVICT_MAX_ENTRIES = max(0, max_entries)
+    if max_age_days is not None:
+        EVICT_MAX_AGE_DAYS = max(0, max_age_days)
+    if settle is not None:
+        EVICT_SETTLE = max(1, settle)
+    valid_keys_hook = keys_fn
+    evict_runner = run_fn
+
+def open_cache(db_path=DB_PATH, json_path=JSON_PATH):
+    global conn
+    with db_lock:
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        migrate_json(json_path)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < KEY_VERSION:
+            rekey()
+    return conn
+
+def rekey():
+    # Recalcule les clés avec la normalisation courante; variantes fusionnées (la plus récemment utilisée gagne)
+    with conn:
+        for table in ("yt_cache", "audio_cache"):
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                continue
+            rows = conn.execute(f"SELECT rowid, key, query FROM {table} ORDER BY last_used DESC").fetchall()
+            seen = set()
+            merged = 0
+            for rowid, key, query in rows:
+                new_key = normalize_key(query)
+                if new_key in seen:
+                    conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+                    merged += 1
+                    continue
+                seen.add(new_key)
+                if new_key != key:
+                    # Clé temporaire unique pour éviter un conflit avec une ligne pas encore traitée
+                    conn.execute(f"UPDATE {table} SET key = ? WHERE rowid = ?", (f"\0{rowid}", rowid))
+            for rowid, key, query in rows:
+                conn.execute(f"UPDATE {table} SET key = ? WHERE rowid = ? AND key = ?", (normalize_key(query), rowid, f"\0{rowid}"))
+            if merged:
+                print(f"yt_cache: {table} rekeyed, {merged} duplicate entries merged")
+        conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+def migrate_json(json_path):
+    # Reprise unique de l'ancien yt_cache.json, renommé ensuite en .migrated
+    if not os.path.exists(json_path):
+        return
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            old_cache = json.load(f)
+    except Exception as e:
+        print(f"error yt_cache migration: {e}")
+        old_cache = {}
+    with conn:
+        for query, entry in old_cache.items():
+            if isinstance(entry, dict):
+                upsert(query, entry)
+    os.replace(json_path, f"{json_path}.migrated")
+    print(f"yt_cache: migrated {len(old_cache)} entries from {json_path}")
+
+def upsert(query, entry, last_used=None):
+    conn.execute(
+        """INSERT INTO yt_cache (key, query, url, expire_ts, last_used, data) VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(key) DO UPDATE SET query=excluded.query, url=excluded.url,
+               expire_ts=excluded.expire_ts, last_used=excluded.last_used, data=excluded.data""",
+        (normalize_key(query), query, entry.get("url"), entry.get("expire_ts"),
+         last_used if last_used is not None else time.time(), json.dumps(entry))
+    )
+
+def row_to_entry(row):
+    entry = json.loads(row[0])
+    entry["url"] = row[1]
+    entry["expire_ts"] = row[2]
+    return entry
+
+def get(query, touch=True):
+    open_cache()
+    key = normalize_key(query)
+    with db_lock:
+        row = conn.execute("SELECT data, url, expire_ts, query FROM yt_cache WHERE key = ?", (key,)).fetchone()
+        if row and touch:
+            with conn:
+                conn.execute("UPDATE yt_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+    if not touch:
+        return row_to_entry(row) if row else None
+    if not row:
+        cache_stats["misses"] += 1
+        return None
+    cache_stats["hits"] += 1
+    # Trouvée grâce à la normalisation: la requête d'origine était écrite autrement
+    if row[3] != query:
+        cache_stats["folded"] += 1
+    return row_to_entry(row)
+
+def put(query, entry, touch=True):
+    # touch=False (rafraîchissement, préchargement, mesure de volume): last_used conservé, l'éviction par ancienneté reste possible
+    open_cache()
+    with db_lock, conn:
+        last_used = None
+        if not touch:
+            row = conn.execute("SELECT last_used FROM yt_cache WHERE key = ?", (normalize_key(query),)).fetchone()
+            last_used = row[0] if row else None
+        upsert(query, entry, last_used)
+    schedule_evict()
+
+def delete(query):
+    open_cache()
+    with db_lock, conn:
+        conn.execute("DELETE FROM yt_cache WHERE key = ?", (normalize_key(query),))
+
+def schedule_evict(delay=None):
+    # Relancé à chaque écriture: une seule éviction une fois les écritures calmées
+    global evict_timer
+    if valid_keys_hook is None and not EVICT_MAX_ENTRIES and not EVICT_MAX_AGE_DAYS:
+        return
+    with evict_lock:
+        if evict_timer is not None:
+            evict_timer.cancel()
+        evict_timer = threading.Timer(EVICT_SETTLE if delay is None else delay, run_evict)
+        evict_timer.daemon = True
+        evict_timer.start()
+
+def run_evict():
+    global evict_timer
+    with evict_lock:
+        evict_timer = None
+    if evict_runner:
+        evict_runner(evict)
+    else:
+        evict()
+
+def evict():
+    open_cache()
+    start = time.perf_counter()
+    valid_keys = set(valid_keys_hook()) if valid_keys_hook else None
+    removed = {"orphan": 0, "age": 0, "size": 0}
+    with db_lock, conn:
+        if valid_keys is not None:
+            stale = [(k,) for (k,) in conn.execute("SELECT key FROM yt_cache") if k not in valid_keys]
+            if stale:
+                conn.executemany("DELETE FROM yt_cache WHERE key = ?", stale)
+            removed["orphan"] = len(stale)
+        if EVICT_MAX_AGE_DAYS:
+            removed["age"] = conn.execute("DELETE FROM yt_cache WHERE last_used < ?",
+                                          (time.time() - EVICT_MAX_AGE_DAYS * 86400,)).rowcount
+        if EVICT_MAX_ENTRIES:
+            removed["size"] = conn.execute(
+                "DELETE FROM yt_cache WHERE key IN (SELECT key FROM yt_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (EVICT_MAX_ENTRIES,)
+            ).rowcount
+    evict_stats["runs"] += 1
+    for reason, n in removed.items():
+        evict_stats[reason] += n
+    evict_stats["last_ms"] = (time.perf_counter() - start) * 1000
+    return removed
+
+def expiring_before(ts, limit=50, now=None, used_since=None):
+    # URL encore valides (expire_ts > now) qui expirent avant ts, utilisées depuis used_since si donné
+    open_cache()
+    now = int(time.time()) if now is None else now
+    with db_lock:
+        rows = conn.execute(
+            """SELECT query, expire_ts FROM yt_cache
+               WHERE expire_ts IS NOT NULL AND expire_ts > ? AND expire_ts < ? AND last_used >= ?
+               ORDER BY expire_ts LIMIT ?""",
+            (now, ts, used_since or 0, limit)
+        ).fetchall()
+    return rows
+
+def count():
+    open_cache()
+    with db_lock:
+        return conn.execute("SELECT COUNT(*) FROM yt_cache").fetchone()[0]
+
+def stats_line():
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    ratio = f"{cache_stats['hits'] * 100 / lookups:.0f}%" if lookups else "-"
+    return (f"yt cache: hit {cache_stats['hits']}/{lookups} ({ratio}) "
+            f"folded {cache_stats['folded']} keys {count()}")
+
+def evict_line():
+    if not evict_stats["runs"]:
+        return "yt evict: -"
+    return (f"yt evict: {evict_stats['runs']}x {evict_stats['last_ms']:.0f}ms orphan {evict_stats['orphan']} "
+            f"age {evict_stats['age']} size {evict_stats['size']}")
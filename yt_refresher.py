@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import time
+import threading
+
+import yt_cache
+
+# Les URL googlevideo expirent (~6h): on les résout à nouveau avant l'échéance
+HORIZON = 1800
+SCAN_INTERVAL = 60
+MIN_GAP = 5.0
+SCAN_LIMIT = 20
+FAILURE_BACKOFF = 600
+# Hors file de lecture, seules les entrées jouées dans les RECENT_USE dernières secondes sont rafraîchies;
+# les autres expirent et finissent évincées du cache
+RECENT_USE = 86400
+
+# === External hooks ===
+resolve_hook = None
+upcoming_hook = None
+allowed_hook = None
+debug = False
+
+# === Shared data ===
+wake_event = threading.Event()
+worker_started = False
+failed_until = {}
+refresh_stats = {"refreshed": 0, "failed": 0, "scans": 0, "last_refresh": None}
+
+def set_hooks(resolve_fn, upcoming_fn=None, allowed_fn=None, debug_flag=False):
+    global resolve_hook, upcoming_hook, allowed_hook, debug
+    resolve_hook = resolve_fn
+    upcoming_hook = upcoming_fn
+    allowed_hook = allowed_fn
+    debug = debug_flag
+
+def configure(horizon=None, interval=None, min_gap=None, recent_use=None):
+    global HORIZON, SCAN_INTERVAL, MIN_GAP, RECENT_USE
+    if horizon is not None:
+        HORIZON = horizon
+    if interval is not None:
+        SCAN_INTERVAL = max(5, interval)
+    if min_gap is not None:
+        MIN_GAP = max(0.0, min_gap)
+    if recent_use is not None:
+        RECENT_USE = max(0, recent_use)
+
+def wake():
+    wake_event.set()
+
+def due_queries(now):
+    deadline = now + HORIZON
+    due = []
+    # Positions à venir de la file en premier, dans l'ordre de lecture
+    for query in (upcoming_hook() if upcoming_hook else []):
+        entry = yt_cache.get(query, touch=False)
+        if entry and entry.get("resolved") and entry.get("expire_ts") is not None and now < entry["expire_ts"] < deadline:
+            due.append(query)
+    for query, _ in yt_cache.expiring_before(deadline, SCAN_LIMIT, now=now, used_since=now - RECENT_USE):
+        if query not in due:
+            due.append(query)
+    return [q for q in due if failed_until.get(q, 0) <= now]
+
+def refresh_query(query):
+    start = time.perf_counter()
+    try:
+        resolve_hook(query)
+        failed_until.pop(query, None)
+        refresh_stats["refreshed"] += 1
+        refresh_stats["last_refresh"] = time.time()
+        if debug:
+            print(f"[refresh] {query} in {(time.perf_counter() - start) * 1000:.0f}ms")
+    except Exception as e:
+        failed_until[query] = time.time() + FAILURE_BACKOFF
+        refresh_stats["failed"] += 1
+        print(f"error yt refresh {query}: {e}")
+
+def refresh_worker():
+    while True:
+        wake_event.wait(SCAN_INTERVAL)
+        wake_event.clear()
+        if HORIZON <= 0 or resolve_hook is None:
+            continue
+        if allowed_hook and not allowed_hook():
+            continue
+        refresh_stats["scans"] += 1
+        try:
+            due = due_queries(int(time.time()))
+        except Exception as e:
+            print(f"error yt refresh scan: {e}")
+            continue
+        for query in due:
+            if allowed_hook and not allowed_hook():
+                break
+            refresh_query(query)
+            # Limite de débit: une résolution toutes les MIN_GAP secondes au plus
+            time.sleep(MIN_GAP)
+
+def start():
+    global worker_started
+    if worker_started or HORIZON <= 0:
+        return
+    worker_started = True
+    threading.Thread(target=refresh_worker, daemon=True).start()
+    wake()
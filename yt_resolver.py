@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2025 MoodeOled project / Benoit Toufflet
+import time
+import queue
+import hashlib
+import threading
+import itertools
+import subprocess
+from pathlib import Path
+from urllib.parse import quote
+
+# Le backend (yt-dlp par défaut) est créé une seule fois, dans les workers: l'import et l'init des extracteurs coûtent plusieurs secondes sur un Pi
+WORKERS = 2
+TIMEOUT = 90
+BACKEND = "yt_dlp"
+LOCAL_OPTIONS = {"dir": ".", "url": "", "delay": 0.0, "ttl": 21600}
+
+# Priorités: lecture demandée > préchargement > rafraîchissement
+PRIORITY_PLAY = 0
+PRIORITY_PRELOAD = 1
+PRIORITY_REFRESH = 2
+
+# === Shared data ===
+jobs = queue.PriorityQueue()
+job_counter = itertools.count()
+workers_lock = threading.Lock()
+workers_started = False
+ready_event = threading.Event()
+resolver_stats = {"count": 0, "errors": 0, "extract_total": 0.0, "wait_total": 0.0, "import_time": None}
+debug = False
+
+def ydl_options(yt_format):
+    return {
+        'quiet': True,
+        'default_search': 'ytsearch',
+        'noplaylist': True,
+        'format': yt_format,
+        'no_warnings': True
+    }
+
+# === Backends: une instance par worker, extract(query, yt_format) -> dict au format yt-dlp ===
+class YtDlpBackend:
+    def __init__(self, warm_formats):
+        start = time.perf_counter()
+        from yt_dlp import YoutubeDL
+        self.YoutubeDL = YoutubeDL
+        if resolver_stats["import_time"] is None:
+            resolver_stats["import_time"] = time.perf_counter() - start
+        # Une instance YoutubeDL par format (profil), propre à ce worker (non thread-safe)
+        self.instances = {fmt: YoutubeDL(ydl_options(fmt)) for fmt in warm_formats}
+
+    def extract(self, query, yt_format):
+        ydl = self.instances.get(yt_format)
+        if ydl is None:
+            ydl = self.instances[yt_format] = self.YoutubeDL(ydl_options(yt_format))
+        info = ydl.extract_info(query, download=False)
+        return info['entries'][0] if '_type' in info else info
+
+# Codec déclaré selon l'extension, comme le champ acodec de yt-dlp
+LOCAL_CODECS = {".m4a": "mp4a.40.2", ".aac": "mp4a.40.2", ".opus": "opus", ".webm": "opus",
+                ".ogg": "vorbis", ".mp3": "mp3", ".flac": "flac", ".wav": "pcm_s16le"}
+
+class LocalBackend:
+    # Remplaçant hors ligne (bancs de test): requête -> fichier audio local, servi tel quel ou via un serveur HTTP
+    def __init__(self, warm_formats):
+        self.directory = Path(LOCAL_OPTIONS["dir"]).expanduser()
+        self.files = sorted(p for p in self.directory.iterdir() if p.suffix.lower() in LOCAL_CODECS)
+        if not self.files:
+            raise RuntimeError(f"no audio files in {self.directory}")
+        self.by_name = {p.stem.casefold(): p for p in self.files}
+
+    def pick(self, query):
+        # Nom de fichier "Artiste - Titre" si présent, sinon choix stable d'après la requête
+        path = self.by_name.get(query.strip().casefold())
+        if path is None:
+            digest = hashlib.sha1(query.strip().casefold().encode("utf-8")).digest()
+            path = self.files[int.from_bytes(digest[:4], "big") % len(self.files)]
+        return path
+
+    def extract(self, query, yt_format):
+        if LOCAL_OPTIONS["delay"]:
+            time.sleep(LOCAL_OPTIONS["delay"])
+        path = self.pick(query)
+        expire_ts = int(time.time()) + LOCAL_OPTIONS["ttl"]
+        if LOCAL_OPTIONS["url"]:
+            url = f"{LOCAL_OPTIONS['url'].rstrip('/')}/{quote(path.name)}?expire={expire_ts}"
+        else:
+            url = str(path)
+        artist, _, title = path.stem.partition(" - ")
+        return {
+            "url": url,
+            "title": title or path.stem,
+            "artist": artist if title else None,
+            "duration": probe_duration(path),
+            "acodec": LOCAL_CODECS[path.suffix.lower()],
+            "ext": path.suffix.lstrip("."),
+            "format": "local",
+            "webpage_url": url,
+            "expire_ts": expire_ts,
+        }
+
+def probe_duration(path):
+    try:
+        out = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+                             capture_output=True, text=True, timeout=10).stdout.strip()
+        return float(out)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+BACKENDS = {"yt_dlp": YtDlpBackend, "local": LocalBackend}
+
+def set_backend(name, local_dir=None, local_url=None, local_delay=0.0, local_ttl=21600):
+    global BACKEND
+    if name not in BACKENDS:
+        print(f"error resolver: unknown backend '{name}', using yt_dlp")
+        name = "yt_dlp"
+    BACKEND = name
+    LOCAL_OPTIONS.update(dir=local_dir or ".", url=local_url or "", delay=local_delay, ttl=local_ttl)
+
+def resolver_worker(warm_formats):
+    start = time.perf_counter()
+    backend = None
+    backend_error = None
+    try:
+        backend = BACKENDS[BACKEND](warm_formats)
+    except Exception as e:
+        backend_error = f"{BACKEND} resolver unavailable: {e}"
+        print(f"error resolver: {e}")
+    ready_event.set()
+    if debug:
+        print(f"[resolver] {BACKEND} ready in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    while True:
+        _, _, query, yt_format, submitted, result, done = jobs.get()
+        picked = time.perf_counter()
+        try:
+            if backend_error:
+                raise RuntimeError(backend_error)
+            result["video"] = backend.extract(query, yt_format)
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+            resolver_stats["errors"] += 1
+        finished = time.perf_counter()
+        result["timings"] = {"wait": picked - submitted, "extract": finished - picked, "total": finished - submitted}
+        resolver_stats["count"] += 1
+        resolver_stats["extract_total"] += finished - picked
+        resolver_stats["wait_total"] += picked - submitted
+        if debug:
+            print(f"[resolver] {query}: wait {result['timings']['wait'] * 1000:.0f}ms, extract {result['timings']['extract'] * 1000:.0f}ms")
+        done.set()
+        jobs.task_done()
+
+def start(warm_formats=(), workers=None, debug_flag=False):
+    global workers_started, WORKERS, debug
+    with workers_lock:
+        if workers_started:
+            return
+        workers_started = True
+        if workers is not None:
+            WORKERS = max(1, workers)
+        debug = debug_flag
+    for _ in range(WORKERS):
+        threading.Thread(target=resolver_worker, args=(tuple(warm_formats),), daemon=True).start()
+
+def resolve(query, yt_format, priority=PRIORITY_PLAY, timeout=TIMEOUT):
+    start()
+    result = {"ok": False, "query": query, "video": None, "error": None, "timings": None}
+    done = threading.Event()
+    jobs.put((priority, next(job_counter), query, yt_format, time.perf_counter(), result, done))
+    if not done.wait(timeout):
+        result["error"] = f"resolver timeout after {timeout}s"
+    return result
+
+def stats_line():
+    count = resolver_stats["count"]
+    if not count:
+        return "resolver: idle"
+    return (f"resolver: {count}x extract {resolver_stats['extract_total'] / count * 1000:.0f}ms "
+            f"wait {resolver_stats['wait_total'] / count * 1000:.0f}ms err {resolver_stats['errors']}")